@@ -0,0 +1,291 @@
+"""Micro-benchmarks for the comprehensive pipeline's CPU stages (no OCR models).
+
+Pages are rendered once with PyMuPDF and kept in memory; only the stage under
+test is timed. Example:
+
+    python -m src.benchmark opencv data/Kauhava-Tilinpaatos-2024.pdf data/Seinäjoki-Tilinpaatos-2024.pdf
+    python -m src.benchmark grid data/Kauhava-Tilinpaatos-2024.pdf data/Seinäjoki-Tilinpaatos-2024.pdf
+    python -m src.benchmark regions data/Kauhava-Tilinpaatos-2024.pdf data/Seinäjoki-Tilinpaatos-2024.pdf
+
+``layout`` is the exception: it compares whole region modes (and single-pass
+inference) end to end and needs the PP-Structure models.
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Tuple
+
+import click
+import numpy as np
+
+from .comprehensive_table_parser import (
+    _box_cropper,
+    _init_pp_engine,
+    _ocr_page_text,
+    _page_numbers,
+    _process_page_layout,
+    _process_page_single_pass,
+    _to_model_input,
+    detect_table_regions_in_image,
+    detect_vector_regions,
+    process_page_for_tables,
+)
+from .document_session import open_document_session
+from .page_preprocess import preprocess_page
+from .page_renderer import RENDERER_PYMUPDF, get_renderer
+from .table_image_builder import (
+    GRID_ENGINE_MORPHOLOGY,
+    GRID_ENGINE_PROJECTION,
+    draw_table_grid,
+    find_grid_separators,
+)
+
+
+def _pages(pdf_path: Path, dpi: int, max_pages: int | None) -> Iterator[Tuple[int, np.ndarray]]:
+    with get_renderer(RENDERER_PYMUPDF, pdf_path) as renderer:
+        for page_num in _page_numbers(renderer.page_count(), 1, max_pages):
+            yield page_num, renderer.render_page(page_num, dpi)
+
+
+def _timed(fn: Callable[[], object]) -> Tuple[float, object]:
+    start = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - start, out
+
+
+def _crops(image: np.ndarray, regions: List[dict]) -> List[Tuple[dict, np.ndarray]]:
+    if not regions:
+        regions = [{'x': 0, 'y': 0, 'width': image.shape[1], 'height': image.shape[0]}]
+    return [
+        (r, image[r['y']:r['y'] + r['height'], r['x']:r['x'] + r['width']]) for r in regions
+    ]
+
+
+def _same_boxes(a: List[dict], b: List[dict], tolerance: int) -> bool:
+    """Same region boxes up to ``tolerance`` pixels per edge (anti-aliasing shifts edges)."""
+    key = lambda r: (r['y'], r['x'], r['width'], r['height'])  # noqa: E731
+    if len(a) != len(b):
+        return False
+    return all(
+        max(abs(p - q) for p, q in zip(key(x), key(y))) <= tolerance
+        for x, y in zip(sorted(a, key=key), sorted(b, key=key))
+    )
+
+
+@click.group()
+def main() -> None:
+    """Benchmark pipeline stages on sample PDFs."""
+
+
+@main.command()
+@click.argument("pdfs", nargs=-1, required=True, type=click.Path(exists=True, path_type=Path))
+@click.option("--dpi", type=int, default=300, show_default=True)
+@click.option("--max-pages", type=int, default=None, help="Pages per PDF (default: all).")
+def opencv(pdfs: Tuple[Path, ...], dpi: int, max_pages: int | None) -> None:
+    """Region detection + grid drawing per page: separate vs shared preprocessing."""
+    scale = dpi / 300
+    for pdf_path in pdfs:
+        before = after = 0.0
+        pages = regions_total = same_regions = 0
+        same_pixels = total_pixels = 0
+        for _page_num, image in _pages(pdf_path, dpi, max_pages):
+
+            def separate() -> Tuple[List[dict], List[np.ndarray]]:
+                regions = detect_table_regions_in_image(image, scale=scale)
+                return regions, [draw_table_grid(c) for _r, c in _crops(image, regions)]
+
+            def shared() -> Tuple[List[dict], List[np.ndarray]]:
+                prep = preprocess_page(image, scale)
+                regions = detect_table_regions_in_image(image, scale=scale, prep=prep)
+                return regions, [
+                    draw_table_grid(c, prep=prep.crop(r['x'], r['y'], r['width'], r['height']))
+                    for r, c in _crops(image, regions)
+                ]
+
+            t_before, (regions_a, grids_a) = _timed(separate)
+            t_after, (regions_b, grids_b) = _timed(shared)
+            before += t_before
+            after += t_after
+            pages += 1
+            regions_total += len(regions_a)
+            same_regions += int(regions_a == regions_b)
+            for a, b in zip(grids_a, grids_b, strict=False):
+                same_pixels += int(np.count_nonzero(a == b))
+                total_pixels += a.size
+
+        if not pages:
+            continue
+        click.echo(
+            f"{pdf_path.name}: {pages} pages at {dpi} DPI, {regions_total} regions\n"
+            f"  separate preprocessing: {1000 * before / pages:7.1f} ms/page\n"
+            f"  shared preprocessing:   {1000 * after / pages:7.1f} ms/page "
+            f"({before / max(after, 1e-9):.2f}x)\n"
+            f"  same regions on {same_regions}/{pages} pages, "
+            f"gridded pixels identical: {100 * same_pixels / max(total_pixels, 1):.3f}%"
+        )
+
+
+@main.command()
+@click.argument("pdfs", nargs=-1, required=True, type=click.Path(exists=True, path_type=Path))
+@click.option("--dpi", type=int, default=300, show_default=True)
+@click.option("--max-pages", type=int, default=None, help="Pages per PDF (default: all).")
+def grid(pdfs: Tuple[Path, ...], dpi: int, max_pages: int | None) -> None:
+    """Grid drawing per region crop: morphology vs projection engine, with agreement."""
+    scale = dpi / 300
+    for pdf_path in pdfs:
+        timings = {GRID_ENGINE_MORPHOLOGY: 0.0, GRID_ENGINE_PROJECTION: 0.0}
+        pages = crops = same_separators = same_images = 0
+        for _page_num, image in _pages(pdf_path, dpi, max_pages):
+            prep = preprocess_page(image, scale)
+            regions = detect_table_regions_in_image(image, scale=scale, prep=prep)
+            pages += 1
+            for r, crop in _crops(image, regions):
+                crop_prep = prep.crop(r['x'], r['y'], r['width'], r['height'])
+                out = {}
+                for engine in timings:
+                    elapsed, out[engine] = _timed(
+                        lambda engine=engine: find_grid_separators(crop, prep=crop_prep, engine=engine)
+                    )
+                    timings[engine] += elapsed
+                crops += 1
+                if out[GRID_ENGINE_MORPHOLOGY] == out[GRID_ENGINE_PROJECTION]:
+                    same_separators += 1
+                    same_images += 1
+                else:
+                    a = draw_table_grid(crop, prep=crop_prep, engine=GRID_ENGINE_MORPHOLOGY)
+                    b = draw_table_grid(crop, prep=crop_prep, engine=GRID_ENGINE_PROJECTION)
+                    same_images += int(np.array_equal(a, b))
+
+        if not crops:
+            continue
+        morphology = timings[GRID_ENGINE_MORPHOLOGY]
+        projection = timings[GRID_ENGINE_PROJECTION]
+        click.echo(
+            f"{pdf_path.name}: {pages} pages at {dpi} DPI, {crops} region crops\n"
+            f"  morphology: {1000 * morphology / crops:7.2f} ms/crop\n"
+            f"  projection: {1000 * projection / crops:7.2f} ms/crop "
+            f"({morphology / max(projection, 1e-9):.2f}x)\n"
+            f"  same separators on {same_separators}/{crops} crops, "
+            f"identical gridded images on {same_images}/{crops}"
+        )
+
+
+@main.command()
+@click.argument("pdfs", nargs=-1, required=True, type=click.Path(exists=True, path_type=Path))
+@click.option("--dpi", type=int, default=300, show_default=True)
+@click.option("--max-pages", type=int, default=None, help="Pages per PDF (default: all).")
+@click.option("--tolerance", type=int, default=3, show_default=True, help="Pixels per box edge.")
+def regions(pdfs: Tuple[Path, ...], dpi: int, max_pages: int | None, tolerance: int) -> None:
+    """Table region detection per page: OpenCV on the render vs the PDF's vector rules."""
+    scale = dpi / 300
+    for pdf_path in pdfs:
+        opencv_time = vector_time = 0.0
+        pages = vector_pages = same_regions = 0
+        with open_document_session(pdf_path) as session:
+            for page_num, image in _pages(pdf_path, dpi, max_pages):
+                t_opencv, expected = _timed(lambda: detect_table_regions_in_image(image, scale=scale))
+                t_vector, found = _timed(
+                    lambda: detect_vector_regions(session.page(page_num), dpi, _box_cropper(image))
+                )
+                opencv_time += t_opencv
+                vector_time += t_vector
+                pages += 1
+                if found is None:
+                    # No vector rules: the pipeline falls back to OpenCV on this page.
+                    same_regions += 1
+                    continue
+                vector_pages += 1
+                same_regions += int(_same_boxes(expected, found, tolerance))
+
+        if not pages:
+            continue
+        click.echo(
+            f"{pdf_path.name}: {pages} pages at {dpi} DPI, {vector_pages} with vector rules\n"
+            f"  opencv: {1000 * opencv_time / pages:7.1f} ms/page (page already rendered)\n"
+            f"  vector: {1000 * vector_time / pages:7.1f} ms/page "
+            f"({opencv_time / max(vector_time, 1e-9):.2f}x)\n"
+            f"  same regions (within {tolerance} px) on {same_regions}/{pages} pages"
+        )
+
+
+class _CountingEngine:
+    """Wraps a PP-Structure engine and counts its predict calls."""
+
+    def __init__(self, engine: Any) -> None:
+        self.engine = engine
+        self.calls = 0
+
+    def predict(self, *args: Any, **kwargs: Any) -> Any:
+        self.calls += 1
+        return self.engine.predict(*args, **kwargs)
+
+
+@main.command()
+@click.argument("pdfs", nargs=-1, required=True, type=click.Path(exists=True, path_type=Path))
+@click.option("--dpi", type=int, default=300, show_default=True)
+@click.option("--max-pages", type=int, default=None, help="Pages per PDF (default: all).")
+@click.option("--gpu/--cpu", "use_gpu", default=False, show_default=True)
+def layout(pdfs: Tuple[Path, ...], dpi: int, max_pages: int | None, use_gpu: bool) -> None:
+    """Whole pages with PP-Structure: OpenCV regions vs layout-model regions vs single pass (needs the models)."""
+    engine = _CountingEngine(_init_pp_engine(use_gpu))
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        for pdf_path in pdfs:
+            opencv_time = layout_time = single_time = 0.0
+            opencv_calls = layout_calls = opencv_tables = layout_tables = 0
+            single_calls = single_tables = 0
+            pages = layout_pages = 0
+            for page_num, image in _pages(pdf_path, dpi, max_pages):
+                def opencv_page() -> List[dict]:
+                    _ocr_page_text(engine, _to_model_input(image))
+                    return process_page_for_tables(page_num, image, work_dir, pp_engine=engine, dpi=dpi)[0]
+
+                calls = engine.calls
+                t, tables = _timed(opencv_page)
+                opencv_time += t
+                opencv_calls += engine.calls - calls
+                opencv_tables += len(tables)
+
+                calls = engine.calls
+                t, (_text, tables, _engine, used) = _timed(
+                    lambda: _process_page_layout(
+                        page_num, image, dpi=dpi, tables_dir=work_dir, pp_engine=engine, use_gpu=use_gpu,
+                        save_debug_images=False, grid_engine=GRID_ENGINE_MORPHOLOGY, pack_regions=False,
+                    )
+                )
+                layout_time += t
+                layout_calls += engine.calls - calls
+                layout_tables += len(tables)
+                layout_pages += int(used)
+
+                calls = engine.calls
+                t, (_text, tables, _engine) = _timed(
+                    lambda: _process_page_single_pass(
+                        page_num, image, None, dpi=dpi, tables_dir=work_dir, pp_engine=engine,
+                        use_gpu=use_gpu, save_debug_images=False, grid_engine=GRID_ENGINE_MORPHOLOGY,
+                        pack_regions=False,
+                    )
+                )
+                single_time += t
+                single_calls += engine.calls - calls
+                single_tables += len(tables)
+                pages += 1
+
+            if not pages:
+                continue
+            click.echo(
+                f"{pdf_path.name}: {pages} pages at {dpi} DPI, {layout_pages} with layout regions\n"
+                f"  opencv: {opencv_time / pages:6.2f} s/page, {opencv_calls} predict calls, "
+                f"{opencv_tables} tables\n"
+                f"  layout: {layout_time / pages:6.2f} s/page, {layout_calls} predict calls, "
+                f"{layout_tables} tables ({opencv_time / max(layout_time, 1e-9):.2f}x)\n"
+                f"  single: {single_time / pages:6.2f} s/page, {single_calls} predict calls, "
+                f"{single_tables} tables ({opencv_time / max(single_time, 1e-9):.2f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
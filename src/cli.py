@@ -25,6 +25,16 @@ except Exception:
 
 import click
 
+from .config import (
+    PAGE_TILE_MAX_PIXELS,
+    PREDICT_BATCH_MAX_PIXELS,
+    PREDICT_BATCH_SIZE,
+    RENDER_CACHE_DIR,
+    RENDER_CACHE_MAX_MB,
+    TEMPLATE_CACHE_PATH,
+)
+from .engine_registry import release_engines
+
 
 @click.command()
 @click.argument(
@@ -43,6 +53,14 @@ import click
     is_flag=True,
     help="Use Docling instead of MinerU (MinerU is default, better for tables).",
 )
+@click.option(
+    "--pymupdf-tables",
+    type=click.Choice(["off", "first", "only"]),
+    default="off",
+    show_default=True,
+    help="PyMuPDF's native table finder (text layer, no OCR). first tries it before MinerU/Docling "
+    "or comprehensive mode and keeps it when no page needs OCR; only uses it as the parser.",
+)
 @click.option(
     "--no-gpu",
     is_flag=True,
@@ -77,16 +95,195 @@ import click
     default=1,
     help="Start page in comprehensive mode (1-indexed). Default: 1.",
 )
+@click.option(
+    "--dpi",
+    type=int,
+    default=300,
+    show_default=True,
+    help="Comprehensive mode: page render DPI (the maximum with --adaptive-dpi).",
+)
+@click.option(
+    "--adaptive-dpi",
+    is_flag=True,
+    help="Render each page at the lowest DPI at which its smallest numeric font stays sharp "
+    "(from the PDF text layer; scanned pages keep --dpi). Applies to --visual-pages too.",
+)
+@click.option(
+    "--skip-pages",
+    is_flag=True,
+    help="Comprehensive mode: skip OCR on blank pages and reuse text/tables for pages that "
+    "repeat an earlier page (covers, signature pages).",
+)
+@click.option(
+    "--tile-max-pixels",
+    type=int,
+    default=PAGE_TILE_MAX_PIXELS,
+    show_default=True,
+    help="Comprehensive mode: pixel budget per render. Larger pages (A3 fold-outs) are OCR'd "
+    "in overlapping tiles and stitched back; 0 disables tiling.",
+)
+@click.option(
+    "--renderer",
+    type=click.Choice(["pdf2image", "pymupdf"]),
+    default="pdf2image",
+    show_default=True,
+    help="Page renderer in comprehensive mode: pdf2image (Poppler) or pymupdf (in-process).",
+)
+@click.option(
+    "--no-page-images",
+    is_flag=True,
+    help="Comprehensive mode: keep page images in memory only (no page PNGs, no image links in markdown).",
+)
+@click.option(
+    "--debug-images",
+    is_flag=True,
+    help="Comprehensive mode: write gridded table-region PNGs to work/extracted_tables.",
+)
+@click.option(
+    "--two-pass",
+    is_flag=True,
+    help="Comprehensive mode: detect tables on low-DPI thumbnails, render only table regions at full DPI "
+    "(rendered with PyMuPDF).",
+)
+@click.option(
+    "--color-mode",
+    type=click.Choice(["rgb", "gray", "bitonal"]),
+    default="rgb",
+    show_default=True,
+    help="Comprehensive mode: page render colour mode. gray/bitonal keep one channel per pixel "
+    "(~3x less memory and image I/O); pages are expanded to RGB only for PP-Structure.",
+)
+@click.option(
+    "--grid-engine",
+    type=click.Choice(["morphology", "projection"]),
+    default="morphology",
+    show_default=True,
+    help="Comprehensive mode: how table grids are found before PP-Structure. projection uses "
+    "numpy projection profiles instead of OpenCV openings (same grid, faster on large regions).",
+)
+@click.option(
+    "--regions",
+    "region_source",
+    type=click.Choice(["opencv", "vector", "prepass", "layout"]),
+    default="opencv",
+    show_default=True,
+    help="Comprehensive mode: where table regions come from. vector reads the PDF's vector "
+    "rules without rendering for detection; prepass takes one region per block of numeric text "
+    "rows; layout trusts PP-Structure's layout model on one whole-page predict. Pages these "
+    "cannot answer for fall back to OpenCV.",
+)
+@click.option(
+    "--text-layer",
+    is_flag=True,
+    help="Comprehensive mode: read words of born-digital pages from the PDF text layer instead of "
+    "OCR. Pages and table regions whose text layer is missing, garbled or scanned are still OCR'd.",
+)
+@click.option(
+    "--pack-regions",
+    is_flag=True,
+    help="Comprehensive mode: put a page's small table regions on shared canvases and run "
+    "PP-Structure once per canvas instead of once per region.",
+)
+@click.option(
+    "--single-pass",
+    is_flag=True,
+    help="Comprehensive mode: one PP-Structure call per page gives both the page text and its "
+    "tables; table regions are gridded and predicted again only where that call got them wrong.",
+)
+@click.option(
+    "--predict-batch",
+    type=int,
+    default=PREDICT_BATCH_SIZE,
+    show_default=True,
+    help="Comprehensive mode: table region crops of a page sent to PP-Structure per predict call.",
+)
+@click.option(
+    "--predict-batch-pixels",
+    type=int,
+    default=PREDICT_BATCH_MAX_PIXELS,
+    show_default=True,
+    help="Comprehensive mode: pixel budget of one batched predict call (a larger crop goes alone).",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Comprehensive mode: worker processes sharing the pages, each with its own PP-Structure "
+    "engine and an equal share of the CPU threads.",
+)
+@click.option(
+    "--table-templates",
+    is_flag=True,
+    help="Comprehensive mode: keep the layouts of recognized tables and read later tables with the "
+    "same layout (same software, other pages or years) with OCR only, skipping structure recognition.",
+)
+@click.option(
+    "--template-cache",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=TEMPLATE_CACHE_PATH,
+    show_default=True,
+    help="Comprehensive mode: table layout template file (shared across runs and documents).",
+)
+@click.option(
+    "--page-store",
+    is_flag=True,
+    help="Keep rendered pages in a memory-mapped work/page_store; reruns, resumes and "
+    "--visual-pages map them instead of rendering or decoding PNGs.",
+)
+@click.option(
+    "--render-cache-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=RENDER_CACHE_DIR,
+    show_default=True,
+    help="Comprehensive mode: shared cache of rendered pages (reused across runs and output dirs).",
+)
+@click.option(
+    "--render-cache-mb",
+    type=int,
+    default=RENDER_CACHE_MAX_MB,
+    show_default=True,
+    help="Disk budget for the render cache; least recently used pages are evicted beyond it.",
+)
+@click.option(
+    "--no-render-cache",
+    is_flag=True,
+    help="Comprehensive mode: do not read or write the shared render cache.",
+)
 def main(
     pdf_path: Path,
     out_dir: Path,
     use_docling: bool,
+    pymupdf_tables: str,
     no_gpu: bool,
     visual_tables: bool,
     visual_pages: str,
     comprehensive: bool,
     comprehensive_max_pages: int | None,
     comprehensive_start_page: int,
+    dpi: int,
+    adaptive_dpi: bool,
+    skip_pages: bool,
+    tile_max_pixels: int,
+    renderer: str,
+    no_page_images: bool,
+    debug_images: bool,
+    two_pass: bool,
+    color_mode: str,
+    grid_engine: str,
+    region_source: str,
+    text_layer: bool,
+    pack_regions: bool,
+    single_pass: bool,
+    predict_batch: int,
+    predict_batch_pixels: int,
+    workers: int,
+    table_templates: bool,
+    template_cache: Path,
+    page_store: bool,
+    render_cache_dir: Path,
+    render_cache_mb: int,
+    no_render_cache: bool,
 ) -> None:
     """
     Parse a PDF file and convert to LLM-friendly markdown.
@@ -128,6 +325,8 @@ def main(
 
     # Import heavy pipeline only after acquiring the lock (prevents double-start races).
     from .pipeline import process_pdf
+    from .render_cache import RenderCache
+    from .table_templates import TemplateCache
 
     click.echo(f"Processing: {pdf_path}")
     click.echo(f"Output dir: {out_dir}")
@@ -136,6 +335,8 @@ def main(
     else:
         click.echo(f"Parser: {'MinerU' if use_mineru else 'Docling'}")
         click.echo(f"GPU: {'enabled' if use_gpu else 'disabled'}")
+    if pymupdf_tables != "off":
+        click.echo(f"PyMuPDF table finder: {pymupdf_tables}")
 
     # Parse visual pages if provided
     visual_pages_list = None
@@ -145,6 +346,11 @@ def main(
         except ValueError:
             click.echo(f"Warning: Invalid page numbers: {visual_pages}", err=True)
             visual_pages_list = None
+
+    render_cache = None
+    if comprehensive and not no_render_cache:
+        render_cache = RenderCache(render_cache_dir, max_mb=render_cache_mb)
+    templates = TemplateCache(template_cache) if comprehensive and table_templates else None
     
     try:
         md_path = process_pdf(
@@ -157,6 +363,27 @@ def main(
             comprehensive_mode=comprehensive,
             comprehensive_max_pages=comprehensive_max_pages,
             comprehensive_start_page=comprehensive_start_page,
+            comprehensive_renderer=renderer,
+            comprehensive_save_page_images=not no_page_images,
+            comprehensive_debug_images=debug_images,
+            comprehensive_two_pass=two_pass,
+            comprehensive_render_cache=render_cache,
+            comprehensive_color_mode=color_mode,
+            use_page_store=page_store,
+            comprehensive_dpi=dpi,
+            adaptive_dpi=adaptive_dpi,
+            comprehensive_skip_pages=skip_pages,
+            comprehensive_tile_max_pixels=tile_max_pixels,
+            comprehensive_grid_engine=grid_engine,
+            comprehensive_region_source=region_source,
+            comprehensive_text_layer=text_layer,
+            comprehensive_pack_regions=pack_regions,
+            comprehensive_template_cache=templates,
+            comprehensive_single_pass=single_pass,
+            comprehensive_predict_batch=predict_batch,
+            comprehensive_predict_batch_pixels=predict_batch_pixels,
+            comprehensive_workers=workers,
+            pymupdf_tables=pymupdf_tables,
         )
         click.echo(f"Success: {md_path}")
     except FileNotFoundError as e:
@@ -166,6 +393,7 @@ def main(
         click.echo(f"Processing failed: {e}", err=True)
         raise SystemExit(1) from e
     finally:
+        release_engines()
         try:
             lock_path.unlink(missing_ok=True)
         except Exception:
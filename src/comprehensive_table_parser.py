@@ -17,8 +17,10 @@ os.environ['HUGGINGFACE_HUB_DISABLE_OFFLINE'] = '1'
 os.environ['HF_HUB_OFFLINE'] = '1'
 
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple, Any
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple, Any, Type, Union
 import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 
 try:
@@ -31,13 +33,74 @@ try:
 except ImportError:
     cv2 = None
 
-try:
-    import paddleocr as paddleocr_mod
-except ImportError:
-    paddleocr_mod = None
-
-from .table_image_builder import draw_table_grid
+from .table_image_builder import (
+    GRID_ENGINE_MORPHOLOGY,
+    check_grid_engine,
+    draw_table_grid,
+    find_grid_separators,
+)
+from .config import (
+    PACK_CANVAS_HEIGHT,
+    PACK_CANVAS_WIDTH,
+    PACK_GUTTER_PX,
+    PACK_MAX_REGION_PIXELS,
+    PAGE_TILE_MAX_PIXELS,
+    PAGE_TILE_OVERLAP_PX,
+    PREDICT_BATCH_MAX_PIXELS,
+    PREDICT_BATCH_SIZE,
+    REGION_MERGE_GAP_300,
+    RENDER_CHUNK_PAGES,
+    RENDER_MEMORY_CHUNK_PAGES,
+    RENDER_THREAD_COUNT,
+    TEXT_LAYER_MAX_GARBLED,
+    TEXT_LAYER_MAX_IMAGE_SHARE,
+    TEXT_LAYER_MIN_IMAGE_TABLE_PT,
+    TEXT_LAYER_PREVIEW_DPI,
+    TWO_PASS_TEXT_DPI,
+    TWO_PASS_TRIAGE_DPI,
+)
+from .document_session import DocumentSession, open_document_session
+from .dpi_planner import DpiPlanner
+from .page_renderer import (
+    COLOR_GRAY,
+    COLOR_RGB,
+    DEFAULT_RENDERER,
+    RENDERER_PYMUPDF,
+    PageRenderer,
+    check_color_mode,
+    get_renderer,
+    page_image_name,
+    renderer_class,
+)
+from .page_filter import SKIP_DUPLICATE, PageSkip, find_skippable_pages
+from .page_preprocess import PagePreprocess, preprocess_page
+from .page_sharding import (
+    limit_worker_threads,
+    page_cost,
+    shard_pages,
+    worker_thread_env,
+    worker_threads,
+)
+from .page_store import PageStore, open_page_store
+from .page_tiling import fit_dpi, merge_boxes, owned_tokens, plan_tiles
+from .pymupdf_prepass import detect_page_table_regions, region_pixels
+from .region_merge import merge_regions
+from .predict_batch import PredictBatcher
+from .region_packing import pack_crops, split_result, table_extent
+from .table_templates import Geometry, TemplateCache, ocr_tokens, template_rows
+from .text_layer import (
+    covered_share,
+    garbled_share,
+    in_region,
+    page_tokens,
+    phrases,
+    tokens_in,
+    tokens_to_rows,
+)
+from .vector_rules import image_boxes, vector_table_regions
+from .render_cache import RenderCache, pdf_content_hash, prepare_image_dir, render_fingerprint
 from .html_table import html_table_to_rows, rows_to_markdown, build_confidence_by_text
+from .engine_registry import engine_stats, get_pp_engine, release_engines
 from .paddle_device import configure_paddle_device
 from .ppstructure_postprocess import OCRToken, try_balance_sheet_3col
 
@@ -92,32 +155,111 @@ def _group_text_lines_from_ocr(
     return "\n".join(lines).strip()
 
 
-def get_pdf_page_count(pdf_path: Path) -> int:
-    """Get total number of pages in PDF using pdf2image."""
+def get_pdf_page_count(pdf_path: Path, session: Optional[DocumentSession] = None) -> int:
+    """Get total number of pages in PDF without rendering anything.
+
+    Uses the (cached) document session; falls back to Poppler ``pdfinfo`` when
+    PyMuPDF is not installed.
+    """
+    if session is not None or fitz is not None:
+        with open_document_session(pdf_path, session) as sess:
+            return sess.page_count
+
     try:
-        from pdf2image import convert_from_path
+        from pdf2image import pdfinfo_from_path
     except ImportError:
         raise ImportError("pdf2image not installed")
-    
-    try:
-        # Convert just first page to get page count
-        images = convert_from_path(str(pdf_path), dpi=72, first_page=1, last_page=1)
-        if not images:
-            return 0
-        
-        # Use pdfinfo if available, otherwise estimate
-        # For now, we'll render all pages and count them
-        # This is inefficient but ensures accuracy
-        all_images = convert_from_path(str(pdf_path), dpi=72)
-        return len(all_images) if all_images else 0
-    except Exception:
-        # Fallback to PyMuPDF if available
-        if fitz is not None:
-            doc = fitz.open(str(pdf_path))
-            count = len(doc)
-            doc.close()
-            return count
-        raise
+    return int(pdfinfo_from_path(str(pdf_path)).get("Pages", 0))
+
+
+def _contiguous_chunks(
+    pages: List[int],
+    chunk_size: int,
+    same_run: Optional[Callable[[int, int], bool]] = None,
+) -> List[Tuple[int, int]]:
+    """Split sorted page numbers into contiguous (first, last) runs of at most chunk_size.
+
+    ``same_run(a, b)`` can veto joining adjacent pages (e.g. different DPIs).
+    """
+    chunks: List[Tuple[int, int]] = []
+    for page_num in pages:
+        if chunks:
+            first, last = chunks[-1]
+            if (
+                page_num == last + 1
+                and (last - first + 1) < chunk_size
+                and (same_run is None or same_run(last, page_num))
+            ):
+                chunks[-1] = (first, page_num)
+                continue
+        chunks.append((page_num, page_num))
+    return chunks
+
+
+def _dpi_histogram(page_dpis: Dict[int, int]) -> str:
+    """'200 DPI x 111, 225 DPI x 44' for logs."""
+    counts: Dict[int, int] = {}
+    for value in page_dpis.values():
+        counts[value] = counts.get(value, 0) + 1
+    return ", ".join(f"{d} DPI x {n}" for d, n in sorted(counts.items()))
+
+
+def _skip_summary(skips: Dict[int, PageSkip]) -> str:
+    blank = sum(1 for k in skips.values() if k.reason != SKIP_DUPLICATE)
+    return f"{blank} blank, {len(skips) - blank} repeated page(s) skipped"
+
+
+def _skipped_page(
+    page_num: int,
+    skip: PageSkip,
+    pages_by_num: Dict[int, Dict[str, Any]],
+    tables_by_num: Dict[int, List[Dict]],
+) -> Tuple[Dict[str, Any], List[Dict]]:
+    """Page entry (and tables) for a page the filter skipped.
+
+    Blank pages get no text or tables; a repeated page reuses the text, image
+    and tables of the page it repeats (tables relabelled with this page).
+    """
+    decision: Dict[str, Any] = {"reason": skip.reason, "ink": round(skip.ink, 5)}
+    if skip.reason != SKIP_DUPLICATE:
+        page_item = {
+            "page": page_num,
+            "dpi": None,
+            "page_image": None,
+            "text": "",
+            "tiles": None,
+            "regions": None,
+            "text_source": None,
+            "skip": decision,
+        }
+        return page_item, []
+
+    decision["same_as"] = skip.same_as
+    source = pages_by_num[skip.same_as]
+    page_item = {
+        "page": page_num,
+        "dpi": source["dpi"],
+        "page_image": source["page_image"],
+        "text": source["text"],
+        "tiles": source["tiles"],
+        "regions": source["regions"],
+        "text_source": source["text_source"],
+        "skip": decision,
+    }
+    tables = [
+        dict(t, page=page_num, duplicate_of=skip.same_as) for t in tables_by_num[skip.same_as]
+    ]
+    return page_item, tables
+
+
+def _page_numbers(total_pages: int, start_page: int, max_pages: Optional[int]) -> List[int]:
+    """1-indexed page numbers to process, honouring start_page/max_pages."""
+    safe_start = max(1, int(start_page))
+    if total_pages <= 0 or safe_start > total_pages:
+        return []
+    remaining = total_pages - safe_start + 1
+    limit = min(remaining, max_pages) if max_pages is not None else remaining
+    return list(range(safe_start, safe_start + limit))
 
 
 def render_all_pages(
@@ -126,93 +268,259 @@ def render_all_pages(
     dpi: int = 300,
     max_pages: Optional[int] = None,
     start_page: int = 1,
+    renderer: str = DEFAULT_RENDERER,
+    chunk_size: int = RENDER_CHUNK_PAGES,
+    thread_count: int = RENDER_THREAD_COUNT,
+    session: Optional[DocumentSession] = None,
+    cache: Optional[RenderCache] = None,
+    color_mode: str = COLOR_RGB,
 ) -> List[Tuple[int, Path]]:
     """
-    Render all PDF pages to images using pdf2image library.
-    
+    Render all PDF pages to PNG images.
+
+    Args:
+        renderer: Page renderer backend (``pdf2image`` or ``pymupdf``), see page_renderer.py
+        chunk_size: Max pages rendered per batch (bounds temporary disk/memory use)
+        thread_count: Parallel ``pdftoppm`` processes per batch (pdf2image only)
+        session: Open document session (page count, shared PyMuPDF document)
+        cache: Shared render cache; hits are linked into ``output_dir``, new renders are added
+        color_mode: ``rgb``, ``gray`` or ``bitonal`` (single-channel PNGs, ~3x less I/O)
+
     Returns:
         List of (page_number, image_path) tuples
     """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    check_color_mode(color_mode)
+
     try:
-        from pdf2image import convert_from_path, pdfinfo_from_path
+        with get_renderer(renderer, pdf_path, session=session) as page_renderer:
+            total_pages = page_renderer.page_count()
+            if total_pages <= 0:
+                return []
+
+            page_nums = _page_numbers(total_pages, start_page, max_pages)
+            cache_key = _cache_keys(pdf_path, dpi, type(page_renderer), color_mode)
+
+            # Existing PNGs are reused (resume) only if they came from the same PDF,
+            # DPI, colour mode and renderer; otherwise prepare_image_dir drops them.
+            prepare_image_dir(
+                output_dir, _fingerprint(pdf_path, dpi, type(page_renderer), color_mode)
+            )
+            missing = [n for n in page_nums if not (output_dir / page_image_name(n)).exists()]
+            if cache is not None:
+                missing = [
+                    n for n in missing
+                    if not cache.export(cache_key(n), output_dir / page_image_name(n))
+                ]
+
+            # Missing pages are rendered in bounded chunks of contiguous pages.
+            for first, last in _contiguous_chunks(missing, max(1, chunk_size)):
+                written = page_renderer.render_range_to_dir(
+                    first, last, dpi, output_dir, thread_count=thread_count, color_mode=color_mode
+                )
+                if cache is not None:
+                    for page_num, path in written.items():
+                        cache.put_file(cache_key(page_num), path)
+
+        return [
+            (page_num, output_dir / page_image_name(page_num))
+            for page_num in page_nums
+            if (output_dir / page_image_name(page_num)).exists()
+        ]
     except ImportError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Failed to render PDF pages with {renderer}: {e}") from e
+
+
+def _fingerprint(
+    pdf_path: Path, dpi: Union[int, str], backend: Type[PageRenderer], color_mode: str
+) -> Dict[str, object]:
+    return render_fingerprint(
+        pdf_content_hash(pdf_path), dpi, backend.name, backend.version, color_mode
+    )
+
+
+def _cache_keys(
+    pdf_path: Path,
+    dpi: int,
+    backend: Type[PageRenderer],
+    color_mode: str,
+    page_dpis: Optional[Dict[int, int]] = None,
+) -> Callable[[int], str]:
+    """Return page_number -> render-cache key for this PDF/DPI/renderer/colour mode."""
+    pdf_hash = pdf_content_hash(pdf_path)
+    page_dpis = page_dpis or {}
+    return lambda page_num: RenderCache.key(
+        pdf_hash, page_num, page_dpis.get(page_num, dpi), backend.name, backend.version, color_mode
+    )
+
+
+def _load_image(image_path: Path, color_mode: str = COLOR_RGB) -> Optional[np.ndarray]:
+    """Decode an image file to an RGB array, or a single-channel one for gray/bitonal."""
+    if cv2 is None:
         raise ImportError(
-            "pdf2image not installed. Install with: pip install pdf2image\n"
-            "Also requires poppler-utils. On Windows:\n"
-            "1. Download from: https://github.com/oschwartz10612/poppler-windows/releases\n"
-            "2. Extract to C:\\poppler or similar\n"
-            "3. Add to PATH or set poppler_path parameter"
+            "opencv-python not installed. Install with: pip install opencv-python-headless"
         )
-    
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    try:
-        page_images = []
+    if color_mode != COLOR_RGB:
+        return cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE)
+    image = cv2.imread(str(image_path))
+    if image is None:
+        return None
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
-        info = pdfinfo_from_path(str(pdf_path))
-        total_pages = int(info.get("Pages", 0))
-        if total_pages <= 0:
-            return []
 
-        safe_start = max(1, int(start_page))
-        if safe_start > total_pages:
-            return []
+def iter_page_images(
+    pdf_path: Path,
+    page_nums: List[int],
+    dpi: int = 300,
+    renderer: str = DEFAULT_RENDERER,
+    session: Optional[DocumentSession] = None,
+    chunk_size: int = RENDER_MEMORY_CHUNK_PAGES,
+    thread_count: int = RENDER_THREAD_COUNT,
+    reuse_dir: Optional[Path] = None,
+    cache: Optional[RenderCache] = None,
+    color_mode: str = COLOR_RGB,
+    store: Optional[PageStore] = None,
+    page_dpis: Optional[Dict[int, int]] = None,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Render pages straight to arrays, one bounded chunk at a time.
 
-        remaining = total_pages - safe_start + 1
-        limit = min(remaining, max_pages) if max_pages is not None else remaining
+    Nothing is written to ``reuse_dir``. If it holds an earlier ``page_NNNN.png``
+    for a page, that image is decoded instead of re-rendering (resume); the caller
+    is responsible for the directory matching this render (``prepare_image_dir``).
+    With a ``cache``, cached pages are decoded from it and fresh renders are added.
+    With a ``store`` (opened with this render's fingerprint), stored pages are
+    yielded as memory-mapped arrays without decoding, and every other page is
+    added to it. ``color_mode`` ``gray``/``bitonal`` yields single-channel arrays.
+    ``page_dpis`` overrides ``dpi`` per page (see dpi_planner.py); render chunks
+    never mix DPIs.
 
-        # Render one page at a time (mandated) to keep memory stable on large PDFs.
-        # If the PNG already exists, reuse it (allows resume without re-render).
-        for page_num in range(safe_start, safe_start + limit):
-            image_path = output_dir / f"page_{page_num:04d}.png"
-            if image_path.exists():
-                page_images.append((page_num, image_path))
-                continue
-            images = convert_from_path(
-                str(pdf_path),
-                dpi=dpi,
-                fmt="png",
-                first_page=page_num,
-                last_page=page_num,
+    Yields:
+        (page_number, image) in page order
+    """
+    def reusable(page_num: int) -> Optional[Path]:
+        if reuse_dir is None:
+            return None
+        path = reuse_dir / page_image_name(page_num)
+        return path if path.exists() else None
+
+    page_dpis = page_dpis or {}
+
+    def dpi_of(page_num: int) -> int:
+        return page_dpis.get(page_num, dpi)
+
+    with get_renderer(renderer, pdf_path, session=session) as page_renderer:
+        cache_key = (
+            _cache_keys(pdf_path, dpi, type(page_renderer), color_mode, page_dpis)
+            if cache is not None
+            else None
+        )
+
+        def cached(page_num: int) -> Optional[Path]:
+            return cache.get(cache_key(page_num)) if cache is not None else None
+
+        def load(page_num: int) -> Optional[np.ndarray]:
+            if store is not None and page_num in store:
+                return store.get(page_num)
+            path = reusable(page_num)
+            if path is not None:
+                return _load_image(path, color_mode)
+            return cache.load(cache_key(page_num)) if cache is not None else None
+
+        def remember(page_num: int, image: np.ndarray) -> None:
+            if store is not None and page_num not in store:
+                store.put(page_num, image)
+
+        to_render = [
+            n for n in page_nums
+            if not (store is not None and n in store) and reusable(n) is None and cached(n) is None
+        ]
+        chunks = iter(
+            _contiguous_chunks(
+                to_render, max(1, chunk_size), lambda a, b: dpi_of(a) == dpi_of(b)
             )
-            if not images:
-                continue
-            image = images[0]
-            image.save(image_path, 'PNG')
-            page_images.append((page_num, image_path))
-        
-        return page_images
-    except Exception as e:
-        raise RuntimeError(f"Failed to render PDF pages with pdf2image: {e}") from e
+        )
+        to_render_set = set(to_render)
+        rendered: Dict[int, np.ndarray] = {}
+        for page_num in page_nums:
+            if page_num not in rendered and page_num not in to_render_set:
+                image = load(page_num)
+                if image is not None:
+                    remember(page_num, image)
+                    yield page_num, image
+                    continue
+                # Unreadable leftover or evicted meanwhile: render it on its own.
+                rendered[page_num] = page_renderer.render_page(
+                    page_num, dpi_of(page_num), color_mode
+                )
+                if cache is not None:
+                    cache.put_array(cache_key(page_num), rendered[page_num])
+            if page_num not in rendered:
+                first, last = next(chunks)
+                images = page_renderer.render_range(
+                    first, last, dpi_of(first), thread_count=thread_count, color_mode=color_mode
+                )
+                rendered = dict(zip(range(first, last + 1), images, strict=False))
+                if cache is not None:
+                    for n, image in rendered.items():
+                        cache.put_array(cache_key(n), image)
+            image = rendered.pop(page_num)
+            remember(page_num, image)
+            yield page_num, image
+
+
+# Table region sources: OpenCV on the rendered page, the PDF's vector rules (see
+# vector_rules.py), the numeric text blocks of the PyMuPDF prepass (see
+# pymupdf_prepass.py) or PP-Structure's own layout detection on the whole page.
+# Pages the other sources cannot read still use OpenCV.
+REGIONS_OPENCV = "opencv"
+REGIONS_VECTOR = "vector"
+REGIONS_PREPASS = "prepass"
+REGIONS_LAYOUT = "layout"
+REGION_SOURCES = (REGIONS_OPENCV, REGIONS_VECTOR, REGIONS_PREPASS, REGIONS_LAYOUT)
+
+
+def check_region_source(region_source: str) -> str:
+    if region_source not in REGION_SOURCES:
+        raise ValueError(
+            f"Unknown region source: {region_source!r} "
+            f"(expected one of: {', '.join(REGION_SOURCES)})"
+        )
+    return region_source
 
 
-def detect_table_regions_in_image(image_path: Path) -> List[Dict]:
+def detect_table_regions_in_image(
+    image: Union[np.ndarray, Path],
+    scale: float = 1.0,
+    prep: Optional[PagePreprocess] = None,
+) -> List[Dict]:
     """
     Detect potential table regions in an image using OpenCV.
     
+    Args:
+        image: Page image as RGB (or grayscale) array; a path is decoded for compatibility
+        scale: Image DPI relative to 300 DPI (e.g. 0.25 for a 75 DPI thumbnail).
+            Kernel lengths and minimum region size are tuned for 300 DPI and
+            scaled by this factor.
+        prep: This page's preprocessing (see page_preprocess.py), computed here if None
+    
     Returns:
         List of bounding boxes (x, y, width, height) for table regions
     """
     if cv2 is None:
         return []
     
-    image = cv2.imread(str(image_path))
-    if image is None:
-        return []
-    
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    _, binary = cv2.threshold(gray, 180, 255, cv2.THRESH_BINARY_INV)
-    
-    # Detect horizontal lines (rows)
-    horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1))
-    detect_horizontal = cv2.morphologyEx(binary, cv2.MORPH_OPEN, horizontal_kernel, iterations=2)
+    if prep is None:
+        if not isinstance(image, np.ndarray):
+            image = _load_image(Path(image))
+            if image is None:
+                return []
+        prep = preprocess_page(image, scale)
     
-    # Detect vertical lines (columns)
-    vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 30))
-    detect_vertical = cv2.morphologyEx(binary, cv2.MORPH_OPEN, vertical_kernel, iterations=2)
-    
-    # Combine
-    grid = cv2.add(detect_horizontal, detect_vertical)
+    # Combine the horizontal (rows) and vertical (columns) line masks
+    grid = cv2.add(prep.horizontal, prep.vertical)
     
     # Find contours
     contours, _ = cv2.findContours(grid, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
@@ -220,7 +528,7 @@ def detect_table_regions_in_image(image_path: Path) -> List[Dict]:
     regions = []
     for cnt in contours:
         x, y, w, h = cv2.boundingRect(cnt)
-        if w > 100 and h > 50:  # Minimum table size
+        if w > 100 * scale and h > 50 * scale:  # Minimum table size
             regions.append({
                 'x': int(x),
                 'y': int(y),
@@ -231,195 +539,596 @@ def detect_table_regions_in_image(image_path: Path) -> List[Dict]:
     return regions
 
 
-def process_page_for_tables(
-    page_num: int,
-    image_path: Path,
-    work_dir: Path,
-    pp_engine: Optional[Any] = None,
-    use_gpu: bool = True,
-) -> tuple[List[Dict], Any]:
-    """
-    Process a single page to extract all tables.
-    
-    Returns:
-        List of table dictionaries with structure, markdown, and metadata
+def _merged_regions(
+    regions: List[Dict], scale: float, join_fragments: bool = True
+) -> List[Dict]:
+    """merge_regions, logging the page's region count before and after.
+
+    Without ``join_fragments`` only overlapping regions are merged: regions that
+    are whole tables already (prepass blocks) stay apart however close they are.
     """
-    # Lazy initialization of PP-Structure engine (PaddleOCR v3: PPStructureV3)
-    if pp_engine is None:
-        if paddleocr_mod is None or not hasattr(paddleocr_mod, "PPStructureV3"):
-            raise ImportError(
-                "PP-Structure engine not available. Required stack:\n"
-                "- paddleocr==3.3.2\n"
-                "- paddlex[ocr]==3.3.11\n"
-                "Install in venv: pip install \"paddleocr==3.3.2\" \"paddlex[ocr]==3.3.11\""
-            )
+    merged = merge_regions(regions, scale, gap=REGION_MERGE_GAP_300 if join_fragments else 0)
+    if regions:
+        print(f"    Table regions: {len(regions)} found, {len(merged)} after merging")
+    return merged
 
-        print(f"  Initializing PPStructureV3 (first use on page {page_num})...")
-        try:
-            configure_paddle_device(use_gpu=use_gpu)
-            # Disable optional pipelines we don't need for financial statements.
-            pp_engine = paddleocr_mod.PPStructureV3(
-                lang="en",
-                use_table_recognition=True,
-                use_region_detection=False,
-                use_doc_unwarping=False,
-                use_seal_recognition=False,
-                use_formula_recognition=False,
-                use_chart_recognition=False,
-            )
-            print("  PPStructureV3 initialized!")
-        except Exception as e:
-            print(f"  PPStructureV3 initialization failed: {e}")
-            raise
-    
-    tables: List[Dict] = []
+
+def detect_vector_regions(
+    page: "fitz.Page",
+    dpi: int,
+    render_box: Callable[[Dict], Optional[np.ndarray]],
+) -> Optional[List[Dict]]:
+    """
+    Detect table regions from a page's vector rules, without rendering the page.
     
-    # Load image
-    image = cv2.imread(str(image_path))
-    if image is None:
-        return tables, pp_engine
+    Rules inside raster images are not vector paths: for each image drawn on the
+    page, ``render_box(box)`` supplies the page pixels under it (a crop of the
+    page image, or a clip render) and OpenCV looks there.
     
-    # Convert BGR to RGB
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    Args:
+        page: PyMuPDF page
+        dpi: DPI of the returned pixel boxes
+        render_box: Page image at ``dpi`` cropped to a region dict, or None if
+            it cannot be had (the page then falls back to OpenCV)
     
-    # Detect table regions
-    regions = detect_table_regions_in_image(image_path)
+    Returns:
+        Region dicts as from detect_table_regions_in_image, or None when the page
+        has no vector rules (or an image area could not be checked)
+    """
+    regions = vector_table_regions(page, dpi)
+    if regions is None:
+        return None
+    for box in image_boxes(page, dpi):
+        crop = render_box(box)
+        if crop is None:
+            return None
+        for r in detect_table_regions_in_image(crop, scale=dpi / 300):
+            regions.append({**r, 'x': r['x'] + box['x'], 'y': r['y'] + box['y']})
+    return regions
+
+
+def detect_prepass_regions(page: "fitz.Page", dpi: int) -> Optional[List[Dict]]:
+    """
+    Table regions from the prepass's numeric text blocks, without rendering the page.
     
-    if not regions:
-        # If no regions detected, try processing entire page
-        regions = [{'x': 0, 'y': 0, 'width': image.shape[1], 'height': image.shape[0]}]
+    Each block of numeric rows (see pymupdf_prepass.detect_page_table_regions)
+    becomes one region, so two tables on a page, or a table and the narrative
+    around it, are separate crops.
     
-    for region_idx, region in enumerate(regions):
-        # Crop region
-        x, y, w, h = region['x'], region['y'], region['width'], region['height']
-        cropped = image_rgb[y:y+h, x:x+w]
-        
-        # Draw grid lines
-        grid_image = draw_table_grid(cropped)
-        
-        # Save grid image for debugging
-        grid_path = work_dir / f"page_{page_num:04d}_table_{region_idx}_grid.png"
-        cv2.imwrite(str(grid_path), cv2.cvtColor(grid_image, cv2.COLOR_RGB2BGR))
-        
-        # Run PP-Structure on the gridded image. We avoid printing raw HTML to console
-        # to prevent Windows encoding issues.
-        try:
-            # PPStructureV3 returns a list of page results
-            pp_out = pp_engine.predict(
-                str(grid_path),
-                use_wireless_table_cells_trans_to_html=True,
-                use_wired_table_cells_trans_to_html=True,
-            )
+    Returns:
+        Region dicts in pixels at ``dpi``, top to bottom; None when the page has
+        no text layer (e.g. a scan), so detection has to fall back to OpenCV
+    """
+    if not phrases(page):
+        return None
+    return [region_pixels(r, page, dpi) for r in detect_page_table_regions(page, page.number)]
 
-            if not pp_out:
-                continue
 
-            page_res = pp_out[0]
-            table_res_list = page_res.get("table_res_list") or []
-            if not table_res_list:
-                continue
+# Where a page's words come from: OCR, or the PDF text layer (see text_layer.py).
+TEXT_SOURCE_OCR = "ocr"
+TEXT_SOURCE_TEXT_LAYER = "text_layer"
 
-            for table_idx, t in enumerate(table_res_list):
-                html = t.get("pred_html") or ""
-                if not isinstance(html, str) or not html.strip():
-                    continue
 
-                rows = html_table_to_rows(html)
-                if not rows:
-                    continue
+def _to_model_input(image: np.ndarray) -> np.ndarray:
+    """Convert an RGB (or grayscale) array to the BGR layout PPStructureV3 expects."""
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
 
-                conf_by_text: Optional[Dict[str, float]] = None
-                table_ocr_pred = t.get("table_ocr_pred")
-                if isinstance(table_ocr_pred, dict):
-                    rec_texts = table_ocr_pred.get("rec_texts")
-                    rec_scores = table_ocr_pred.get("rec_scores")
-                    rec_boxes = table_ocr_pred.get("rec_boxes")
-                    # rec_scores is typically a numpy array in PaddleOCR v3
-                    if isinstance(rec_texts, list) and rec_scores is not None:
-                        try:
-                            rec_scores_list = [float(x) for x in list(rec_scores)]
-                            conf_by_text = build_confidence_by_text(rec_texts, rec_scores_list)
-                        except Exception:
-                            conf_by_text = None
 
-                    # Try domain-specific 3-column reconstruction for balance sheet-like tables.
-                    try:
-                        if (
-                            isinstance(rec_texts, list)
-                            and rec_scores is not None
-                            and rec_boxes is not None
-                            and len(rec_texts) == len(list(rec_scores))
-                            and len(rec_texts) == len(list(rec_boxes))
-                        ):
-                            toks = [
-                                OCRToken(
-                                    text=str(txt),
-                                    confidence=float(sc),
-                                    box=(float(b[0]), float(b[1]), float(b[2]), float(b[3])),
-                                )
-                                for txt, sc, b in zip(rec_texts, list(rec_scores), list(rec_boxes), strict=False)
-                                if str(txt).strip()
-                            ]
-                            bs = try_balance_sheet_3col(toks)
-                            if bs is not None:
-                                markdown, low_cells = bs
-                                tables.append(
-                                    {
-                                        "page": page_num,
-                                        "region": region_idx,
-                                        "table_index": table_idx,
-                                        "grid_image": str(grid_path),
-                                        "html": html,
-                                        "markdown": markdown,
-                                        "rows": [],
-                                        "low_confidence_cells": low_cells,
-                                    }
-                                )
-                                continue
-                    except Exception:
-                        # Fall back to HTML-based conversion below.
-                        pass
+def _init_pp_engine(use_gpu: bool) -> Any:
+    """The process's PP-Structure engine (PaddleOCR v3: PPStructureV3), created on first use."""
+    return get_pp_engine(lang="en", use_gpu=use_gpu)
 
-                markdown, low_cells = rows_to_markdown(rows, confidence_by_text=conf_by_text)
-                if not markdown.strip():
-                    continue
 
-                tables.append(
-                    {
-                        "page": page_num,
-                        "region": region_idx,
-                        "table_index": table_idx,
-                        "grid_image": str(grid_path),
-                        "html": html,
-                        "markdown": markdown,
-                        "rows": rows,
-                        "low_confidence_cells": [
+def tables_from_pp_result(
+    page_res: Dict[str, Any],
+    page_num: int,
+    region_idx: int,
+    grid_path: Optional[Path] = None,
+) -> List[Dict]:
+    """Convert one PPStructureV3 result (``table_res_list``) into table dicts."""
+    tables: List[Dict] = []
+    table_res_list = page_res.get("table_res_list") or []
+    for table_idx, t in enumerate(table_res_list):
+        html = t.get("pred_html") or ""
+        if not isinstance(html, str) or not html.strip():
+            continue
+
+        rows = html_table_to_rows(html)
+        if not rows:
+            continue
+
+        conf_by_text: Optional[Dict[str, float]] = None
+        table_ocr_pred = t.get("table_ocr_pred")
+        if isinstance(table_ocr_pred, dict):
+            rec_texts = table_ocr_pred.get("rec_texts")
+            rec_scores = table_ocr_pred.get("rec_scores")
+            rec_boxes = table_ocr_pred.get("rec_boxes")
+            # rec_scores is typically a numpy array in PaddleOCR v3
+            if isinstance(rec_texts, list) and rec_scores is not None:
+                try:
+                    rec_scores_list = [float(x) for x in list(rec_scores)]
+                    conf_by_text = build_confidence_by_text(rec_texts, rec_scores_list)
+                except Exception:
+                    conf_by_text = None
+
+            # Try domain-specific 3-column reconstruction for balance sheet-like tables.
+            try:
+                if (
+                    isinstance(rec_texts, list)
+                    and rec_scores is not None
+                    and rec_boxes is not None
+                    and len(rec_texts) == len(list(rec_scores))
+                    and len(rec_texts) == len(list(rec_boxes))
+                ):
+                    toks = [
+                        OCRToken(
+                            text=str(txt),
+                            confidence=float(sc),
+                            box=(float(b[0]), float(b[1]), float(b[2]), float(b[3])),
+                        )
+                        for txt, sc, b in zip(
+                            rec_texts, list(rec_scores), list(rec_boxes), strict=False
+                        )
+                        if str(txt).strip()
+                    ]
+                    bs = try_balance_sheet_3col(toks)
+                    if bs is not None:
+                        markdown, low_cells = bs
+                        tables.append(
                             {
-                                "row": lc.row,
-                                "col": lc.col,
-                                "text": lc.text,
-                                "confidence": lc.confidence,
+                                "page": page_num,
+                                "region": region_idx,
+                                "table_index": table_idx,
+                                "grid_image": str(grid_path) if grid_path else None,
+                                "html": html,
+                                "markdown": markdown,
+                                "rows": [],
+                                "low_confidence_cells": low_cells,
                             }
-                            for lc in low_cells
-                        ],
+                        )
+                        continue
+            except Exception:
+                # Fall back to HTML-based conversion below.
+                pass
+
+        markdown, low_cells = rows_to_markdown(rows, confidence_by_text=conf_by_text)
+        if not markdown.strip():
+            continue
+
+        tables.append(
+            {
+                "page": page_num,
+                "region": region_idx,
+                "table_index": table_idx,
+                "grid_image": str(grid_path) if grid_path else None,
+                "html": html,
+                "markdown": markdown,
+                "rows": rows,
+                "low_confidence_cells": [
+                    {
+                        "row": lc.row,
+                        "col": lc.col,
+                        "text": lc.text,
+                        "confidence": lc.confidence,
                     }
-                )
+                    for lc in low_cells
+                ],
+            }
+        )
+    return tables
+
+
+def weak_table_structure(table: Dict[str, Any]) -> bool:
+    """
+    Whether PP-Structure's structure for a table (a ``table_res_list`` entry) is too weak to keep.
+
+    The result carries no wired/wireless label, so this is judged from the
+    HTML: fewer than two rows or columns, or far fewer filled cells than OCR
+    texts in the table (several lines merged into one cell, typical of a
+    borderless table read without its column rules).
+    """
+    rows = html_table_to_rows(table.get("pred_html") or "")
+    if len(rows) < 2 or max(len(r) for r in rows) < 2:
+        return True
+    cells = sum(1 for r in rows for c in r if c.strip())
+    ocr = table.get("table_ocr_pred")
+    texts = ocr.get("rec_texts") if isinstance(ocr, dict) else None
+    return isinstance(texts, list) and len(texts) > 2 * cells
+
+
+def tables_from_tokens(
+    tokens: List[OCRToken],
+    page_num: int,
+    region_idx: int,
+    borderless: bool = False,
+) -> List[Dict]:
+    """Table dicts from the text-layer tokens of one region, as tables_from_pp_result gives them.
+
+    The balance-sheet reconstruction is tried first, then the generic row/column
+    grouping (see text_layer.py). ``borderless`` tokens are not bounded by a
+    ruled region (a whole page, or the rest of one): single-cell rows before and
+    after the grid are dropped, and it must hold three rows with figures past
+    the first column, so prose does not become a table.
+    """
+    bs = try_balance_sheet_3col(tokens)
+    if bs is not None:
+        markdown, low_cells = bs
+        rows: List[List[str]] = []
+    else:
+        rows = tokens_to_rows(tokens)
+        if borderless:
+            filled = [i for i, row in enumerate(rows) if sum(1 for c in row if c) >= 2]
+            rows = rows[filled[0]:filled[-1] + 1] if filled else []
+            numeric = sum(1 for row in rows if any(ch.isdigit() for cell in row[1:] for ch in cell))
+            if numeric < 3:
+                return []
+        markdown, _low = rows_to_markdown(rows)
+        low_cells = []
+    if not markdown.strip():
+        return []
+    return [
+        {
+            "page": page_num,
+            "region": region_idx,
+            "table_index": 0,
+            "grid_image": None,
+            "html": "",
+            "markdown": markdown,
+            "rows": rows,
+            "low_confidence_cells": low_cells,
+            "source": TEXT_SOURCE_TEXT_LAYER,
+        }
+    ]
+
+
+# predict() options for gridded table images (single or batched).
+_TABLE_PREDICT_OPTIONS: Dict[str, Any] = {
+    "use_wireless_table_cells_trans_to_html": True,
+    "use_wired_table_cells_trans_to_html": True,
+}
+
+
+def _predict_table(pp_engine: Any, grid_bgr: np.ndarray) -> Optional[Dict[str, Any]]:
+    """PP-Structure's result for one gridded table image (None if it returned nothing)."""
+    # PPStructureV3 returns a list of page results
+    pp_out = pp_engine.predict(grid_bgr, **_TABLE_PREDICT_OPTIONS)
+    return pp_out[0] if pp_out else None
+
+
+def _region_tables(
+    pp_engine: Any,
+    grid_bgr: np.ndarray,
+    page_num: int,
+    region_idx: int,
+    grid_path: Optional[Path],
+    templates: Optional[TemplateCache] = None,
+    geometry: Optional[Geometry] = None,
+    page_res: Optional[Dict[str, Any]] = None,
+) -> List[Dict]:
+    # Run PP-Structure on the gridded image (unless a batched predict already did).
+    # We avoid printing raw HTML to console to prevent Windows encoding issues.
+    try:
+        if page_res is None:
+            page_res = _predict_table(pp_engine, grid_bgr)
+        if page_res is None:
+            return []
+        if templates is not None and geometry is not None:
+            templates.learn(geometry, page_res, grid_bgr.shape[1])
+        return tables_from_pp_result(page_res, page_num, region_idx, grid_path)
+    except Exception as e:
+        print(f"  Error processing table on page {page_num}, region {region_idx}: {e}")
+        return []
+
+
+def _template_tables(
+    pp_engine: Any,
+    templates: TemplateCache,
+    geometry: Geometry,
+    grid_bgr: np.ndarray,
+    page_num: int,
+    region_idx: int,
+    grid_path: Optional[Path],
+) -> Optional[List[Dict]]:
+    """
+    Tables of a gridded region read on a cached layout template, or None on a miss.
+
+    Only regions whose rules match a template are OCR'd (PP-Structure with table
+    recognition off); their texts are laid out on the template's columns, or
+    go through the balance-sheet reconstruction as tables_from_pp_result does.
+    """
+    candidates = templates.candidates(geometry)
+    template = None
+    tokens: List[OCRToken] = []
+    if candidates:
+        try:
+            pp_out = pp_engine.predict(grid_bgr, use_table_recognition=False)
+            tokens = ocr_tokens((pp_out[0] if pp_out else {}).get("overall_ocr_res"))
         except Exception as e:
-            print(f"  Error processing table on page {page_num}, region {region_idx}: {e}")
+            print(f"  Error reading table on page {page_num}, region {region_idx}: {e}")
+        template = templates.match(candidates, tokens, grid_bgr.shape[1])
+    if template is None:
+        templates.miss()
+        return None
+
+    bs = try_balance_sheet_3col(tokens)
+    if bs is not None:
+        markdown, low_cells = bs
+        rows: List[List[str]] = []
+    else:
+        rows = template_rows(template, tokens, grid_bgr.shape[1])
+        conf_by_text = build_confidence_by_text(
+            [t.text for t in tokens], [t.confidence for t in tokens]
+        )
+        markdown, low = rows_to_markdown(rows, confidence_by_text=conf_by_text)
+        low_cells = [
+            {"row": lc.row, "col": lc.col, "text": lc.text, "confidence": lc.confidence}
+            for lc in low
+        ]
+    templates.hit(template)
+    if not markdown.strip():
+        return []
+    return [
+        {
+            "page": page_num,
+            "region": region_idx,
+            "table_index": 0,
+            "grid_image": str(grid_path) if grid_path else None,
+            "html": "",
+            "markdown": markdown,
+            "rows": rows,
+            "low_confidence_cells": low_cells,
+            "template": template.key,
+        }
+    ]
+
+
+def extract_tables_from_regions(
+    page_num: int,
+    region_crops: Iterable[Tuple[Dict, np.ndarray]],
+    work_dir: Path,
+    pp_engine: Any,
+    save_debug_images: bool = False,
+    page_prep: Optional[PagePreprocess] = None,
+    grid_engine: str = GRID_ENGINE_MORPHOLOGY,
+    pack_regions: bool = False,
+    templates: Optional[TemplateCache] = None,
+    batcher: Optional[PredictBatcher] = None,
+) -> List[Dict]:
+    """
+    Draw grids on region crops and run PP-Structure on each.
+
+    Args:
+        region_crops: (region dict, RGB or single-channel crop) pairs; the crop may
+            come from a full-page image or be clip-rendered on its own. A generator
+            keeps only one crop in memory at a time.
+        page_prep: Preprocessing of the page the crops were sliced from (region
+            boxes in its pixels); grid drawing then reuses its buffers
+        grid_engine: Grid engine for draw_table_grid ("morphology" or "projection")
+        pack_regions: Put gridded crops of at most PACK_MAX_REGION_PIXELS pixels
+            on shared canvases, one PP-Structure call per canvas (see
+            region_packing.py); tables keep their own region index, and their
+            ``canvas`` records which call found them
+        templates: Layout templates (see table_templates.py): a region matching
+            one is read with OCR only, and its table records the ``template``;
+            the others are predicted as usual and may add templates
+        batcher: Predict the page's gridded crops (and canvases) as lists of
+            several images (see predict_batch.py); they are then held until
+            every region of the page is gridded
+    """
+    tables: List[Dict] = []
+    # (region index, gridded crop, debug grid path) of crops waiting for a canvas
+    small: List[Tuple[int, np.ndarray, Optional[Path]]] = []
+    # ... and of crops waiting for a batched predict
+    pending: List[Tuple[int, np.ndarray, Optional[Path]]] = []
+    geometries: Dict[int, Geometry] = {}
+    for region_idx, (region, cropped) in enumerate(region_crops):
+        # Draw grid lines
+        prep = None
+        if page_prep is not None:
+            prep = page_prep.crop(region['x'], region['y'], region['width'], region['height'])
+        separators = find_grid_separators(cropped, prep=prep, engine=grid_engine)
+        grid_image = draw_table_grid(cropped, prep=prep, engine=grid_engine, separators=separators)
+        
+        # Gray/bitonal crops are expanded to 3 channels only here, for the model.
+        grid_bgr = _to_model_input(grid_image)
+        
+        # Save grid image for debugging (only on request; the model gets the array)
+        grid_path: Optional[Path] = None
+        if save_debug_images:
+            grid_path = work_dir / f"page_{page_num:04d}_table_{region_idx}_grid.png"
+            cv2.imwrite(str(grid_path), grid_bgr)
+
+        if templates is not None:
+            geometry = Geometry.from_separators(*separators, grid_bgr.shape[1])
+            found = _template_tables(
+                pp_engine, templates, geometry, grid_bgr, page_num, region_idx, grid_path
+            )
+            if found is not None:
+                tables.extend(found)
+                continue
+            geometries[region_idx] = geometry
+
+        if pack_regions and grid_bgr.shape[0] * grid_bgr.shape[1] <= PACK_MAX_REGION_PIXELS:
+            small.append((region_idx, grid_bgr, grid_path))
             continue
+        if batcher is not None:
+            pending.append((region_idx, grid_bgr, grid_path))
+            continue
+        tables.extend(_region_tables(
+            pp_engine, grid_bgr, page_num, region_idx, grid_path, templates,
+            geometries.get(region_idx),
+        ))
+
+    if len(small) == 1 and batcher is not None:
+        pending.append(small[0])
+    elif len(small) == 1:
+        region_idx, grid_bgr, grid_path = small[0]
+        tables.extend(_region_tables(
+            pp_engine, grid_bgr, page_num, region_idx, grid_path, templates,
+            geometries.get(region_idx),
+        ))
+    elif small:
+        tables.extend(
+            _extract_packed_tables(page_num, small, pp_engine, templates, geometries, batcher)
+        )
+    if pending:
+        results = batcher.predict(pp_engine, [g for _i, g, _p in pending], **_TABLE_PREDICT_OPTIONS)
+        for (region_idx, grid_bgr, grid_path), page_res in zip(pending, results):
+            tables.extend(_region_tables(
+                pp_engine, grid_bgr, page_num, region_idx, grid_path,
+                templates, geometries.get(region_idx), page_res,
+            ))
+    if small or pending:
+        tables.sort(key=lambda t: (t["region"], t["table_index"]))
     
-    return tables, pp_engine
+    return tables
 
 
-def extract_table_structure_from_ocr(ocr_result: List, page_num: int, region_idx: int) -> Optional[Dict]:
+def _extract_packed_tables(
+    page_num: int,
+    small: List[Tuple[int, np.ndarray, Optional[Path]]],
+    pp_engine: Any,
+    templates: Optional[TemplateCache] = None,
+    geometries: Optional[Dict[int, Geometry]] = None,
+    batcher: Optional[PredictBatcher] = None,
+) -> List[Dict]:
+    """Tables of small gridded crops, predicted a canvas (or a batch of canvases) at a time.
+
+    See region_packing.py.
     """
-    Extract structured table data from PaddleOCR result.
+    crops = {region_idx: (grid_bgr, grid_path) for region_idx, grid_bgr, grid_path in small}
+    canvases = pack_crops(
+        [(region_idx, grid_bgr) for region_idx, grid_bgr, _path in small],
+        gutter=PACK_GUTTER_PX,
+        max_width=PACK_CANVAS_WIDTH,
+        max_height=PACK_CANVAS_HEIGHT,
+    )
+    print(f"    Packed {len(small)} small table regions onto {len(canvases)} canvas(es)")
+    batched: List[Optional[Dict[str, Any]]] = [None] * len(canvases)
+    if batcher is not None:
+        batched = batcher.predict(
+            pp_engine, [canvas for canvas, _slots in canvases], **_TABLE_PREDICT_OPTIONS
+        )
+    tables: List[Dict] = []
+    for canvas_idx, (canvas, slots) in enumerate(canvases):
+        per_slot = None
+        try:
+            page_res = batched[canvas_idx]
+            if page_res is None:
+                page_res = _predict_table(pp_engine, canvas)
+            per_slot = split_result(page_res or {}, slots)
+        except Exception as e:
+            print(f"  Error processing table canvas {canvas_idx} on page {page_num}: {e}")
+        if per_slot is not None:
+            for slot in slots:
+                if templates is not None and geometries and slot.key in geometries:
+                    templates.learn(geometries[slot.key], per_slot[slot.key], slot.width)
+                found = tables_from_pp_result(
+                    per_slot[slot.key], page_num, slot.key, crops[slot.key][1]
+                )
+                for table in found:
+                    table["canvas"] = canvas_idx
+                tables.extend(found)
+            continue
+        # Tables the canvas result cannot attribute: these crops one by one.
+        for slot in slots:
+            grid_bgr, grid_path = crops[slot.key]
+            tables.extend(_region_tables(
+                pp_engine, grid_bgr, page_num, slot.key, grid_path,
+                templates, (geometries or {}).get(slot.key),
+            ))
+    return tables
+
+
+def process_page_for_tables(
+    page_num: int,
+    image: Union[np.ndarray, Path],
+    work_dir: Path,
+    pp_engine: Optional[Any] = None,
+    use_gpu: bool = True,
+    save_debug_images: bool = False,
+    dpi: int = 300,
+    grid_engine: str = GRID_ENGINE_MORPHOLOGY,
+    pack_regions: bool = False,
+    templates: Optional[TemplateCache] = None,
+    batcher: Optional[PredictBatcher] = None,
+    regions: Optional[List[Dict]] = None,
+    join_fragments: bool = True,
+) -> tuple[List[Dict], Any]:
+    """
+    Process a single page to extract all tables.
+    
+    Args:
+        image: Page image as RGB or single-channel array (a path is decoded for compatibility)
+        work_dir: Directory for debug grid images
+        save_debug_images: Write each gridded region as ``*_grid.png``; otherwise
+            the whole page stays in memory and ``grid_image`` is None
+        dpi: DPI the page was rendered at (scales the region detection)
+        grid_engine: Grid engine for draw_table_grid ("morphology" or "projection")
+        regions: Table regions found without the page image (e.g. detect_vector_regions);
+            OpenCV region detection runs only when None
+        join_fragments: Merge adjacent region fragments, not only overlapping
+            regions (False for prepass blocks; see _merged_regions)
+        pack_regions: Predict small regions together on shared canvases
+            (see extract_tables_from_regions)
+        templates: Layout templates for OCR-only reads (see extract_tables_from_regions)
+        batcher: Multi-image predicts for the page's regions (see extract_tables_from_regions)
     
     Returns:
-        Dict with 'rows', 'columns', 'cells', 'confidence_scores'
+        List of table dictionaries with structure, markdown, and metadata
     """
-    if not ocr_result:
-        return None
+    # Lazy initialization of PP-Structure engine (PaddleOCR v3: PPStructureV3)
+    if pp_engine is None:
+        pp_engine = _init_pp_engine(use_gpu)
+    
+    if not isinstance(image, np.ndarray):
+        image = _load_image(Path(image))
+        if image is None:
+            return [], pp_engine
+    image_rgb = image
+    
+    prep: Optional[PagePreprocess] = None
+    if regions is None:
+        # Gray, binary and line masks once per page; detection and grid drawing share them
+        prep = preprocess_page(image_rgb, scale=dpi / 300)
+        regions = detect_table_regions_in_image(image_rgb, scale=dpi / 300, prep=prep)
+    regions = _merged_regions(regions, dpi / 300, join_fragments)
+    
+    if not regions:
+        # If no regions detected, try processing entire page
+        regions = [{'x': 0, 'y': 0, 'width': image.shape[1], 'height': image.shape[0]}]
+    
+    # Crop regions (views into the page array, no copies)
+    region_crops = [
+        (r, image_rgb[r['y']:r['y'] + r['height'], r['x']:r['x'] + r['width']])
+        for r in regions
+    ]
+    tables = extract_tables_from_regions(
+        page_num,
+        region_crops,
+        work_dir,
+        pp_engine,
+        save_debug_images=save_debug_images,
+        page_prep=prep,
+        grid_engine=grid_engine,
+        pack_regions=pack_regions,
+        templates=templates,
+        batcher=batcher,
+    )
+    return tables, pp_engine
+
+
+def extract_table_structure_from_ocr(ocr_result: List, page_num: int, region_idx: int) -> Optional[Dict]:
+    """
+    Extract structured table data from PaddleOCR result.
+    
+    Returns:
+        Dict with 'rows', 'columns', 'cells', 'confidence_scores'
+    """
+    if not ocr_result:
+        return None
     
     # PaddleOCR returns: [[[[x1,y1], [x2,y2], [x3,y3], [x4,y4]], (text, confidence)], ...]
     # or sometimes nested differently
@@ -581,6 +1290,697 @@ def table_to_markdown(table_data: Dict, table_title: str = "") -> str:
     return "\n".join(lines)
 
 
+def _predict_raw(pp_engine: Any, model_input: np.ndarray) -> Dict[str, Any]:
+    """Run PP-Structure on a whole page (or tile) and return its raw result dict."""
+    raw_out = pp_engine.predict(model_input)
+    if not raw_out or not isinstance(raw_out, list) or not isinstance(raw_out[0], dict):
+        return {}
+    return raw_out[0]
+
+
+def _ocr_tokens(page_res: Dict[str, Any]) -> Tuple[List[str], Any]:
+    """(rec_texts, rec_boxes) of the page OCR in a PP-Structure result; empty if absent."""
+    overall = page_res.get("overall_ocr_res")
+    if isinstance(overall, dict):
+        rec_texts = overall.get("rec_texts") or []
+        rec_boxes = overall.get("rec_boxes")
+        if isinstance(rec_texts, list) and rec_boxes is not None:
+            return rec_texts, rec_boxes
+    return [], []
+
+
+def _predict_page(pp_engine: Any, model_input: np.ndarray) -> Tuple[str, Dict[str, Any]]:
+    """Run PP-Structure on a whole page.
+
+    Returns:
+        (reading-order OCR text, raw page result dict)
+    """
+    page_res = _predict_raw(pp_engine, model_input)
+    rec_texts, rec_boxes = _ocr_tokens(page_res)
+    if not rec_texts:
+        return "", page_res
+    return _group_text_lines_from_ocr(rec_texts, rec_boxes), page_res
+
+
+def _ocr_page_text(pp_engine: Any, model_input: np.ndarray) -> str:
+    """OCR a whole page with PP-Structure and return reading-order text."""
+    return _predict_page(pp_engine, model_input)[0]
+
+
+def _layout_table_boxes(page_res: Dict[str, Any]) -> List[Tuple[float, float, float, float]]:
+    """Table boxes (x0, y0, x1, y1 in image pixels) from PP-Structure layout detection."""
+    layout = page_res.get("layout_det_res")
+    boxes = layout.get("boxes") if isinstance(layout, dict) else None
+    out: List[Tuple[float, float, float, float]] = []
+    for box in boxes or []:
+        if not isinstance(box, dict) or str(box.get("label", "")).lower() != "table":
+            continue
+        try:
+            x0, y0, x1, y1 = (float(v) for v in list(box.get("coordinate"))[:4])
+        except Exception:
+            continue
+        out.append((x0, y0, x1, y1))
+    return out
+
+
+def _pixels_to_clip(
+    box: Tuple[float, float, float, float],
+    dpi: int,
+    page_size: Tuple[float, float],
+    pad_px: float = 0.0,
+) -> Tuple[float, float, float, float]:
+    """Map a pixel box at ``dpi`` to a PDF-point clip rectangle clamped to the page."""
+    k = 72.0 / dpi
+    x0, y0, x1, y1 = box
+    return (
+        max(0.0, (x0 - pad_px) * k),
+        max(0.0, (y0 - pad_px) * k),
+        min(page_size[0], (x1 + pad_px) * k),
+        min(page_size[1], (y1 + pad_px) * k),
+    )
+
+
+def _clip_region_crops(
+    page_renderer: Any,
+    page_num: int,
+    clips: List[Tuple[float, float, float, float]],
+    *,
+    dpi: int,
+    color_mode: str,
+    clip_dpis: List[int],
+    max_pixels: Optional[int] = None,
+) -> Iterator[Tuple[Dict, np.ndarray]]:
+    """Clip-render table rectangles (PDF points) one at a time, as region crops.
+
+    Region boxes are page pixels at ``dpi``. A clip that would exceed
+    ``max_pixels`` at ``dpi`` is rendered at the highest DPI that fits; the DPI
+    of every yielded crop is appended to ``clip_dpis``.
+    """
+    zoom = dpi / 72
+    for x0, y0, x1, y1 in clips:
+        if x1 - x0 < 1 or y1 - y0 < 1:
+            continue
+        clip_dpi = fit_dpi(x1 - x0, y1 - y0, dpi, max_pixels) if max_pixels else dpi
+        crop = page_renderer.render_clip(page_num, clip_dpi, (x0, y0, x1, y1), color_mode)
+        region = {
+            'x': int(round(x0 * zoom)),
+            'y': int(round(y0 * zoom)),
+            'width': int(round((x1 - x0) * zoom)),
+            'height': int(round((y1 - y0) * zoom)),
+        }
+        clip_dpis.append(clip_dpi)
+        yield region, crop
+
+
+def _box_cropper(image: np.ndarray) -> Callable[[Dict], np.ndarray]:
+    """Views of a rendered page for region dicts, for detect_vector_regions."""
+    def crop_box(box: Dict) -> np.ndarray:
+        return image[box['y']:box['y'] + box['height'], box['x']:box['x'] + box['width']]
+
+    return crop_box
+
+
+def _box_renderer(
+    page_renderer: Any,
+    page_num: int,
+    dpi: int,
+    page_size: Tuple[float, float],
+    max_pixels: Optional[int] = None,
+) -> Callable[[Dict], Optional[np.ndarray]]:
+    """Gray clip renders of page-pixel region dicts at ``dpi``, for detect_vector_regions.
+
+    A box above ``max_pixels`` gives None (the page then falls back to OpenCV).
+    """
+    def render_box(box: Dict) -> Optional[np.ndarray]:
+        if max_pixels and box['width'] * box['height'] > max_pixels:
+            return None
+        clip = _pixels_to_clip(
+            (box['x'], box['y'], box['x'] + box['width'], box['y'] + box['height']), dpi, page_size
+        )
+        return page_renderer.render_clip(page_num, dpi, clip, COLOR_GRAY)
+
+    return render_box
+
+
+def _page_pixels(page_size: Tuple[float, float], dpi: int) -> int:
+    """Pixel count of a full-page render of ``page_size`` (PDF points) at ``dpi``."""
+    return round(page_size[0] * dpi / 72) * round(page_size[1] * dpi / 72)
+
+
+def _preview_image_name(page_num: int) -> str:
+    """Saved image of a page not rendered whole (tiled or text-layer): a lower-DPI preview."""
+    return f"page_{page_num:04d}_preview.png"
+
+
+def _process_page_two_pass(
+    page_renderer: Any,
+    page_num: int,
+    *,
+    dpi: int,
+    triage_dpi: int,
+    text_dpi: int,
+    tables_dir: Path,
+    pp_engine: Optional[Any],
+    use_gpu: bool,
+    save_debug_images: bool,
+    color_mode: str = COLOR_RGB,
+    max_pixels: Optional[int] = None,
+    grid_engine: str = GRID_ENGINE_MORPHOLOGY,
+    pack_regions: bool = False,
+    templates: Optional[TemplateCache] = None,
+    batcher: Optional[PredictBatcher] = None,
+    thumb_regions: Optional[List[Dict]] = None,
+    page_size: Optional[Tuple[float, float]] = None,
+    join_fragments: bool = True,
+) -> Tuple[np.ndarray, str, List[Dict], Any]:
+    """Two-pass page: triage at low DPI, clip-render only table regions at ``dpi``.
+
+    Pass 1 renders a ``triage_dpi`` thumbnail for OpenCV region detection and a
+    ``text_dpi`` page for the page-text OCR (whose layout boxes also catch
+    borderless tables). Pass 2 rasterizes just those table rectangles at ``dpi``.
+    With ``max_pixels``, the text page and each table clip are rendered at a
+    lower DPI where needed to stay within that many pixels.
+
+    ``thumb_regions`` (pixels at ``triage_dpi``, e.g. from detect_vector_regions)
+    replace the thumbnail; ``page_size`` in PDF points must then be given.
+    ``join_fragments`` is passed to _merged_regions.
+
+    Returns:
+        (page image at text_dpi, page text, tables, engine)
+    """
+    if thumb_regions is None:
+        # Detection thresholds to gray anyway; the thumbnail never needs colour.
+        thumb = page_renderer.render_page(page_num, triage_dpi, COLOR_GRAY)
+        thumb_regions = detect_table_regions_in_image(thumb, scale=triage_dpi / 300)
+        page_size = (thumb.shape[1] * 72.0 / triage_dpi, thumb.shape[0] * 72.0 / triage_dpi)
+    thumb_regions = _merged_regions(thumb_regions, triage_dpi / 300, join_fragments)
+
+    clips = [
+        _pixels_to_clip(
+            (r['x'], r['y'], r['x'] + r['width'], r['y'] + r['height']),
+            triage_dpi,
+            page_size,
+            pad_px=2,
+        )
+        for r in thumb_regions
+    ]
+
+    if max_pixels:
+        text_dpi = fit_dpi(page_size[0], page_size[1], text_dpi, max_pixels)
+    page_image = page_renderer.render_page(page_num, text_dpi, color_mode)
+    if pp_engine is None:
+        pp_engine = _init_pp_engine(use_gpu)
+    page_text = ""
+    page_res: Dict[str, Any] = {}
+    try:
+        page_text, page_res = _predict_page(pp_engine, _to_model_input(page_image))
+    except Exception:
+        page_text = ""
+
+    if not clips:
+        # No ruled regions: fall back to tables the layout model found on the page.
+        clips = [_pixels_to_clip(b, text_dpi, page_size) for b in _layout_table_boxes(page_res)]
+
+    clip_dpis: List[int] = []
+    region_crops = _clip_region_crops(
+        page_renderer,
+        page_num,
+        clips,
+        dpi=dpi,
+        color_mode=color_mode,
+        clip_dpis=clip_dpis,
+        max_pixels=max_pixels,
+    )
+    page_tables = extract_tables_from_regions(
+        page_num,
+        region_crops,
+        tables_dir,
+        pp_engine,
+        save_debug_images=save_debug_images,
+        grid_engine=grid_engine,
+        pack_regions=pack_regions,
+        templates=templates,
+        batcher=batcher,
+    )
+    for table in page_tables:
+        table["dpi"] = clip_dpis[table["region"]]
+    return page_image, page_text, page_tables, pp_engine
+
+
+def _process_page_tiled(
+    page_renderer: Any,
+    page_num: int,
+    *,
+    dpi: int,
+    page_size: Tuple[float, float],
+    max_pixels: int,
+    overlap: int,
+    tables_dir: Path,
+    pp_engine: Optional[Any],
+    use_gpu: bool,
+    save_debug_images: bool,
+    color_mode: str = COLOR_RGB,
+    preview: bool = False,
+    grid_engine: str = GRID_ENGINE_MORPHOLOGY,
+    pack_regions: bool = False,
+    templates: Optional[TemplateCache] = None,
+    batcher: Optional[PredictBatcher] = None,
+    regions: Optional[List[Dict]] = None,
+    join_fragments: bool = True,
+) -> Tuple[Optional[np.ndarray], str, List[Dict], Any, int]:
+    """Large page: OCR and region detection tile by tile, never the whole page at ``dpi``.
+
+    Each tile (see page_tiling.py) is clip-rendered, OCR'd and scanned for ruled
+    regions, then dropped. Results are stitched in page pixels at ``dpi``: an OCR
+    token is kept only by the tile owning its centre, and regions cut by tile
+    edges (or found twice in an overlap band) are merged. Each merged table
+    region is clip-rendered on its own, at a lower DPI if it would still exceed
+    ``max_pixels``. With ``preview`` the whole page is also rendered at the DPI
+    that fits the budget, for ``page_images``. ``regions`` (page pixels at
+    ``dpi``, e.g. from detect_vector_regions) replace the per-tile detection;
+    ``join_fragments`` is passed to _merged_regions.
+
+    Returns:
+        (preview image or None, page text, tables, engine, tile count)
+    """
+    width, height = round(page_size[0] * dpi / 72), round(page_size[1] * dpi / 72)
+    tiles = plan_tiles(width, height, max_pixels, overlap)
+    if pp_engine is None:
+        pp_engine = _init_pp_engine(use_gpu)
+
+    k = 72.0 / dpi
+    tokens: List[Tuple[str, Tuple[float, float, float, float]]] = []
+    ruled: List[Dict] = list(regions or [])
+    layout: List[Tuple[float, float, float, float]] = []
+    for tile in tiles:
+        x0, y0, x1, y1 = tile.box
+        crop = page_renderer.render_clip(
+            page_num, dpi, (x0 * k, y0 * k, x1 * k, y1 * k), color_mode
+        )
+        if regions is None:
+            for r in detect_table_regions_in_image(crop, scale=dpi / 300):
+                ruled.append({**r, 'x': x0 + r['x'], 'y': y0 + r['y']})
+        try:
+            page_res = _predict_raw(pp_engine, _to_model_input(crop))
+        except Exception:
+            continue
+        rec_texts, rec_boxes = _ocr_tokens(page_res)
+        tokens.extend(owned_tokens(tile, rec_texts, rec_boxes))
+        layout.extend(
+            (x0 + a, y0 + b, x0 + c, y0 + d) for a, b, c, d in _layout_table_boxes(page_res)
+        )
+    page_text = _group_text_lines_from_ocr([t for t, _ in tokens], [b for _, b in tokens])
+
+    # Ruled regions (merged where tiles cut them) first; else tables the layout
+    # model found; else the whole page.
+    boxes = [
+        (r['x'], r['y'], r['x'] + r['width'], r['y'] + r['height'])
+        for r in _merged_regions(ruled, dpi / 300, join_fragments)
+    ]
+    boxes = boxes or merge_boxes(layout) or [(0, 0, width, height)]
+    clip_dpis: List[int] = []
+    region_crops = _clip_region_crops(
+        page_renderer,
+        page_num,
+        [_pixels_to_clip(b, dpi, page_size) for b in boxes],
+        dpi=dpi,
+        color_mode=color_mode,
+        clip_dpis=clip_dpis,
+        max_pixels=max_pixels,
+    )
+    page_tables = extract_tables_from_regions(
+        page_num,
+        region_crops,
+        tables_dir,
+        pp_engine,
+        save_debug_images=save_debug_images,
+        grid_engine=grid_engine,
+        pack_regions=pack_regions,
+        templates=templates,
+        batcher=batcher,
+    )
+    for table in page_tables:
+        table["dpi"] = clip_dpis[table["region"]]
+
+    image = None
+    if preview:
+        image = page_renderer.render_page(
+            page_num, fit_dpi(page_size[0], page_size[1], dpi, max_pixels), color_mode
+        )
+    return image, page_text, page_tables, pp_engine, len(tiles)
+
+
+def _scaled_regions(regions: List[Dict], factor: float) -> List[Dict]:
+    """Region dicts in pixels at ``factor`` times their DPI."""
+    return [
+        {
+            'x': int(r['x'] * factor),
+            'y': int(r['y'] * factor),
+            'width': int(np.ceil(r['width'] * factor)),
+            'height': int(np.ceil(r['height'] * factor)),
+        }
+        for r in regions
+    ]
+
+
+def _process_page_text_layer(
+    page_renderer: Any,
+    page: "fitz.Page",
+    page_num: int,
+    tokens: List[OCRToken],
+    regions: List[Dict],
+    *,
+    dpi: int,
+    tables_dir: Path,
+    pp_engine: Optional[Any],
+    use_gpu: bool,
+    save_debug_images: bool,
+    color_mode: str = COLOR_RGB,
+    max_pixels: Optional[int] = None,
+    grid_engine: str = GRID_ENGINE_MORPHOLOGY,
+    pack_regions: bool = False,
+    templates: Optional[TemplateCache] = None,
+    batcher: Optional[PredictBatcher] = None,
+    join_fragments: bool = True,
+) -> Tuple[str, List[Dict], Any]:
+    """Born-digital page: text and tables from the text layer, OCR only where it fails.
+
+    ``tokens`` are the page's text-layer tokens and ``regions`` its table
+    regions, both in page pixels at ``dpi``. Each region's tokens go through the
+    balance-sheet reconstruction and the generic row/column grouping; a region
+    with garbled words or mostly covered by a raster image is gridded and sent
+    to PP-Structure instead, clip-rendered (within ``max_pixels``); the page is
+    never rendered whole. Regions without words, and small images (logos), hold no
+    table text and are skipped. The tokens outside every region (borderless
+    tables) are grouped as one more region, index ``len(regions)``.
+    ``join_fragments`` is passed to _merged_regions.
+
+    Returns:
+        (page text, tables, engine; None until a region needed OCR)
+    """
+    page_text = _group_text_lines_from_ocr([t.text for t in tokens], [t.box for t in tokens])
+
+    regions = _merged_regions(regions, dpi / 300, join_fragments)
+    images = image_boxes(page, dpi)
+    page_tables: List[Dict] = []
+    ocr_regions: List[Tuple[int, Dict]] = []
+    for region_idx, region in enumerate(regions):
+        region_tokens = tokens_in(tokens, region)
+        if covered_share(region, images) > TEXT_LAYER_MAX_IMAGE_SHARE:
+            if region['width'] >= TEXT_LAYER_MIN_IMAGE_TABLE_PT * dpi / 72:
+                ocr_regions.append((region_idx, region))
+        elif region_tokens and garbled_share(region_tokens) > TEXT_LAYER_MAX_GARBLED:
+            ocr_regions.append((region_idx, region))
+        elif region_tokens:
+            page_tables.extend(tables_from_tokens(region_tokens, page_num, region_idx))
+    rest = [t for t in tokens if not any(in_region(t, r) for r in regions)]
+    page_tables.extend(tables_from_tokens(rest, page_num, len(regions), borderless=True))
+
+    if ocr_regions:
+        if pp_engine is None:
+            pp_engine = _init_pp_engine(use_gpu)
+        clip_dpis: List[int] = []
+        page_size = (page.rect.width, page.rect.height)
+        region_crops = _clip_region_crops(
+            page_renderer,
+            page_num,
+            [
+                _pixels_to_clip(
+                    (r['x'], r['y'], r['x'] + r['width'], r['y'] + r['height']), dpi, page_size
+                )
+                for _idx, r in ocr_regions
+            ],
+            dpi=dpi,
+            color_mode=color_mode,
+            clip_dpis=clip_dpis,
+            max_pixels=max_pixels,
+        )
+        ocr_tables = extract_tables_from_regions(
+            page_num,
+            region_crops,
+            tables_dir,
+            pp_engine,
+            save_debug_images=save_debug_images,
+            grid_engine=grid_engine,
+            pack_regions=pack_regions,
+            templates=templates,
+            batcher=batcher,
+        )
+        for table in ocr_tables:
+            table["dpi"] = clip_dpis[table["region"]]
+            table["region"] = ocr_regions[table["region"]][0]
+        page_tables.extend(ocr_tables)
+        page_tables.sort(key=lambda t: (t["region"], t["table_index"]))
+    return page_text, page_tables, pp_engine
+
+
+def _process_page_layout(
+    page_num: int,
+    image: np.ndarray,
+    *,
+    dpi: int,
+    tables_dir: Path,
+    pp_engine: Any,
+    use_gpu: bool,
+    save_debug_images: bool,
+    grid_engine: str,
+    pack_regions: bool,
+    templates: Optional[TemplateCache] = None,
+    batcher: Optional[PredictBatcher] = None,
+) -> Tuple[str, List[Dict], Any, bool]:
+    """Whole page through PP-Structure once; its layout and table results are the tables.
+
+    The one predict gives the page text and every table the layout model
+    found. A table whose structure is weak (see weak_table_structure), or a
+    layout table box without a recognized table, is cropped from the page,
+    gridded with OpenCV and predicted again on its own. When the model finds no
+    table at all, the page falls back to OpenCV region detection
+    (process_page_for_tables).
+
+    Returns:
+        (page text, tables, engine, whether the layout regions were used)
+    """
+    if pp_engine is None:
+        pp_engine = _init_pp_engine(use_gpu)
+    page_text = ""
+    page_res: Dict[str, Any] = {}
+    try:
+        page_res = _predict_table(pp_engine, _to_model_input(image)) or {}
+        rec_texts, rec_boxes = _ocr_tokens(page_res)
+        if rec_texts:
+            page_text = _group_text_lines_from_ocr(rec_texts, rec_boxes)
+    except Exception as e:
+        print(f"  Error processing page {page_num} with the layout model: {e}")
+
+    entries = [t for t in page_res.get("table_res_list") or [] if isinstance(t, dict)]
+    layout_boxes = _layout_table_boxes(page_res)
+    if not entries and not layout_boxes:
+        tables, pp_engine = process_page_for_tables(
+            page_num,
+            image,
+            tables_dir,
+            pp_engine=pp_engine,
+            use_gpu=use_gpu,
+            save_debug_images=save_debug_images,
+            dpi=dpi,
+            grid_engine=grid_engine,
+            pack_regions=pack_regions,
+            templates=templates,
+            batcher=batcher,
+        )
+        return page_text, tables, pp_engine, False
+
+    height, width = image.shape[:2]
+    pad = round(10 * dpi / 300)
+    tables: List[Dict] = []
+    # (region index, page box) of tables to grid and predict again
+    redo: List[Tuple[int, Tuple[float, float, float, float]]] = []
+    located: List[Tuple[float, float, float, float]] = []
+    for region_idx, entry in enumerate(entries):
+        box = table_extent(entry)
+        if box is not None:
+            located.append(box)
+        if weak_table_structure(entry) and box is not None:
+            redo.append((region_idx, box))
+            continue
+        tables.extend(tables_from_pp_result({"table_res_list": [entry]}, page_num, region_idx))
+    # Layout tables the table recognizer left without a result
+    missing = [box for box in layout_boxes if not any(_contains(box, b) for b in located)]
+    redo.extend((len(entries) + k, box) for k, box in enumerate(missing))
+
+    if redo:
+        regions = []
+        for _idx, (x0, y0, x1, y1) in redo:
+            x0, y0 = max(0, int(x0) - pad), max(0, int(y0) - pad)
+            x1, y1 = min(width, int(np.ceil(x1)) + pad), min(height, int(np.ceil(y1)) + pad)
+            regions.append({'x': x0, 'y': y0, 'width': max(1, x1 - x0), 'height': max(1, y1 - y0)})
+        gridded = extract_tables_from_regions(
+            page_num,
+            [(r, image[r['y']:r['y'] + r['height'], r['x']:r['x'] + r['width']]) for r in regions],
+            tables_dir,
+            pp_engine,
+            save_debug_images=save_debug_images,
+            grid_engine=grid_engine,
+            pack_regions=pack_regions,
+            templates=templates,
+            batcher=batcher,
+        )
+        for table in gridded:
+            table["region"] = redo[table["region"]][0]
+        tables.extend(gridded)
+        tables.sort(key=lambda t: (t["region"], t["table_index"]))
+    return page_text, tables, pp_engine, True
+
+
+def _contains(
+    outer: Tuple[float, float, float, float], inner: Tuple[float, float, float, float]
+) -> bool:
+    """Whether the centre of ``inner`` lies in ``outer``."""
+    cx, cy = (inner[0] + inner[2]) / 2, (inner[1] + inner[3]) / 2
+    return outer[0] <= cx <= outer[2] and outer[1] <= cy <= outer[3]
+
+
+def _page_text_outside(
+    page_res: Dict[str, Any], boxes: List[Tuple[float, float, float, float]]
+) -> str:
+    """Reading-order page OCR text without the tokens whose centre lies in one of ``boxes``."""
+    rec_texts, rec_boxes = _ocr_tokens(page_res)
+    if not rec_texts:
+        return ""
+    if boxes:
+        try:
+            kept = [
+                (text, b) for text, b in zip(rec_texts, list(rec_boxes), strict=False)
+                if not any(_contains(box, tuple(float(v) for v in list(b)[:4])) for box in boxes)
+            ]
+        except Exception:
+            kept = list(zip(rec_texts, list(rec_boxes), strict=False))
+        rec_texts, rec_boxes = [t for t, _b in kept], [b for _t, b in kept]
+    return _group_text_lines_from_ocr(rec_texts, rec_boxes)
+
+
+def _process_page_single_pass(
+    page_num: int,
+    image: np.ndarray,
+    regions: Optional[List[Dict]],
+    *,
+    dpi: int,
+    tables_dir: Path,
+    pp_engine: Any,
+    use_gpu: bool,
+    save_debug_images: bool,
+    grid_engine: str,
+    pack_regions: bool,
+    templates: Optional[TemplateCache] = None,
+    batcher: Optional[PredictBatcher] = None,
+    join_fragments: bool = True,
+) -> Tuple[str, List[Dict], Any]:
+    """One PP-Structure predict per page for its text and tables.
+
+    Regions are predicted again only when the first pass got them wrong.
+
+    The whole page is predicted once. Its tables are matched to the page's
+    table regions (``regions``, or OpenCV detection when None) by their
+    centre. A region is cropped, gridded and predicted on its own only when no
+    table of the first pass lies in it, or only one with weak structure (see
+    weak_table_structure); a first-pass table outside every region is kept, or
+    regridded on its own box when weak, as are layout table boxes the table
+    recognizer left empty. A page without table regions or tables costs the
+    one predict. The page text leaves out the OCR texts inside the tables'
+    boxes, so table pixels are not read into the text a second time.
+    ``join_fragments`` is passed to _merged_regions.
+
+    Returns:
+        (page text, tables, engine)
+    """
+    if pp_engine is None:
+        pp_engine = _init_pp_engine(use_gpu)
+    page_res: Dict[str, Any] = {}
+    try:
+        page_res = _predict_table(pp_engine, _to_model_input(image)) or {}
+    except Exception as e:
+        print(f"  Error processing page {page_num}: {e}")
+
+    prep: Optional[PagePreprocess] = None
+    if regions is None:
+        prep = preprocess_page(image, scale=dpi / 300)
+        regions = detect_table_regions_in_image(image, scale=dpi / 300, prep=prep)
+    regions = _merged_regions(regions, dpi / 300, join_fragments)
+    region_boxes = [
+        (float(r['x']), float(r['y']), float(r['x'] + r['width']), float(r['y'] + r['height']))
+        for r in regions
+    ]
+
+    # Slots: (page box, first-pass table to keep or None to predict the box again)
+    slots: List[Tuple[Optional[Tuple[float, float, float, float]], Optional[Dict[str, Any]]]] = []
+    in_region: Dict[int, List[Dict[str, Any]]] = {}
+    located: List[Tuple[float, float, float, float]] = []
+    for entry in page_res.get("table_res_list") or []:
+        if not isinstance(entry, dict):
+            continue
+        box = table_extent(entry)
+        if box is not None:
+            located.append(box)
+            hit = next((i for i, r in enumerate(region_boxes) if _contains(r, box)), None)
+            if hit is not None:
+                in_region.setdefault(hit, []).append(entry)
+                continue
+        slots.append((box, None if box is not None and weak_table_structure(entry) else entry))
+    for i, box in enumerate(region_boxes):
+        strong = [e for e in in_region.get(i, []) if not weak_table_structure(e)]
+        if strong:
+            slots.extend((table_extent(e), e) for e in strong)
+        else:
+            slots.append((box, None))
+    # Layout tables the table recognizer left without a result
+    for box in _layout_table_boxes(page_res):
+        if not any(_contains(box, b) for b in located) and not any(
+            _contains(r, box) for r in region_boxes
+        ):
+            slots.append((box, None))
+    slots.sort(key=lambda s: (s[0][1], s[0][0]) if s[0] is not None else (float("inf"), 0.0))
+
+    height, width = image.shape[:2]
+    pad = round(10 * dpi / 300)
+    tables: List[Dict] = []
+    redo: List[Tuple[int, Dict]] = []  # (region index, region dict) to grid and predict
+    for region_idx, (box, entry) in enumerate(slots):
+        if entry is not None:
+            tables.extend(tables_from_pp_result({"table_res_list": [entry]}, page_num, region_idx))
+            continue
+        x0, y0 = max(0, int(box[0]) - pad), max(0, int(box[1]) - pad)
+        x1, y1 = min(width, int(np.ceil(box[2])) + pad), min(height, int(np.ceil(box[3])) + pad)
+        redo.append(
+            (region_idx, {'x': x0, 'y': y0, 'width': max(1, x1 - x0), 'height': max(1, y1 - y0)})
+        )
+
+    if redo:
+        gridded = extract_tables_from_regions(
+            page_num,
+            [
+                (r, image[r['y']:r['y'] + r['height'], r['x']:r['x'] + r['width']])
+                for _idx, r in redo
+            ],
+            tables_dir,
+            pp_engine,
+            save_debug_images=save_debug_images,
+            page_prep=prep,
+            grid_engine=grid_engine,
+            pack_regions=pack_regions,
+            templates=templates,
+            batcher=batcher,
+        )
+        for table in gridded:
+            table["region"] = redo[table["region"]][0]
+        tables.extend(gridded)
+        tables.sort(key=lambda t: (t["region"], t["table_index"]))
+
+    # Mask the slots that gave a table from the page text.
+    found = {t["region"] for t in tables}
+    masked = [box for idx, (box, _entry) in enumerate(slots) if idx in found and box is not None]
+    return _page_text_outside(page_res, masked), tables, pp_engine
+
+
 def process_all_pages_comprehensive(
     pdf_path: Path,
     work_dir: Path,
@@ -588,126 +1988,840 @@ def process_all_pages_comprehensive(
     max_pages: Optional[int] = None,
     start_page: int = 1,
     use_gpu: bool = True,
+    renderer: str = DEFAULT_RENDERER,
+    session: Optional[DocumentSession] = None,
+    save_page_images: bool = True,
+    save_debug_images: bool = False,
+    two_pass: bool = False,
+    triage_dpi: int = TWO_PASS_TRIAGE_DPI,
+    text_dpi: int = TWO_PASS_TEXT_DPI,
+    render_cache: Optional[RenderCache] = None,
+    color_mode: str = COLOR_RGB,
+    use_page_store: bool = False,
+    dpi_planner: Optional[DpiPlanner] = None,
+    skip_pages: bool = False,
+    tile_max_pixels: int = PAGE_TILE_MAX_PIXELS,
+    tile_overlap: int = PAGE_TILE_OVERLAP_PX,
+    grid_engine: str = GRID_ENGINE_MORPHOLOGY,
+    pack_regions: bool = False,
+    templates: Optional[TemplateCache] = None,
+    region_source: str = REGIONS_OPENCV,
+    text_layer: bool = False,
+    single_pass: bool = False,
+    predict_batch: int = PREDICT_BATCH_SIZE,
+    predict_batch_pixels: int = PREDICT_BATCH_MAX_PIXELS,
+    workers: int = 1,
 ) -> Dict:
     """
     Process entire PDF comprehensively: all pages, all tables.
+
+    Pages are rendered to memory and passed as arrays through region detection,
+    grid drawing and PP-Structure; nothing is re-read from disk.
+
+    ``renderer`` selects the page rendering backend (``pdf2image`` or ``pymupdf``).
+    ``session`` is an open DocumentSession to reuse; one is opened here if None.
+    ``save_page_images`` writes ``page_images/page_NNNN.png`` (referenced from the
+    markdown, and reused on resume); ``save_debug_images`` writes the gridded
+    region crops. With both off the run does no image I/O at all.
+
+    ``two_pass`` renders a ``triage_dpi`` thumbnail for region detection and the
+    page-text OCR at ``text_dpi``; only detected table rectangles are rasterized
+    at full ``dpi``. All three are rendered with PyMuPDF, whatever ``renderer``
+    says (``renderer="pdf2image"`` cannot clip); without PyMuPDF, pages are
+    rendered whole and two-pass is off.
+
+    ``render_cache`` shares rendered pages across runs and output directories.
+    Page images left in ``page_images/`` by a run with another PDF, DPI or
+    renderer are discarded rather than reused.
+
+    ``color_mode`` ``gray`` or ``bitonal`` renders, caches and saves single-channel
+    pages; they are expanded to 3 channels only when handed to PP-Structure.
+
+    ``use_page_store`` keeps rendered pages in a memory-mapped ``page_store/``
+    (see page_store.py); reruns and resumes map them instead of decoding PNGs.
+
+    ``dpi_planner`` picks a DPI per page from the text layer's smallest numeric
+    font (at most ``dpi``); in two-pass mode it sets the table-clip DPI. Each
+    page's DPI is recorded in the pages, tables and ``progress.json``.
+
+    ``skip_pages`` pre-filters pages on tiny thumbnails (see page_filter.py):
+    blank pages are not OCR'd, and repeats of an earlier page reuse its text
+    and tables. Skipped pages stay in ``pages`` with a ``skip`` entry.
+
+    ``tile_max_pixels`` bounds the pixels of any single render. A larger page
+    (e.g. an A3 fold-out) is clip-rendered and OCR'd in tiles overlapping by
+    ``tile_overlap`` pixels and stitched back (see page_tiling.py); its saved
+    image is a ``page_NNNN_preview.png`` within the budget. Needs PyMuPDF for
+    the tiles; in two-pass mode the text page and table clips are capped
+    instead. 0 disables the cap.
+
+    ``grid_engine`` selects how table grids are found before PP-Structure:
+    ``morphology`` (OpenCV openings) or ``projection`` (numpy projection
+    profiles, see grid_profiles.py); both draw the same grid.
+
+    ``region_source`` ``vector`` finds ruled table regions from the PDF's vector
+    drawings (see vector_rules.py) instead of OpenCV on the rendered page; pages
+    without vector rules, and raster images on a page, still use OpenCV.
+    ``prepass`` takes one region per block of numeric text rows (see
+    pymupdf_prepass.py), so a page with two tables, or a table and narrative,
+    gives separate crops; pages without a text layer still use OpenCV. Both
+    need the PyMuPDF session. ``layout`` sends each whole page through
+    PP-Structure once and keeps the tables its layout model finds; only tables
+    with weak structure are gridded with OpenCV and predicted again, and pages
+    where the model finds no table use OpenCV regions (as do two-pass, tiled
+    and text-layer pages). Each page records its ``regions`` source.
+
+    ``text_layer`` takes the words of born-digital pages from the PDF text layer
+    instead of OCR (see text_layer.py): page text and table cells come straight
+    from it, and only pages or table regions whose text layer is missing,
+    garbled or a scanned image go through PP-Structure. Each page records its
+    ``text_source`` (``text_layer`` or ``ocr``); text-layer tables have
+    ``source`` ``text_layer``. Text-layer pages are never rendered whole at
+    ``dpi``: regions come from the PDF (``vector``/``prepass``) or a triage
+    thumbnail, tables are clip-rendered, and the saved image is the render
+    cache's page or a ``page_NNNN_preview.png`` at TEXT_LAYER_PREVIEW_DPI.
+
+    ``pack_regions`` puts small gridded table regions of a page on shared
+    canvases, one PP-Structure call per canvas instead of one per region (see
+    region_packing.py). Tables are mapped back to their regions by coordinate;
+    a canvas whose tables cannot be attributed is predicted region by region.
+
+    ``templates`` is a cache of table layout templates shared across runs and
+    documents (see table_templates.py): a gridded region whose rules, header
+    words and texts match a template PP-Structure recognized before is read
+    with OCR only and laid out on the template's columns; such tables record
+    their ``template``. The cache is saved at the end, and its hit/miss counts
+    are reported in ``template_cache`` and ``progress.json``.
+
+    ``single_pass`` sends each page through PP-Structure once for both its text
+    and its tables (see _process_page_single_pass): a table region is gridded
+    and predicted again only when the first pass found no table in it, or one
+    with weak structure, and the tables are left out of the page text.
+    Two-pass, tiled, text-layer and layout pages keep their own flow.
+
+    ``predict_batch`` > 1 sends a page's gridded table regions (and packed
+    canvases) to PP-Structure as lists of up to that many images, holding at
+    most ``predict_batch_pixels`` pixels together (see predict_batch.py).
+    Tables keep their page and region; the batch counts are reported in
+    ``predict_batch`` and ``progress.json``.
+
+    ``workers`` > 1 shards the pages over that many processes, each with its
+    own PP-Structure engine and an equal share of the CPU threads (see
+    _process_sharded and page_sharding.py). The result is merged in page
+    order and has the same ``pages`` and ``tables`` as a single-process run.
     
     Returns:
         Dict with 'tables', 'pages_processed', 'total_tables'
     """
-    print(f"Processing all pages from {pdf_path.name}...")
-    
-    # Step 1: Render all pages
-    print("Step 1: Rendering all pages to images...")
-    images_dir = work_dir / "page_images"
-    page_images = render_all_pages(
-        pdf_path,
-        images_dir,
+    options: Dict[str, Any] = dict(
         dpi=dpi,
         max_pages=max_pages,
         start_page=start_page,
+        use_gpu=use_gpu,
+        renderer=renderer,
+        save_page_images=save_page_images,
+        save_debug_images=save_debug_images,
+        two_pass=two_pass,
+        triage_dpi=triage_dpi,
+        text_dpi=text_dpi,
+        render_cache=render_cache,
+        color_mode=color_mode,
+        use_page_store=use_page_store,
+        dpi_planner=dpi_planner,
+        skip_pages=skip_pages,
+        tile_max_pixels=tile_max_pixels,
+        tile_overlap=tile_overlap,
+        grid_engine=grid_engine,
+        pack_regions=pack_regions,
+        templates=templates,
+        region_source=region_source,
+        text_layer=text_layer,
+        single_pass=single_pass,
+        predict_batch=predict_batch,
+        predict_batch_pixels=predict_batch_pixels,
+    )
+    with open_document_session(pdf_path, session) as session:
+        if workers > 1:
+            return _process_sharded(pdf_path, work_dir, session, workers, options)
+        return _process_all_pages(pdf_path, work_dir, session=session, **options)
+
+
+def _process_all_pages(
+    pdf_path: Path,
+    work_dir: Path,
+    *,
+    dpi: int,
+    max_pages: Optional[int],
+    start_page: int,
+    use_gpu: bool,
+    renderer: str,
+    session: Optional[DocumentSession],
+    save_page_images: bool,
+    save_debug_images: bool,
+    two_pass: bool,
+    triage_dpi: int,
+    text_dpi: int,
+    render_cache: Optional[RenderCache],
+    color_mode: str,
+    use_page_store: bool,
+    dpi_planner: Optional[DpiPlanner],
+    skip_pages: bool,
+    tile_max_pixels: int,
+    tile_overlap: int,
+    grid_engine: str,
+    pack_regions: bool,
+    templates: Optional[TemplateCache],
+    region_source: str,
+    text_layer: bool,
+    single_pass: bool,
+    predict_batch: int,
+    predict_batch_pixels: int,
+    pages: Optional[List[int]] = None,
+    progress_name: str = "progress.json",
+) -> Dict:
+    check_color_mode(color_mode)
+    check_grid_engine(grid_engine)
+    check_region_source(region_source)
+    if cv2 is None:
+        raise ImportError(
+            "opencv-python not installed. Install with: pip install opencv-python-headless"
+        )
+
+    print(f"Processing all pages from {pdf_path.name}...")
+    
+    # Step 1: Pages are rendered lazily, in small chunks, straight to memory
+    print("Step 1: Rendering pages to memory...")
+    if two_pass and session is None:
+        print("  Note: two-pass clip rendering needs PyMuPDF; rendering whole pages instead")
+        two_pass = False
+    page_nums = pages or _page_numbers(
+        get_pdf_page_count(pdf_path, session=session), start_page, max_pages
     )
-    print(f"  Rendered {len(page_images)} pages")
+    if dpi_planner is not None:
+        page_dpis = dpi_planner.plan(session, page_nums)
+        print(f"  Adaptive DPI ({dpi_planner.label}): {_dpi_histogram(page_dpis)}")
+    else:
+        page_dpis = {n: dpi for n in page_nums}
+    skips: Dict[int, PageSkip] = {}
+    if skip_pages:
+        with get_renderer(renderer, pdf_path, session=session) as thumb_renderer:
+            skips = find_skippable_pages(thumb_renderer, page_nums, page_dpis, session=session)
+        print(f"  Page filter: {_skip_summary(skips)}")
+    pages_to_render = [n for n in page_nums if n not in skips]
+    # Pages too large to render whole are tiled (clip rendering needs the PyMuPDF session).
+    tiled: List[int] = []
+    if tile_max_pixels and not two_pass and session is not None:
+        tiled = [
+            n for n in pages_to_render
+            if _page_pixels(session.page_size(n), page_dpis[n]) > tile_max_pixels
+        ]
+        if tiled:
+            print(
+                f"  Tiling: {len(tiled)} page(s) above {tile_max_pixels:,} pixels "
+                "(tiles are clip-rendered with PyMuPDF)"
+            )
+    # Born-digital pages read their words from the text layer; OCR only the rest.
+    text_pages: Dict[int, List[OCRToken]] = {}
+    if text_layer and session is None:
+        print("  Note: the text layer needs a PyMuPDF session; OCR'ing every page")
+    elif text_layer:
+        for n in pages_to_render:
+            tokens = page_tokens(session.page(n), page_dpis[n])
+            if tokens is not None:
+                text_pages[n] = tokens
+        print(f"  Text layer: {len(text_pages)}/{len(pages_to_render)} page(s) need no page OCR")
+    # Pages not rendered whole up front: tiled pages, and text-layer pages (they
+    # only need thumbnails and clips; a saved image is a preview).
+    unrendered = set(tiled) | set(text_pages)
+    # Label of the page render for fingerprints: the fixed DPI or the plan.
+    render_dpi: Union[int, str] = dpi_planner.label if dpi_planner is not None else dpi
+    images_dir = work_dir / "page_images"
+    if two_pass:
+        # Saved page images are the text_dpi renders, from the PyMuPDF clip renderer.
+        backend = renderer_class(RENDERER_PYMUPDF)
+        cache_key = _cache_keys(pdf_path, text_dpi, backend, color_mode)
+        image_fingerprint = _fingerprint(pdf_path, text_dpi, backend, color_mode)
+    else:
+        backend = renderer_class(renderer)
+        cache_key = _cache_keys(pdf_path, dpi, backend, color_mode, page_dpis)
+        image_fingerprint = _fingerprint(pdf_path, render_dpi, backend, color_mode)
+    if save_page_images:
+        prepare_image_dir(images_dir, image_fingerprint)
+    store: Optional[PageStore] = None
+    if use_page_store and not two_pass:
+        store = open_page_store(work_dir / "page_store", pdf_path, render_dpi, renderer, color_mode)
+        print(f"  Page store: {len(store)} page(s) already stored")
+    if two_pass:
+        print(
+            f"  Two-pass: triage at {triage_dpi} DPI, text at {text_dpi} DPI, tables at {dpi} DPI"
+        )
+        page_images: Iterator[Tuple[int, Optional[np.ndarray]]] = (
+            (n, None) for n in pages_to_render
+        )
+    else:
+        page_images = iter_page_images(
+            pdf_path,
+            [n for n in pages_to_render if n not in unrendered],
+            dpi=dpi,
+            renderer=renderer,
+            session=session,
+            reuse_dir=images_dir if save_page_images else None,
+            cache=render_cache,
+            color_mode=color_mode,
+            store=store,
+            page_dpis=page_dpis,
+        )
+    pdf_regions = region_source in (REGIONS_VECTOR, REGIONS_PREPASS) and session is not None
+    if region_source in (REGIONS_VECTOR, REGIONS_PREPASS) and not pdf_regions:
+        print(f"  Note: {region_source} regions need a PyMuPDF session; using OpenCV regions")
+    if region_source == REGIONS_LAYOUT and two_pass:
+        print("  Note: layout regions need whole-page predicts; two-pass pages use OpenCV regions")
+    print(f"  {len(page_nums)} pages to process")
     
-    # Step 2: Initialize PP-Structure engine once (lazy initialization - only when needed)
+    # Step 2: PP-Structure engine from the process-wide registry (created on first table)
     print("Step 2: PP-Structure (PPStructureV3) will be initialized when processing first table...")
     pp_engine = None  # Initialize lazily
+    batcher = PredictBatcher(predict_batch, predict_batch_pixels) if predict_batch > 1 else None
     
     # Step 3: Process each page
     print("Step 3: Processing pages for tables...")
     all_tables = []
     pages_out: List[Dict[str, Any]] = []
     tables_dir = work_dir / "extracted_tables"
-    tables_dir.mkdir(parents=True, exist_ok=True)
-    progress_path = work_dir / "progress.json"
+    if save_debug_images:
+        tables_dir.mkdir(parents=True, exist_ok=True)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    progress_path = work_dir / progress_name
     
-    for idx, (page_num, image_path) in enumerate(page_images, start=1):
-        print(f"  Processing page {page_num} ({idx}/{len(page_images)})...")
+    pages_by_num: Dict[int, Dict[str, Any]] = {}
+    tables_by_num: Dict[int, List[Dict]] = {}
+    # Two-pass clips, tiles and text-layer thumbnails are rendered with PyMuPDF
+    # whatever the renderer.
+    page_renderer = (
+        get_renderer(RENDERER_PYMUPDF, pdf_path, session=session)
+        if two_pass or unrendered
+        else None
+    )
+    try:
+        for idx, page_num in enumerate(page_nums, start=1):
+            page_dpi = page_dpis[page_num]
+            skip = skips.get(page_num)
+            if skip is not None:
+                same_as = f" (same as page {skip.same_as})" if skip.same_as else ""
+                print(
+                    f"  Skipping page {page_num} ({idx}/{len(page_nums)}): "
+                    f"{skip.reason}{same_as}"
+                )
+                page_item, page_tables = _skipped_page(page_num, skip, pages_by_num, tables_by_num)
+            else:
+                tile_count = 1
+                is_tiled = page_num in tiled
+                if two_pass or page_num not in unrendered:
+                    _page, image = next(page_images)
+                else:
+                    image = None
+                print(f"  Processing page {page_num} ({idx}/{len(page_nums)}) at {page_dpi} DPI...")
 
-        # Extract OCR text for the whole page (for full-document output).
-        page_text = ""
-        try:
-            configure_paddle_device(use_gpu=use_gpu)
-            if pp_engine is None:
-                # Let the table path initialize it (ensures consistent settings)
-                pass
-            # If engine is already initialized, use it to OCR the raw page image as well.
-            if pp_engine is not None:
-                raw_out = pp_engine.predict(str(image_path))
-                if raw_out and isinstance(raw_out, list):
-                    overall = raw_out[0].get("overall_ocr_res") if isinstance(raw_out[0], dict) else None
-                    if isinstance(overall, dict):
-                        rec_texts = overall.get("rec_texts") or []
-                        rec_boxes = overall.get("rec_boxes")
-                        if isinstance(rec_texts, list) and rec_boxes is not None:
-                            page_text = _group_text_lines_from_ocr(rec_texts, rec_boxes)
-        except Exception:
-            page_text = ""
+                tokens = text_pages.get(page_num)
+                regions: Optional[List[Dict]] = None
+                page_regions = REGIONS_OPENCV
+                if pdf_regions:
+                    # Region dicts in the pixels the page's detection would have used.
+                    region_dpi = triage_dpi if two_pass and tokens is None else page_dpi
+                    if region_source == REGIONS_PREPASS:
+                        regions = detect_prepass_regions(session.page(page_num), region_dpi)
+                    else:
+                        # Text-layer, tiled and two-pass pages have no page image.
+                        if image is not None:
+                            render_box = _box_cropper(image)
+                        else:
+                            render_box = _box_renderer(
+                                page_renderer,
+                                page_num,
+                                region_dpi,
+                                session.page_size(page_num),
+                                max_pixels=(
+                                    tile_max_pixels if is_tiled or tokens is not None else None
+                                ),
+                            )
+                        regions = detect_vector_regions(
+                            session.page(page_num), region_dpi, render_box
+                        )
+                    if regions is not None:
+                        page_regions = region_source
+                # Prepass blocks are whole tables; only overlapping ones are merged.
+                join_fragments = page_regions != REGIONS_PREPASS
 
-        page_tables, pp_engine = process_page_for_tables(
-            page_num,
-            image_path,
-            tables_dir,
-            pp_engine=pp_engine,
-            use_gpu=use_gpu,
-        )
+                if tokens is not None:
+                    if regions is None:
+                        # Text-layer pages are never rendered whole: triage on a
+                        # thumbnail, as two-pass does.
+                        thumb = page_renderer.render_page(page_num, triage_dpi, COLOR_GRAY)
+                        regions = _scaled_regions(
+                            detect_table_regions_in_image(thumb, scale=triage_dpi / 300),
+                            page_dpi / triage_dpi,
+                        )
+                    page_text, page_tables, pp_engine = _process_page_text_layer(
+                        page_renderer,
+                        session.page(page_num),
+                        page_num,
+                        tokens,
+                        regions,
+                        dpi=page_dpi,
+                        tables_dir=tables_dir,
+                        pp_engine=pp_engine,
+                        use_gpu=use_gpu,
+                        save_debug_images=save_debug_images,
+                        color_mode=color_mode,
+                        max_pixels=tile_max_pixels or None,
+                        grid_engine=grid_engine,
+                        pack_regions=pack_regions,
+                        templates=templates,
+                        batcher=batcher,
+                        join_fragments=join_fragments,
+                    )
+                    model_input = None
+                elif two_pass:
+                    image, page_text, page_tables, pp_engine = _process_page_two_pass(
+                        page_renderer,
+                        page_num,
+                        dpi=page_dpi,
+                        triage_dpi=triage_dpi,
+                        text_dpi=text_dpi,
+                        tables_dir=tables_dir,
+                        pp_engine=pp_engine,
+                        use_gpu=use_gpu,
+                        save_debug_images=save_debug_images,
+                        color_mode=color_mode,
+                        max_pixels=tile_max_pixels or None,
+                        grid_engine=grid_engine,
+                        pack_regions=pack_regions,
+                        templates=templates,
+                        batcher=batcher,
+                        thumb_regions=regions,
+                        page_size=session.page_size(page_num) if regions is not None else None,
+                        join_fragments=join_fragments,
+                    )
+                    model_input = None
+                elif is_tiled:
+                    image, page_text, page_tables, pp_engine, tile_count = _process_page_tiled(
+                        page_renderer,
+                        page_num,
+                        dpi=page_dpi,
+                        page_size=session.page_size(page_num),
+                        max_pixels=tile_max_pixels,
+                        overlap=tile_overlap,
+                        tables_dir=tables_dir,
+                        pp_engine=pp_engine,
+                        use_gpu=use_gpu,
+                        save_debug_images=save_debug_images,
+                        color_mode=color_mode,
+                        preview=save_page_images
+                        and not (images_dir / _preview_image_name(page_num)).exists(),
+                        grid_engine=grid_engine,
+                        pack_regions=pack_regions,
+                        templates=templates,
+                        batcher=batcher,
+                        regions=regions,
+                        join_fragments=join_fragments,
+                    )
+                    print(f"    {tile_count} tiles")
+                    model_input = None
+                elif region_source == REGIONS_LAYOUT:
+                    page_text, page_tables, pp_engine, layout_used = _process_page_layout(
+                        page_num,
+                        image,
+                        dpi=page_dpi,
+                        tables_dir=tables_dir,
+                        pp_engine=pp_engine,
+                        use_gpu=use_gpu,
+                        save_debug_images=save_debug_images,
+                        grid_engine=grid_engine,
+                        pack_regions=pack_regions,
+                        templates=templates,
+                        batcher=batcher,
+                    )
+                    if layout_used:
+                        page_regions = REGIONS_LAYOUT
+                    model_input = None
+                elif single_pass:
+                    page_text, page_tables, pp_engine = _process_page_single_pass(
+                        page_num,
+                        image,
+                        regions,
+                        dpi=page_dpi,
+                        tables_dir=tables_dir,
+                        pp_engine=pp_engine,
+                        use_gpu=use_gpu,
+                        save_debug_images=save_debug_images,
+                        grid_engine=grid_engine,
+                        pack_regions=pack_regions,
+                        templates=templates,
+                        batcher=batcher,
+                        join_fragments=join_fragments,
+                    )
+                    model_input = None
+                else:
+                    # PP-Structure takes BGR arrays; the same buffer is what a saved PNG encodes.
+                    model_input = _to_model_input(image)
+
+                    # Extract OCR text for the whole page (for full-document output).
+                    # If the engine is already initialized, OCR the raw page image as well;
+                    # otherwise the table path initializes it first (consistent settings).
+                    page_text = ""
+                    try:
+                        configure_paddle_device(use_gpu=use_gpu)
+                        if pp_engine is not None:
+                            page_text = _ocr_page_text(pp_engine, model_input)
+                    except Exception:
+                        page_text = ""
+
+                    page_tables, pp_engine = process_page_for_tables(
+                        page_num,
+                        image,
+                        tables_dir,
+                        pp_engine=pp_engine,
+                        use_gpu=use_gpu,
+                        save_debug_images=save_debug_images,
+                        dpi=page_dpi,
+                        grid_engine=grid_engine,
+                        pack_regions=pack_regions,
+                        templates=templates,
+                        batcher=batcher,
+                        regions=regions,
+                        join_fragments=join_fragments,
+                    )
+
+                    # If engine got initialized inside process_page_for_tables, we can now OCR
+                    # the page as well.
+                    if not page_text and pp_engine is not None:
+                        try:
+                            page_text = _ocr_page_text(pp_engine, model_input)
+                        except Exception:
+                            page_text = ""
+
+                image_path: Optional[Path] = None
+                if save_page_images:
+                    image_path = images_dir / (
+                        _preview_image_name(page_num) if is_tiled else page_image_name(page_num)
+                    )
+                    saved = image_path.exists() or (
+                        not is_tiled
+                        and render_cache is not None
+                        and render_cache.export(cache_key(page_num), image_path)
+                    )
+                    preview = image is None and not (two_pass or is_tiled)
+                    if not saved and preview:
+                        # Text-layer page with no full render at hand: save a preview instead.
+                        image_path = images_dir / _preview_image_name(page_num)
+                        saved = image_path.exists()
+                    if not saved:
+                        if image is None:
+                            # Text-layer page: nothing was rendered yet.
+                            size = session.page_size(page_num)
+                            if preview:
+                                saved_dpi = min(TEXT_LAYER_PREVIEW_DPI, page_dpi)
+                            else:
+                                saved_dpi = text_dpi if two_pass else page_dpi
+                            if tile_max_pixels:
+                                saved_dpi = fit_dpi(size[0], size[1], saved_dpi, tile_max_pixels)
+                            image = page_renderer.render_page(page_num, saved_dpi, color_mode)
+                        if image.ndim == 2:
+                            cv2.imwrite(str(image_path), image)
+                        else:
+                            if model_input is None:
+                                model_input = _to_model_input(image)
+                            cv2.imwrite(str(image_path), model_input)
+
+                page_item = {
+                    "page": page_num,
+                    "dpi": page_dpi,
+                    "page_image": str(image_path) if image_path else None,
+                    "text": page_text,
+                    "tiles": tile_count,
+                    "regions": page_regions,
+                    "text_source": (
+                        TEXT_SOURCE_TEXT_LAYER if tokens is not None else TEXT_SOURCE_OCR
+                    ),
+                    "skip": None,
+                }
+                for table in page_tables:
+                    table.setdefault("dpi", page_dpi)
+
+            pages_out.append(page_item)
+            pages_by_num[page_num] = page_item
+            tables_by_num[page_num] = page_tables
+        
+            if page_tables:
+                print(f"    Found {len(page_tables)} table(s)")
+                all_tables.extend(page_tables)
+            else:
+                print("    No tables found")
 
-        # If engine got initialized inside process_page_for_tables, we can now OCR the page as well.
-        if not page_text and pp_engine is not None:
+            # Write a small checkpoint so a crash doesn't lose the entire run.
             try:
-                raw_out = pp_engine.predict(str(image_path))
-                if raw_out and isinstance(raw_out, list):
-                    overall = raw_out[0].get("overall_ocr_res") if isinstance(raw_out[0], dict) else None
-                    if isinstance(overall, dict):
-                        rec_texts = overall.get("rec_texts") or []
-                        rec_boxes = overall.get("rec_boxes")
-                        if isinstance(rec_texts, list) and rec_boxes is not None:
-                            page_text = _group_text_lines_from_ocr(rec_texts, rec_boxes)
+                progress_path.write_text(
+                    json.dumps(
+                        {
+                            "pdf": str(pdf_path),
+                            "dpi": dpi,
+                            "dpi_plan": dpi_planner.label if dpi_planner is not None else None,
+                            **_page_counts(pages_out),
+                            "renderer": renderer,
+                            "two_pass": two_pass,
+                            "color_mode": color_mode,
+                            "grid_engine": grid_engine,
+                            "pack_regions": pack_regions,
+                            "single_pass": single_pass,
+                            "template_cache": templates.stats() if templates is not None else None,
+                            "engines": engine_stats(),
+                            "predict_batch": batcher.stats() if batcher is not None else None,
+                            "region_source": region_source,
+                            "text_layer": text_layer,
+                            "start_page": start_page,
+                            "max_pages": max_pages,
+                            "last_processed_page": page_num,
+                            "pages_done": idx,
+                            "pages_total": len(page_nums),
+                            "tables_so_far": len(all_tables),
+                        },
+                        ensure_ascii=False,
+                        indent=2,
+                    ),
+                    encoding="utf-8",
+                )
             except Exception:
-                page_text = ""
+                pass
+    finally:
+        if page_renderer is not None:
+            page_renderer.close()
 
-        pages_out.append(
-            {
-                "page": page_num,
-                "page_image": str(image_path),
-                "text": page_text,
-            }
+    print(f"\nTotal tables extracted: {len(all_tables)}")
+    if templates is not None:
+        stats = templates.stats()
+        print(
+            f"Table templates: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['learned']} learned ({stats['templates']} cached)"
         )
-        
-        if page_tables:
-            print(f"    Found {len(page_tables)} table(s)")
-            all_tables.extend(page_tables)
-        else:
-            print("    No tables found")
-
-        # Write a small checkpoint so a crash doesn't lose the entire run.
         try:
-            progress_path.write_text(
-                json.dumps(
-                    {
-                        "pdf": str(pdf_path),
-                        "dpi": dpi,
-                        "start_page": start_page,
-                        "max_pages": max_pages,
-                        "last_processed_page": page_num,
-                        "pages_done": idx,
-                        "pages_total": len(page_images),
-                        "tables_so_far": len(all_tables),
-                    },
-                    ensure_ascii=False,
-                    indent=2,
-                ),
-                encoding="utf-8",
-            )
-        except Exception:
-            pass
-    
-    print(f"\nTotal tables extracted: {len(all_tables)}")
-    
+            templates.save()
+        except Exception as e:
+            print(f"  Saving table templates failed: {e}")
+    if batcher is not None:
+        stats = batcher.stats()
+        print(
+            f"Batched predicts: {stats['images']} images in {stats['batches']} calls "
+            f"(batch size {stats['size']}, {stats['failed']} failed batches)"
+        )
+    for stats in engine_stats():
+        warmup = f"{stats['warmup_seconds']:.1f} s" if stats["warmup_seconds"] is not None else "-"
+        print(
+            f"Engine {stats['engine']}: init {stats['init_seconds']:.1f} s, warm-up {warmup}, "
+            f"{stats['predicts']} more predicts in {stats['predict_seconds']:.1f} s"
+        )
+
     return {
+        "dpi_plan": dpi_planner.label if dpi_planner is not None else None,
+        "template_cache": templates.stats() if templates is not None else None,
+        "engines": engine_stats(),
+        "predict_batch": batcher.stats() if batcher is not None else None,
         "pages": pages_out,
         'tables': all_tables,
-        'pages_processed': len(page_images),
+        'pages_processed': len(pages_out),
         'total_tables': len(all_tables),
     }
 
+
+
+def _page_counts(pages_out: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The per-page DPIs and page counts of ``progress.json``."""
+    done = [p for p in pages_out if not p["skip"]]
+    return {
+        "page_dpis": {str(p["page"]): p["dpi"] for p in pages_out},
+        "pages_skipped": len(pages_out) - len(done),
+        "pages_tiled": sum(1 for p in done if p["tiles"] > 1),
+        "pages_pdf_regions": sum(
+            1 for p in done if p["regions"] in (REGIONS_VECTOR, REGIONS_PREPASS)
+        ),
+        "pages_layout_regions": sum(1 for p in done if p["regions"] == REGIONS_LAYOUT),
+        "pages_text_layer": sum(1 for p in done if p["text_source"] == TEXT_SOURCE_TEXT_LAYER),
+    }
+
+
+def _process_shard(
+    pdf_path: Path,
+    work_dir: Path,
+    shard: List[int],
+    worker: int,
+    options: Dict[str, Any],
+) -> Dict:
+    """Worker process: one shard of pages, with its own document session and engine."""
+    try:
+        with open_document_session(pdf_path, None) as session:
+            return _process_all_pages(
+                pdf_path,
+                work_dir,
+                session=session,
+                pages=shard,
+                progress_name=f"progress.worker{worker}.json",
+                **options,
+            )
+    finally:
+        release_engines()
+
+
+def _summed(
+    stats: List[Optional[Dict[str, int]]], keep: Tuple[str, ...]
+) -> Optional[Dict[str, int]]:
+    """Counts of the workers' stats dicts added up.
+
+    ``keep`` keys are settings (or sizes), taken as the largest.
+    """
+    stats = [s for s in stats if s is not None]
+    if not stats:
+        return None
+    return {
+        key: max(s[key] for s in stats) if key in keep else sum(s[key] for s in stats)
+        for key in stats[0]
+    }
+
+
+def _process_sharded(
+    pdf_path: Path,
+    work_dir: Path,
+    session: Optional[DocumentSession],
+    workers: int,
+    options: Dict[str, Any],
+) -> Dict:
+    """
+    Process pages in worker processes and merge their results in page order.
+
+    The page filter runs here, once, so a repeated page can point at a page of
+    another shard; the remaining pages are split by estimated cost (see
+    page_sharding.py) and each shard goes to _process_all_pages in its own
+    process. Skipped pages are filled in while merging, exactly as the
+    single-process loop does. Workers write ``progress.workerN.json``; the
+    merged run writes ``progress.json`` with the single-process keys (page
+    counts over all shards) plus ``workers`` and ``shards``. The page store (one writer at a time)
+    is not used by workers.
+    """
+    start = options["start_page"]
+    page_nums = _page_numbers(
+        get_pdf_page_count(pdf_path, session=session), start, options["max_pages"]
+    )
+    planner: Optional[DpiPlanner] = options["dpi_planner"]
+    if planner is not None:
+        page_dpis = planner.plan(session, page_nums)
+    else:
+        page_dpis = {n: options["dpi"] for n in page_nums}
+    skips: Dict[int, PageSkip] = {}
+    if options["skip_pages"]:
+        with get_renderer(options["renderer"], pdf_path, session=session) as thumb_renderer:
+            skips = find_skippable_pages(thumb_renderer, page_nums, page_dpis, session=session)
+        print(f"  Page filter: {_skip_summary(skips)}")
+    todo = [n for n in page_nums if n not in skips]
+    if not todo:
+        return _process_all_pages(pdf_path, work_dir, session=session, **options)
+
+    shards = shard_pages({n: page_cost(session, n, page_dpis[n]) for n in todo}, workers)
+    threads = worker_threads(len(shards))
+    print(
+        f"Sharding {len(todo)} pages over {len(shards)} worker processes "
+        f"({threads} threads each): {', '.join(str(len(s)) for s in shards)} pages"
+    )
+    # Two-pass needs PyMuPDF, as in _process_all_pages (a worker has it if the parent does).
+    two_pass = options["two_pass"] and session is not None
+    if options["save_page_images"]:
+        # Prepared once here, so workers starting at different times never clear
+        # each other's images.
+        if two_pass:
+            render_dpi: Union[int, str] = options["text_dpi"]
+            backend = renderer_class(RENDERER_PYMUPDF)
+        else:
+            render_dpi = planner.label if planner is not None else options["dpi"]
+            backend = renderer_class(options["renderer"])
+        prepare_image_dir(
+            work_dir / "page_images",
+            _fingerprint(pdf_path, render_dpi, backend, options["color_mode"]),
+        )
+    if options["use_page_store"]:
+        print("  Note: the page store has one writer at a time; workers render without it")
+    shard_options = dict(options, skip_pages=False, use_page_store=False)
+
+    with worker_thread_env(threads), ProcessPoolExecutor(
+        max_workers=len(shards),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=limit_worker_threads,
+        initargs=(threads,),
+    ) as pool:
+        futures = [
+            pool.submit(_process_shard, pdf_path, work_dir, shard, worker, shard_options)
+            for worker, shard in enumerate(shards)
+        ]
+        results = [f.result() for f in futures]
+
+    pages_by_num: Dict[int, Dict[str, Any]] = {p["page"]: p for r in results for p in r["pages"]}
+    tables_by_num: Dict[int, List[Dict]] = {n: [] for n in pages_by_num}
+    for result in results:
+        for table in result["tables"]:
+            tables_by_num[table["page"]].append(table)
+    pages_out: List[Dict[str, Any]] = []
+    all_tables: List[Dict] = []
+    for page_num in page_nums:
+        skip = skips.get(page_num)
+        if skip is not None:
+            page_item, page_tables = _skipped_page(page_num, skip, pages_by_num, tables_by_num)
+            pages_by_num[page_num] = page_item
+            tables_by_num[page_num] = page_tables
+        pages_out.append(pages_by_num[page_num])
+        all_tables.extend(tables_by_num[page_num])
+
+    engines = [dict(e, worker=w) for w, r in enumerate(results) for e in r["engines"]]
+    merged = {
+        "dpi_plan": results[0]["dpi_plan"],
+        "template_cache": _summed([r["template_cache"] for r in results], ("templates",)),
+        "engines": engines,
+        "predict_batch": _summed([r["predict_batch"] for r in results], ("size", "max_pixels")),
+        "workers": len(shards),
+        "pages": pages_out,
+        'tables': all_tables,
+        'pages_processed': len(pages_out),
+        'total_tables': len(all_tables),
+    }
+    try:
+        (work_dir / "progress.json").write_text(
+            json.dumps(
+                {
+                    "pdf": str(pdf_path),
+                    "dpi": options["dpi"],
+                    "dpi_plan": merged["dpi_plan"],
+                    **_page_counts(pages_out),
+                    "renderer": options["renderer"],
+                    "two_pass": two_pass,
+                    "color_mode": options["color_mode"],
+                    "grid_engine": options["grid_engine"],
+                    "pack_regions": options["pack_regions"],
+                    "single_pass": options["single_pass"],
+                    "template_cache": merged["template_cache"],
+                    "engines": engines,
+                    "predict_batch": merged["predict_batch"],
+                    "region_source": options["region_source"],
+                    "text_layer": options["text_layer"],
+                    "workers": len(shards),
+                    "shards": shards,
+                    "start_page": start,
+                    "max_pages": options["max_pages"],
+                    "last_processed_page": page_nums[-1],
+                    "pages_done": len(pages_out),
+                    "pages_total": len(page_nums),
+                    "tables_so_far": len(all_tables),
+                },
+                ensure_ascii=False,
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+    except Exception:
+        pass
+    print(f"\nTotal tables extracted: {len(all_tables)} ({len(shards)} workers)")
+    return merged
@@ -1,5 +1,6 @@
 """Configuration for PDF parser."""
 
+import os
 from pathlib import Path
 
 # Default output directory
@@ -17,6 +18,113 @@ MIN_MD_LENGTH_THRESHOLD: int = 2000
 # GPU/CPU settings
 NUM_THREADS: int = 8
 
+# Page rendering (comprehensive mode): pages per render chunk and parallel
+# pdftoppm processes per chunk. Chunk size bounds temporary disk/memory use.
+RENDER_CHUNK_PAGES: int = 16
+RENDER_THREAD_COUNT: int = 4
+# Pages held in memory at once when rendering straight to arrays (~25 MB each at 300 DPI).
+RENDER_MEMORY_CHUNK_PAGES: int = 4
+
+# Shared cache of rendered pages (keyed by PDF content hash, page, DPI, colour mode
+# and renderer version), reused across runs and output directories. Least recently
+# used pages are evicted once the cache exceeds the budget.
+RENDER_CACHE_DIR: Path = Path(
+    os.environ.get("KUNTAPARSE_RENDER_CACHE", Path.home() / ".cache" / "kuntaparse" / "renders")
+)
+RENDER_CACHE_MAX_MB: int = 4096
+
+# Adaptive DPI (comprehensive mode): each page gets the lowest DPI, in steps of
+# DPI_PLAN_STEP between DPI_PLAN_MIN_DPI and the configured DPI, at which its
+# smallest numeric font is DPI_PLAN_TARGET_PX pixels tall (7 pt -> 300 DPI,
+# 10 pt -> 225 DPI). Pages without a text layer keep the configured DPI.
+DPI_PLAN_TARGET_PX: float = 28.0
+DPI_PLAN_MIN_DPI: int = 150
+DPI_PLAN_STEP: int = 25
+
+# Blank/repeated page filter (comprehensive mode): thumbnail DPI, maximum ink share
+# of a blank page, and how close a repeat candidate must be: perceptual hash bits that may
+# differ, and per-pixel gray tolerance (no pixel of the thumbnails may differ by
+# more). At 36 DPI on A4 a lone 9-11 pt page number covers 0.00002-0.0002 and a
+# short 10-14 pt heading ("Liite", "Tase", "LIITTEET") 0.00014-0.0006, so ink
+# alone cannot tell them apart: the limit stays below every heading, and a page
+# with a text layer is blank only if that has no words beyond numbers as well.
+# The thumbnail only finds repeat candidates; page_filter.py confirms them on
+# the text-layer words or full-DPI renders.
+PAGE_FILTER_DPI: int = 36
+PAGE_BLANK_MAX_INK: float = 0.0001
+PAGE_DUP_MAX_HAMMING: int = 4
+PAGE_DUP_PIXEL_TOLERANCE: int = 48
+
+# Large-page tiling (comprehensive mode): a page whose render would exceed
+# PAGE_TILE_MAX_PIXELS (A4 at 300 DPI is ~8.7 MP, an A3 fold-out ~17.4 MP) is
+# rendered and OCR'd as overlapping tiles within the budget; neighbouring tiles
+# share PAGE_TILE_OVERLAP_PX pixels so a token cut by one tile edge is whole in the other.
+PAGE_TILE_MAX_PIXELS: int = 12_000_000
+PAGE_TILE_OVERLAP_PX: int = 200
+
+# Two-pass comprehensive mode: thumbnail DPI for table-region triage and DPI for
+# the page-text OCR; table regions themselves are clip-rendered at full DPI.
+TWO_PASS_TRIAGE_DPI: int = 75
+TWO_PASS_TEXT_DPI: int = 150
+
+# Text-layer fast path (comprehensive mode): born-digital pages take their words
+# from the PDF text layer instead of OCR. A page falls back to OCR when it has
+# fewer than TEXT_LAYER_MIN_WORDS words, when more than TEXT_LAYER_MAX_GARBLED of
+# its characters are unmapped glyphs, or when raster images cover more than
+# TEXT_LAYER_MAX_IMAGE_SHARE of it (a scan); a table region falls back on its own
+# when its words are garbled or it is mostly image. Image regions narrower than
+# TEXT_LAYER_MIN_IMAGE_TABLE_PT (logos, emblems) are not OCR'd. Text-layer pages
+# are never rendered whole at full DPI; a saved page image not in the render
+# cache is a preview at TEXT_LAYER_PREVIEW_DPI.
+TEXT_LAYER_MIN_WORDS: int = 5
+TEXT_LAYER_MAX_GARBLED: float = 0.05
+TEXT_LAYER_MAX_IMAGE_SHARE: float = 0.5
+TEXT_LAYER_MIN_IMAGE_TABLE_PT: float = 144.0
+TEXT_LAYER_PREVIEW_DPI: int = 100
+
+# Table region clean-up (comprehensive mode) before PP-Structure: overlapping
+# regions, and regions side by side or stacked within REGION_MERGE_GAP_300 pixels
+# (at 300 DPI) that share at least REGION_MERGE_ALIGN of their extent across the
+# gap, are merged into one; at most MAX_REGIONS_PER_PAGE (the largest) are kept.
+REGION_MERGE_GAP_300: int = 15
+REGION_MERGE_ALIGN: float = 0.5
+MAX_REGIONS_PER_PAGE: int = 12
+
+# Region packing (comprehensive mode, opt-in): gridded region crops of at most
+# PACK_MAX_REGION_PIXELS pixels share a canvas of up to PACK_CANVAS_WIDTH x
+# PACK_CANVAS_HEIGHT pixels (A4 at 300 DPI), PACK_GUTTER_PX of white apart, and
+# one PP-Structure call.
+PACK_MAX_REGION_PIXELS: int = 1_000_000
+PACK_CANVAS_WIDTH: int = 2480
+PACK_CANVAS_HEIGHT: int = 3508
+PACK_GUTTER_PX: int = 48
+
+# Batched predicts (comprehensive mode, opt-in): a page's gridded table regions
+# (and packed canvases) go to PP-Structure as one list of up to PREDICT_BATCH_SIZE
+# images holding at most PREDICT_BATCH_MAX_PIXELS pixels together (A4 at 300 DPI);
+# a larger image is predicted on its own. A batch size of 1 predicts one at a time.
+PREDICT_BATCH_SIZE: int = 1
+PREDICT_BATCH_MAX_PIXELS: int = 8_700_000
+
+# Table layout templates (comprehensive mode, opt-in): a table PP-Structure
+# recognized is kept as a template (grid rule positions, row pitch, header words,
+# column bounds) in TEMPLATE_CACHE_PATH, shared across runs and documents; beyond
+# TEMPLATE_CACHE_MAX the least recently used are dropped. A region matches when
+# its rules lie within TEMPLATE_GEOMETRY_TOL of the width and its row pitch within
+# TEMPLATE_PITCH_TOL of the template's, at least TEMPLATE_HEADER_MIN_SIMILARITY of
+# the header words agree (digits ignored, so years match) and at most
+# TEMPLATE_MAX_STRADDLING of its OCR texts cross a column bound.
+TEMPLATE_CACHE_PATH: Path = Path(
+    os.environ.get(
+        "KUNTAPARSE_TEMPLATE_CACHE", Path.home() / ".cache" / "kuntaparse" / "table_templates.json"
+    )
+)
+TEMPLATE_CACHE_MAX: int = 500
+TEMPLATE_GEOMETRY_TOL: float = 0.02
+TEMPLATE_PITCH_TOL: float = 0.15
+TEMPLATE_HEADER_MIN_SIMILARITY: float = 0.8
+TEMPLATE_MAX_STRADDLING: float = 0.1
+
 # Table processing settings
 TABLE_ACCURATE_MODE: bool = True
 TABLE_CELL_MATCHING: bool = False  # Disable to prevent column merging
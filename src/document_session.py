@@ -0,0 +1,126 @@
+"""Per-document PDF session shared by all pipeline stages.
+
+Opens the PDF once with PyMuPDF and lazily caches metadata that several stages
+need (page count, page sizes, text-layer presence, per-page content hash, TOC),
+so those queries cost one lookup instead of re-opening or re-rendering the file.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Dict, List, Optional, Tuple
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+
+class DocumentSession:
+    """An open PDF plus lazily computed, cached metadata.
+
+    Page numbers are 1-indexed everywhere in this class, matching the CLI and
+    the comprehensive pipeline.
+    """
+
+    def __init__(self, pdf_path: Path) -> None:
+        if fitz is None:
+            raise ImportError("PyMuPDF not installed. Install with: pip install pymupdf")
+        self.pdf_path = pdf_path
+        self.doc = fitz.open(str(pdf_path))
+        self._page_sizes: Optional[List[Tuple[float, float]]] = None
+        self._has_text: Dict[int, bool] = {}
+        self._page_hash: Dict[int, str] = {}
+        self._xref_digest: Dict[int, str] = {}
+        self._toc: Optional[List[Any]] = None
+
+    def __enter__(self) -> "DocumentSession":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
+
+    @property
+    def page_count(self) -> int:
+        return len(self.doc)
+
+    def page(self, page_number: int) -> "fitz.Page":
+        return self.doc[page_number - 1]
+
+    @property
+    def page_sizes(self) -> List[Tuple[float, float]]:
+        """(width, height) in PDF points for every page."""
+        if self._page_sizes is None:
+            self._page_sizes = [(p.rect.width, p.rect.height) for p in self.doc]
+        return self._page_sizes
+
+    def page_size(self, page_number: int) -> Tuple[float, float]:
+        return self.page_sizes[page_number - 1]
+
+    def has_text_layer(self, page_number: int) -> bool:
+        """True if the page has extractable (non-whitespace) text."""
+        if page_number not in self._has_text:
+            self._has_text[page_number] = bool(self.page(page_number).get_text().strip())
+        return self._has_text[page_number]
+
+    @property
+    def any_text_layer(self) -> bool:
+        """True if at least one page has extractable text (stops at the first hit)."""
+        return any(self.has_text_layer(n) for n in range(1, self.page_count + 1))
+
+    def page_hash(self, page_number: int) -> str:
+        """Content hash of a page: content streams + digests of the images it draws.
+
+        Identical pages (e.g. repeated covers) hash equal even when the PDF stores
+        them as separate objects.
+        """
+        if page_number not in self._page_hash:
+            page = self.page(page_number)
+            h = hashlib.sha1()
+            h.update(f"{page.rect.width:.2f}x{page.rect.height:.2f}".encode())
+            h.update(page.read_contents())
+            for img in page.get_images(full=True):
+                xref, name = img[0], img[7]
+                h.update(name.encode("utf-8", "replace"))
+                h.update(self._stream_digest(xref).encode())
+            self._page_hash[page_number] = h.hexdigest()
+        return self._page_hash[page_number]
+
+    def _stream_digest(self, xref: int) -> str:
+        if xref not in self._xref_digest:
+            try:
+                raw = self.doc.xref_stream_raw(xref) or b""
+            except Exception:
+                raw = str(xref).encode()
+            self._xref_digest[xref] = hashlib.sha1(raw).hexdigest()
+        return self._xref_digest[xref]
+
+    @property
+    def toc(self) -> List[Any]:
+        """Outline entries as returned by PyMuPDF: [level, title, page, ...]."""
+        if self._toc is None:
+            self._toc = self.doc.get_toc()
+        return self._toc
+
+
+def open_document_session(
+    pdf_path: Path,
+    session: Optional[DocumentSession] = None,
+) -> ContextManager[Optional[DocumentSession]]:
+    """Context manager yielding a session for ``pdf_path``.
+
+    Reuses ``session`` if given (caller keeps ownership). Otherwise opens a new one
+    that is closed on exit, or yields None when PyMuPDF is not installed.
+    """
+    if session is not None:
+        return nullcontext(session)
+    if fitz is None:
+        return nullcontext(None)
+    return DocumentSession(pdf_path)
@@ -0,0 +1,78 @@
+"""Per-page render DPI from the PDF text layer.
+
+For born-digital PDFs the PyMuPDF text layer gives the font size of every span.
+A page only needs enough DPI for its smallest figures to reach a target pixel
+height, so each page gets the lowest DPI (in fixed steps, within bounds) at
+which its smallest numeric font is ``target_px`` tall. Pages without a text
+layer (scans) get ``max_dpi``.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+from .config import DPI_PLAN_MIN_DPI, DPI_PLAN_STEP, DPI_PLAN_TARGET_PX
+
+if TYPE_CHECKING:
+    from .document_session import DocumentSession
+
+
+def smallest_numeric_font_size(page: "fitz.Page") -> Optional[float]:
+    """Smallest font size (pt) of spans containing a digit; else of any text span.
+
+    Returns None if the page has no text layer.
+    """
+    numeric: Optional[float] = None
+    any_text: Optional[float] = None
+    for block in page.get_text("dict").get("blocks", []):
+        for line in block.get("lines", []):
+            for span in line.get("spans", []):
+                text = span.get("text", "").strip()
+                size = float(span.get("size", 0.0))
+                if not text or size <= 0:
+                    continue
+                any_text = size if any_text is None else min(any_text, size)
+                if any(ch.isdigit() for ch in text):
+                    numeric = size if numeric is None else min(numeric, size)
+    return numeric if numeric is not None else any_text
+
+
+@dataclass(frozen=True)
+class DpiPlanner:
+    """Chooses a render DPI per page; ``max_dpi`` is the fixed DPI it replaces."""
+
+    max_dpi: int = 300
+    min_dpi: int = DPI_PLAN_MIN_DPI
+    target_px: float = DPI_PLAN_TARGET_PX
+    step: int = DPI_PLAN_STEP
+
+    @property
+    def label(self) -> str:
+        """Stable description of the plan (render fingerprints, logs)."""
+        return f"auto:{self.target_px:g}px:{self.min_dpi}-{self.max_dpi}/{self.step}"
+
+    def dpi_for_font(self, size_pt: Optional[float]) -> int:
+        """Lowest stepped DPI at which ``size_pt`` renders ``target_px`` tall.
+
+        Never above ``max_dpi``, even when ``min_dpi`` is higher.
+        """
+        if size_pt is None or size_pt <= 0:
+            return self.max_dpi
+        needed = self.target_px * 72.0 / size_pt
+        dpi = math.ceil(needed / self.step) * self.step
+        return max(min(self.min_dpi, self.max_dpi), min(self.max_dpi, dpi))
+
+    def plan(
+        self,
+        session: Optional["DocumentSession"],
+        page_numbers: Iterable[int],
+    ) -> Dict[int, int]:
+        """Map page number -> DPI (``max_dpi`` everywhere without a session)."""
+        if session is None:
+            return {n: self.max_dpi for n in page_numbers}
+        return {
+            n: self.dpi_for_font(smallest_numeric_font_size(session.page(n)))
+            for n in page_numbers
+        }
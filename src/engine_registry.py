@@ -0,0 +1,187 @@
+"""Process-wide registry of PP-Structure engines.
+
+Building a ``PPStructureV3`` loads every model of its sub-pipelines, which takes
+longer than predicting a page; the first ``predict`` then pays a further
+warm-up (graph and memory set-up). ``get_pp_engine`` hands out one engine per
+(language, enabled sub-pipelines, device) for the whole process, so
+comprehensive pages, ``--visual-pages`` and any later caller share it instead
+of loading the models again.
+
+Each engine is wrapped in a ``TimedEngine`` that records its initialization
+time, its first predict (the warm-up) and its later predicts; ``engine_stats``
+reports them. ``release_engines`` drops the engines and frees cached device
+memory; the CLI calls it on shutdown, and it also runs at interpreter exit.
+``set_cpu_threads`` caps the CPU threads of engines created afterwards (worker
+processes share the cores, see page_sharding.py).
+"""
+
+from __future__ import annotations
+
+import atexit
+import gc
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# Must be set before importing paddleocr to avoid slow network checks / hanging.
+os.environ.setdefault("DISABLE_MODEL_SOURCE_CHECK", "True")
+os.environ.setdefault("HUGGINGFACE_HUB_DISABLE_OFFLINE", "1")
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+from .paddle_device import configure_paddle_device
+
+# Imported on first use, so importing this module (e.g. from the CLI) stays cheap.
+paddleocr_mod: Any = None
+
+# Sub-pipelines for financial statements: table recognition only; the optional
+# pipelines we don't need stay off.
+TABLE_PIPELINES: Dict[str, bool] = {
+    "use_table_recognition": True,
+    "use_region_detection": False,
+    "use_doc_unwarping": False,
+    "use_seal_recognition": False,
+    "use_formula_recognition": False,
+    "use_chart_recognition": False,
+}
+
+
+@dataclass(frozen=True)
+class EngineKey:
+    """What makes two engines interchangeable."""
+    lang: str
+    pipelines: Tuple[Tuple[str, bool], ...]  # sorted (flag, enabled) pairs
+    device: str
+    cpu_threads: Optional[int] = None  # None: PaddleOCR's default
+
+    def label(self) -> str:
+        enabled = [name[len("use_"):] for name, on in self.pipelines if on]
+        return f"{self.lang}/{'+'.join(enabled) or 'ocr'}/{self.device}"
+
+
+class TimedEngine:
+    """A PPStructureV3 with its initialization, warm-up and predict times."""
+
+    def __init__(self, engine: Any, key: EngineKey, init_seconds: float) -> None:
+        self.engine = engine
+        self.key = key
+        self.init_seconds = init_seconds
+        self.warmup_seconds: Optional[float] = None  # the first predict
+        self.predicts = 0
+        self.predict_seconds = 0.0
+
+    def predict(self, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self.engine.predict(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            if self.warmup_seconds is None:
+                self.warmup_seconds = elapsed
+                print(f"  PPStructureV3 {self.key.label()} warm-up predict: {elapsed:.1f} s")
+            else:
+                self.predicts += 1
+                self.predict_seconds += elapsed
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.engine, name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "engine": self.key.label(),
+            "init_seconds": round(self.init_seconds, 3),
+            "warmup_seconds": (
+                round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None
+            ),
+            "predicts": self.predicts,
+            "predict_seconds": round(self.predict_seconds, 3),
+        }
+
+
+_ENGINES: Dict[EngineKey, TimedEngine] = {}
+_CPU_THREADS: Optional[int] = None
+
+
+def set_cpu_threads(threads: Optional[int]) -> None:
+    """CPU threads for engines created from now on in this process (None: PaddleOCR's default)."""
+    global _CPU_THREADS
+    _CPU_THREADS = threads
+
+
+def _paddleocr() -> Any:
+    global paddleocr_mod
+    if paddleocr_mod is None:
+        try:
+            import paddleocr
+        except ImportError:
+            return None
+        paddleocr_mod = paddleocr
+    return paddleocr_mod
+
+
+def get_pp_engine(lang: str = "en", use_gpu: bool = False, **pipelines: bool) -> TimedEngine:
+    """
+    The process's PP-Structure engine for a language, sub-pipelines and device.
+
+    Args:
+        lang: OCR language of the engine
+        use_gpu: Request the GPU (see paddle_device.configure_paddle_device)
+        **pipelines: ``use_*`` flags overriding TABLE_PIPELINES
+
+    Returns:
+        The engine, created (and timed) on first request
+    """
+    module = _paddleocr()
+    if module is None or not hasattr(module, "PPStructureV3"):
+        raise ImportError(
+            "PP-Structure engine not available. Required stack:\n"
+            "- paddleocr==3.3.2\n"
+            "- paddlex[ocr]==3.3.11\n"
+            "Install in venv: pip install \"paddleocr==3.3.2\" \"paddlex[ocr]==3.3.11\""
+        )
+
+    device = configure_paddle_device(use_gpu=use_gpu).selected_device
+    flags = {**TABLE_PIPELINES, **pipelines}
+    key = EngineKey(
+        lang=lang, pipelines=tuple(sorted(flags.items())), device=device, cpu_threads=_CPU_THREADS
+    )
+    engine = _ENGINES.get(key)
+    if engine is not None:
+        return engine
+
+    print(f"  Initializing PPStructureV3 {key.label()}...")
+    start = time.perf_counter()
+    try:
+        options: Dict[str, Any] = {"cpu_threads": _CPU_THREADS} if _CPU_THREADS is not None else {}
+        raw = module.PPStructureV3(lang=lang, **flags, **options)
+    except Exception as e:
+        print(f"  PPStructureV3 initialization failed: {e}")
+        raise
+    engine = TimedEngine(raw, key, time.perf_counter() - start)
+    print(f"  PPStructureV3 initialized in {engine.init_seconds:.1f} s")
+    _ENGINES[key] = engine
+    return engine
+
+
+def engine_stats() -> List[Dict[str, Any]]:
+    """Timings of every engine created in this process (until released)."""
+    return [engine.stats() for engine in _ENGINES.values()]
+
+
+def release_engines() -> None:
+    """Drop all engines and free the device memory Paddle keeps cached for them."""
+    if not _ENGINES:
+        return
+    gpu = any(key.device.startswith("gpu") for key in _ENGINES)
+    _ENGINES.clear()
+    gc.collect()
+    if gpu:
+        try:
+            import paddle  # type: ignore[import-not-found]
+
+            paddle.device.cuda.empty_cache()
+        except Exception:
+            pass
+
+
+atexit.register(release_engines)
@@ -0,0 +1,240 @@
+"""Grid separators from numpy projection profiles and run lengths.
+
+``draw_table_grid`` finds rules by opening the binary crop with line kernels a
+third of the crop width / a tenth of its height, dilating the result and
+walking the contours of what survives. An opening with a line kernel acts on
+each ink run of a line independently, so the same rules can be found without
+2-D morphology: row (column) ink sums rule out most lines cheaply, run lengths
+are taken only on the remaining candidates, and each run is put through the
+opening as an interval. The cost no longer grows with the kernel length.
+
+The interval arithmetic follows OpenCV exactly, so both engines draw the same
+grid: erosion pads the border with ink and dilation with background, and an
+even kernel is anchored at ``length // 2``, which shifts every erosion and
+dilation by the same window (a net shift of one pixel per iteration). The run
+helpers (``merge_runs``, ``open_runs``, ``external_boxes``) also serve ink that
+never was a bitmap, e.g. the vector rules of vector_rules.py.
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# draw_table_grid: opening iterations, and the dilation across the line
+# direction before contours are taken.
+_ITERATIONS = 2
+_DILATE = 5
+
+# Stand-ins for the unbounded ink past the border during erosion.
+_FAR = np.iinfo(np.int64).max // 4
+
+# (line index, start, end) arrays of ink runs along a line, end exclusive.
+Runs = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def _erode(start: np.ndarray, end: np.ndarray, length: int, kernel: int, anchor: int) -> None:
+    # Out-of-image pixels count as ink: a run touching the border extends past it.
+    s = np.where(start <= 0, -_FAR, start)
+    e = np.where(end >= length, _FAR, end)
+    np.clip(s + anchor, 0, length, out=start)
+    np.clip(e - kernel + 1 + anchor, 0, length, out=end)
+
+
+def _dilate(start: np.ndarray, end: np.ndarray, length: int, kernel: int, anchor: int) -> None:
+    np.clip(start - kernel + 1 + anchor, 0, length, out=start)
+    np.clip(end + anchor, 0, length, out=end)
+
+
+def _binary_runs(lines: np.ndarray) -> Runs:
+    """Maximal runs of ink (non-zero) along axis 1."""
+    n, length = lines.shape
+    padded = np.zeros((n, length + 2), dtype=bool)
+    padded[:, 1:-1] = lines
+    # Changes alternate start, end along each zero-padded line.
+    changes = np.flatnonzero(padded[:, 1:] != padded[:, :-1])
+    line, start = np.divmod(changes[0::2], length + 1)
+    end = changes[1::2] % (length + 1)
+    return line, start, end
+
+
+def merge_runs(runs: Runs, length: int) -> Runs:
+    """Sort runs by (line, start) and merge overlapping or touching runs on a line."""
+    line, start, end = runs
+    if line.size == 0:
+        return runs
+    # Key runs by (line, position) so whole-array scans stay per line.
+    stride = length + 2
+    order = np.lexsort((start, line))
+    line, start, end = line[order], start[order], end[order]
+    reach = np.maximum.accumulate(line * stride + end)
+    new = np.ones(line.size, dtype=bool)
+    new[1:] = (line[1:] != line[:-1]) | (line[1:] * stride + start[1:] > reach[:-1])
+    heads = np.nonzero(new)[0]
+    return line[heads], start[heads], np.maximum.reduceat(end, heads)
+
+
+def open_runs(runs: Runs, length: int, kernel: int, centred: bool = False) -> Runs:
+    """Merged runs after OpenCV's opening with a (kernel, 1) rectangle, twice.
+
+    ``length`` is the line length (the image edge along the runs). ``centred``
+    dilates from the mirrored anchor, as the page masks of page_preprocess.py
+    do, so an even kernel does not shift the runs.
+    """
+    line, start, end = runs[0], runs[1].copy(), runs[2].copy()
+    anchor = kernel // 2
+    for _ in range(_ITERATIONS):
+        _erode(start, end, length, kernel, anchor)
+    keep = start < end
+    line, start, end = line[keep], start[keep], end[keep]
+    if centred:
+        anchor = kernel - 1 - anchor
+    for _ in range(_ITERATIONS):
+        _dilate(start, end, length, kernel, anchor)
+    return line, start, end
+
+
+def _components(runs: Runs, length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """8-connected components of merged runs.
+
+    Returns:
+        (component of each run, per-component (first line, last line, lowest
+        start, highest end) as rows)
+    """
+    line, start, end = runs
+    stride = length + 2
+
+    # Runs on the next line within one pixel: a contiguous range, since merged
+    # runs on a line are disjoint and sorted.
+    start_key = line * stride + start
+    end_key = line * stride + end
+    below = (line + 1) * stride
+    lo = np.searchsorted(end_key, below + start, side="left")
+    hi = np.searchsorted(start_key, below + end, side="right")
+    count = np.maximum(hi - lo, 0)
+    src = np.repeat(np.arange(line.size), count)
+    dst = np.repeat(lo - np.cumsum(count) + count, count) + np.arange(count.sum())
+
+    # Min-label propagation with pointer jumping.
+    label = np.arange(line.size)
+    while src.size:
+        low = np.minimum(label[src], label[dst])
+        before = label.copy()
+        np.minimum.at(label, src, low)
+        np.minimum.at(label, dst, low)
+        label = label[label]
+        if np.array_equal(label, before):
+            break
+
+    roots, label = np.unique(label, return_inverse=True)
+    boxes = np.empty((roots.size, 4), dtype=np.int64)
+    boxes[:, [0, 2]] = _FAR
+    boxes[:, [1, 3]] = -1
+    np.minimum.at(boxes[:, 0], label, line)
+    np.maximum.at(boxes[:, 1], label, line)
+    np.minimum.at(boxes[:, 2], label, start)
+    np.maximum.at(boxes[:, 3], label, end)
+    return label, boxes
+
+
+def _in_hole(label: np.ndarray, runs: Runs, boxes: np.ndarray, inner: int, outer: int) -> bool:
+    """Whether component ``inner`` lies in a hole of component ``outer``.
+
+    Only ``outer`` is rasterized, within its bounding box: background reachable
+    from outside it (4-connected, as for the contours of 8-connected ink) is
+    filled, and ``inner`` is enclosed if one of its pixels is not reached.
+    """
+    line, start, end = runs
+    first, last, lowest, highest = boxes[outer].tolist()
+    mine = label == outer
+    # Run starts +1 / ends -1 per line, summed along the line, paint ``outer``.
+    marks = np.zeros((last - first + 3, highest - lowest + 3), dtype=np.int32)
+    np.add.at(marks, (line[mine] - first + 1, start[mine] - lowest + 1), 1)
+    np.add.at(marks, (line[mine] - first + 1, end[mine] - lowest + 1), -1)
+    canvas = np.where(np.cumsum(marks, axis=1) > 0, 255, 0).astype(np.uint8)
+    cv2.floodFill(canvas, None, (0, 0), 128, flags=4)
+    probe = np.nonzero(label == inner)[0][0]
+    return bool(canvas[line[probe] - first + 1, start[probe] - lowest + 1] == 0)
+
+
+def external_boxes(runs: Runs, length: int) -> np.ndarray:
+    """Bounding boxes of the ink components OpenCV's external contours outline.
+
+    ``runs`` need not be merged. A component in a hole of another one (e.g.
+    inside a ruled frame) has no external contour and is left out.
+
+    Returns:
+        (first line, last line, lowest start, highest end) rows, end exclusive
+    """
+    runs = merge_runs(runs, length)
+    if runs[0].size == 0:
+        return np.empty((0, 4), dtype=np.int64)
+    label, boxes = _components(runs, length)
+    external = np.ones(len(boxes), dtype=bool)
+    for idx, (first, last, lowest, highest) in enumerate(boxes.tolist()):
+        # Only a component whose box surrounds this one can enclose it.
+        around = np.nonzero(
+            (boxes[:, 0] < first)
+            & (boxes[:, 1] > last)
+            & (boxes[:, 2] < lowest)
+            & (boxes[:, 3] > highest)
+        )[0]
+        external[idx] = not any(
+            _in_hole(label, runs, boxes, idx, outer) for outer in around.tolist()
+        )
+    return boxes[external]
+
+
+def rule_centres(runs: Runs, length: int, kernel: int, min_extent: float) -> List[int]:
+    """Centres of the rules along the runs' direction that draw_table_grid would draw.
+
+    ``runs`` are merged ink runs of the crop along one axis, ``kernel``
+    draw_table_grid's kernel length along it and ``min_extent`` the contour
+    length a rule must exceed after the dilation.
+    """
+    if kernel < 1 or runs[0].size == 0:
+        return []
+    line, start, end = open_runs(runs, length, kernel)
+    _dilate(start, end, length, _DILATE, _DILATE // 2)
+    boxes = external_boxes((line, start, end), length)
+    boxes = boxes[boxes[:, 3] - boxes[:, 2] > min_extent]
+    return np.unique(boxes[:, 0] + (boxes[:, 1] - boxes[:, 0] + 1) // 2).tolist()
+
+
+def _rule_lines(binary: np.ndarray, kernel: int, min_extent: float) -> List[int]:
+    """rule_centres for the rows of a binary crop (columns: pass its transpose)."""
+    if kernel < 1 or binary.size == 0:
+        return []
+    anchor = kernel // 2
+    # Projection profile: a line with fewer ink pixels than the shortest run that
+    # can survive the opening (interior, or touching either border) has no rule.
+    span = _ITERATIONS * (kernel - 1)
+    shortest = max(1, min(span + 1, span - _ITERATIONS * anchor + 1, _ITERATIONS * anchor + 1))
+    candidates = np.nonzero(np.count_nonzero(binary, axis=1) >= shortest)[0]
+    if candidates.size == 0:
+        return []
+    line, start, end = _binary_runs(binary[candidates])
+    return rule_centres((candidates[line], start, end), binary.shape[1], kernel, min_extent)
+
+
+def projection_separators(
+    binary: np.ndarray, vertical: Optional[np.ndarray] = None
+) -> Tuple[List[int], List[int]]:
+    """(row ys, column xs) of the rules ``draw_table_grid`` would draw for ``binary``.
+
+    ``binary`` is the inverted threshold of the crop (ink > 0), or a line mask of
+    it; columns are taken from ``vertical`` instead when given.
+    """
+    if vertical is None:
+        vertical = binary
+    height, width = binary.shape[:2]
+    rows = _rule_lines(binary, width // 3, width * 0.3)
+    cols = _rule_lines(vertical.T, height // 10, height * 0.2)
+    return rows, cols
+
@@ -3,6 +3,9 @@
 import subprocess
 from pathlib import Path
 import json
+from typing import Optional
+
+from .document_session import DocumentSession, open_document_session
 
 
 def parse_with_mineru(
@@ -82,17 +85,19 @@ def parse_with_mineru(
 def parse_mineru_with_api(
     pdf_path: Path,
     out_dir: Path,
+    session: Optional[DocumentSession] = None,
 ) -> str:
     """
     Parse PDF using MinerU Python API directly.
     
     This provides more control over the parsing process.
+    An open ``session`` is reused for the text-layer check.
     """
     try:
         from magic_pdf.data.data_reader_writer import FileBasedDataWriter
         from magic_pdf.pipe.UNIPipe import UNIPipe
         from magic_pdf.pipe.OCRPipe import OCRPipe
-        import fitz  # PyMuPDF
+        import fitz  # noqa: F401  # PyMuPDF (text-layer check)
     except ImportError as e:
         raise RuntimeError(f"MinerU modules not available: {e}") from e
     
@@ -113,13 +118,8 @@ def parse_mineru_with_api(
     # Try UNIPipe first (unified pipeline), fallback to OCRPipe
     try:
         # Determine if PDF needs OCR by checking if it has extractable text
-        doc = fitz.open(str(pdf_path))
-        has_text = False
-        for page in doc:
-            if page.get_text().strip():
-                has_text = True
-                break
-        doc.close()
+        with open_document_session(pdf_path, session) as sess:
+            has_text = sess.any_text_layer
         
         if has_text:
             # Use unified pipeline for text PDFs
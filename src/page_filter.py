@@ -0,0 +1,156 @@
+"""Cheap pre-filter for blank and repeated pages (comprehensive mode).
+
+Every page gets a tiny grayscale thumbnail. Pages with almost no ink, and no
+words beyond a page number in their text layer, are blank (separator pages)
+and skip OCR entirely. Pages that repeat an earlier
+page (section covers, signature pages) reuse that page's text and tables.
+
+A repeat is confirmed conservatively, since reusing the wrong page's tables
+would silently corrupt figures. A candidate is an earlier page with the same
+PDF content hash or a perceptual hash within a few bits whose thumbnail agrees
+up to anti-aliasing noise; neither is enough on its own, as a 36 DPI thumbnail
+cannot see one changed 7-9 pt digit ("1 191 012,25" vs "1 191 012,26"), and
+pages that only draw a form XObject (``q /Fm0 Do Q``, as written by page
+imposition or stamping tools) have equal content streams whatever the form
+holds. A candidate is a repeat only if its text-layer words (text and boxes)
+are equal, or, for pages without words, if both pages render identically at
+the DPI they would be OCR'd at.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+from .config import (
+    PAGE_BLANK_MAX_INK,
+    PAGE_DUP_MAX_HAMMING,
+    PAGE_DUP_PIXEL_TOLERANCE,
+    PAGE_FILTER_DPI,
+    RENDER_CHUNK_PAGES,
+)
+from .page_renderer import BITONAL_THRESHOLD, COLOR_GRAY
+
+if TYPE_CHECKING:
+    from .document_session import DocumentSession
+    from .page_renderer import PageRenderer
+
+
+SKIP_BLANK = "blank"
+SKIP_DUPLICATE = "duplicate"
+
+
+@dataclass(frozen=True)
+class PageSkip:
+    """Why a page is not OCR'd; ``same_as`` is the page whose results it reuses."""
+
+    reason: str
+    ink: float
+    same_as: Optional[int] = None
+
+
+def ink_coverage(gray: np.ndarray) -> float:
+    """Share of pixels darker than the ink threshold."""
+    return float(np.count_nonzero(gray < BITONAL_THRESHOLD)) / max(1, gray.size)
+
+
+def dhash(gray: np.ndarray, size: int = 8) -> int:
+    """Difference hash: ``size*size`` bits of horizontal gradient signs."""
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+# Text-layer word: x0, y0, x1, y1, text.
+Word = Tuple[float, float, float, float, str]
+
+
+def _words(session: "DocumentSession", page_num: int) -> List[Word]:
+    return [tuple(w[:5]) for w in session.page(page_num).get_text("words")]
+
+
+def _has_words(words: List[Word]) -> bool:
+    """Whether a text layer has a word with a letter (more than a page number)."""
+    return any(re.search(r"[^\W\d_]", w[4]) for w in words)
+
+
+def _same_pixels(a: np.ndarray, b: np.ndarray) -> bool:
+    if a.shape != b.shape:
+        return False
+    diff = np.abs(a.astype(np.int16) - b.astype(np.int16))
+    return not bool(np.any(diff > PAGE_DUP_PIXEL_TOLERANCE))
+
+
+def _same_page(
+    page_renderer: "PageRenderer",
+    page_num: int,
+    other: int,
+    words: List[Word],
+    other_words: List[Word],
+    dpi: int,
+) -> bool:
+    """Whether a candidate repeat is one: equal words, or identical ``dpi`` renders without any."""
+    if words or other_words:
+        return words == other_words
+    page, other_page = (
+        page_renderer.render_range(n, n, dpi, color_mode=COLOR_GRAY)[0] for n in (page_num, other)
+    )
+    return page.shape == other_page.shape and bool(np.array_equal(page, other_page))
+
+
+def find_skippable_pages(
+    page_renderer: "PageRenderer",
+    page_nums: List[int],
+    page_dpis: Dict[int, int],
+    session: Optional["DocumentSession"] = None,
+    dpi: int = PAGE_FILTER_DPI,
+) -> Dict[int, PageSkip]:
+    """Classify pages from ``dpi`` thumbnails; pages not in the result are processed.
+
+    ``page_nums`` must be contiguous and ascending; ``page_dpis`` are the DPIs
+    the pages are rendered at for OCR, at which repeats without text-layer words
+    are confirmed. A duplicate always points at an earlier, processed page.
+    """
+    if cv2 is None:
+        raise ImportError(
+            "opencv-python not installed. Install with: pip install opencv-python-headless"
+        )
+
+    skips: Dict[int, PageSkip] = {}
+    # Processed pages so far: (page, dhash, content hash, thumbnail, words).
+    seen: List[Tuple[int, int, Optional[str], np.ndarray, List[Word]]] = []
+    for i in range(0, len(page_nums), RENDER_CHUNK_PAGES):
+        chunk = page_nums[i:i + RENDER_CHUNK_PAGES]
+        thumbs = page_renderer.render_range(chunk[0], chunk[-1], dpi, color_mode=COLOR_GRAY)
+        for page_num, thumb in zip(chunk, thumbs, strict=False):
+            ink = ink_coverage(thumb)
+            words = _words(session, page_num) if session is not None else []
+            if ink <= PAGE_BLANK_MAX_INK and not _has_words(words):
+                skips[page_num] = PageSkip(SKIP_BLANK, ink)
+                continue
+            phash = dhash(thumb)
+            content = session.page_hash(page_num) if session is not None else None
+            for other, other_phash, other_content, other_thumb, other_words in seen:
+                candidate = (content is not None and content == other_content) or (
+                    bin(phash ^ other_phash).count("1") <= PAGE_DUP_MAX_HAMMING
+                )
+                if (
+                    candidate
+                    and _same_pixels(thumb, other_thumb)
+                    and _same_page(
+                        page_renderer, page_num, other, words, other_words, page_dpis[page_num]
+                    )
+                ):
+                    skips[page_num] = PageSkip(SKIP_DUPLICATE, ink, same_as=other)
+                    break
+            else:
+                seen.append((page_num, phash, content, thumb, words))
+    return skips
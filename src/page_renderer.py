@@ -0,0 +1,399 @@
+"""Pluggable PDF page renderers for the visual table pipeline.
+
+Backends:
+- ``pdf2image``: Poppler ``pdftoppm`` via pdf2image (the default mandated in README).
+- ``pymupdf``: in-process PyMuPDF (fitz). Opens the document once and renders
+  pages straight to pixmaps, without a subprocess per page or a PIL round trip.
+
+Both backends return ``uint8`` numpy arrays and can write PNGs, so the renderer
+can be chosen per deployment without touching the callers. The colour mode is
+``rgb`` (H, W, 3), ``gray`` (H, W) or ``bitonal`` (H, W, values 0/255); the two
+single-channel modes take a third of the memory and image I/O of RGB.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+    from .document_session import DocumentSession
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+
+RENDERER_PDF2IMAGE = "pdf2image"
+RENDERER_PYMUPDF = "pymupdf"
+DEFAULT_RENDERER = RENDERER_PDF2IMAGE
+
+COLOR_RGB = "rgb"
+COLOR_GRAY = "gray"
+COLOR_BITONAL = "bitonal"
+COLOR_MODES = (COLOR_RGB, COLOR_GRAY, COLOR_BITONAL)
+
+# Ink/paper cut for bitonal renders; the same threshold the OpenCV table detection uses.
+BITONAL_THRESHOLD = 180
+
+
+def page_image_name(page_number: int) -> str:
+    """File name used for a rendered page image (1-indexed)."""
+    return f"page_{page_number:04d}.png"
+
+
+def check_color_mode(color_mode: str) -> str:
+    if color_mode not in COLOR_MODES:
+        raise ValueError(
+            f"Unknown colour mode: {color_mode!r} (expected one of: {', '.join(COLOR_MODES)})"
+        )
+    return color_mode
+
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    """Threshold a grayscale array to 0 (ink) / 255 (paper)."""
+    return np.where(gray < BITONAL_THRESHOLD, 0, 255).astype(np.uint8)
+
+
+def convert_color_mode(image: np.ndarray, color_mode: str) -> np.ndarray:
+    """Convert an RGB or grayscale array to ``color_mode`` (no-op if already there)."""
+    if color_mode == COLOR_RGB:
+        return image if image.ndim == 3 else np.repeat(image[:, :, None], 3, axis=2)
+    if image.ndim == 3:
+        # ITU-R BT.601 luma, as cv2.COLOR_RGB2GRAY.
+        image = (image @ np.array([0.299, 0.587, 0.114])).round().astype(np.uint8)
+    return binarize(image) if color_mode == COLOR_BITONAL else image
+
+
+def save_png(image: np.ndarray, out_path: Path) -> Path:
+    """Write an RGB or single-channel uint8 array as PNG."""
+    from PIL import Image
+
+    Image.fromarray(image).save(out_path, "PNG")
+    return out_path
+
+
+class PageRenderer:
+    """Base class: renders 1-indexed PDF pages to RGB arrays or PNG files.
+
+    Renderers are context managers; ``close()`` releases any open document handle.
+    A shared ``DocumentSession`` may be passed in; it stays owned by the caller.
+    """
+
+    name: str = ""
+    # Bumped whenever the backend's output for the same input may change.
+    version: str = "1"
+
+    def __init__(self, pdf_path: Path, session: Optional["DocumentSession"] = None) -> None:
+        self.pdf_path = pdf_path
+        self.session = session
+
+    def __enter__(self) -> "PageRenderer":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release resources held by the renderer."""
+
+    def page_count(self) -> int:
+        raise NotImplementedError
+
+    def render_page(self, page_number: int, dpi: int, color_mode: str = COLOR_RGB) -> np.ndarray:
+        """Render a page (1-indexed) to a uint8 array in ``color_mode``."""
+        raise NotImplementedError
+
+    def render_to_file(
+        self, page_number: int, dpi: int, out_path: Path, color_mode: str = COLOR_RGB
+    ) -> Path:
+        """Render a page (1-indexed) to a PNG file and return its path."""
+        raise NotImplementedError
+
+    def render_clip(
+        self,
+        page_number: int,
+        dpi: int,
+        clip: Tuple[float, float, float, float],
+        color_mode: str = COLOR_RGB,
+    ) -> np.ndarray:
+        """Render only ``clip`` (x0, y0, x1, y1 in PDF points) of a page to an array.
+
+        Generic fallback: render the full page and slice it.
+        """
+        image = self.render_page(page_number, dpi, color_mode)
+        zoom = dpi / 72
+        x0, y0, x1, y1 = (int(round(v * zoom)) for v in clip)
+        return image[max(0, y0):y1, max(0, x0):x1].copy()
+
+    def render_range(
+        self,
+        first_page: int,
+        last_page: int,
+        dpi: int,
+        thread_count: int = 1,
+        color_mode: str = COLOR_RGB,
+    ) -> List[np.ndarray]:
+        """Render pages ``first_page..last_page`` (inclusive) to arrays in memory."""
+        return [self.render_page(n, dpi, color_mode) for n in range(first_page, last_page + 1)]
+
+    def render_range_to_dir(
+        self,
+        first_page: int,
+        last_page: int,
+        dpi: int,
+        output_dir: Path,
+        thread_count: int = 1,
+        color_mode: str = COLOR_RGB,
+    ) -> Dict[int, Path]:
+        """Render pages ``first_page..last_page`` (inclusive) to ``page_NNNN.png`` files.
+
+        Returns:
+            Mapping page_number -> image path for every page written
+        """
+        out: Dict[int, Path] = {}
+        for page_number in range(first_page, last_page + 1):
+            out[page_number] = self.render_to_file(
+                page_number, dpi, output_dir / page_image_name(page_number), color_mode
+            )
+        return out
+
+
+class Pdf2ImageRenderer(PageRenderer):
+    """Poppler ``pdftoppm`` renderer (one subprocess per call)."""
+
+    name = RENDERER_PDF2IMAGE
+
+    def __init__(self, pdf_path: Path, session: Optional["DocumentSession"] = None) -> None:
+        super().__init__(pdf_path, session)
+        try:
+            from pdf2image import convert_from_path, pdfinfo_from_path
+        except ImportError:
+            raise ImportError(
+                "pdf2image not installed. Install with: pip install pdf2image\n"
+                "Also requires poppler-utils. On Windows:\n"
+                "1. Download from: https://github.com/oschwartz10612/poppler-windows/releases\n"
+                "2. Extract to C:\\poppler or similar\n"
+                "3. Add to PATH or set poppler_path parameter"
+            ) from None
+        self._convert_from_path = convert_from_path
+        self._pdfinfo_from_path = pdfinfo_from_path
+        self._page_count: Optional[int] = None
+
+    def page_count(self) -> int:
+        if self.session is not None:
+            return self.session.page_count
+        if self._page_count is None:
+            info = self._pdfinfo_from_path(str(self.pdf_path))
+            self._page_count = int(info.get("Pages", 0))
+        return self._page_count
+
+    def _to_array(self, image: "Image.Image", color_mode: str) -> np.ndarray:
+        if color_mode == COLOR_RGB:
+            return np.array(image.convert("RGB"))
+        return convert_color_mode(np.array(image.convert("L")), color_mode)
+
+    def render_page(self, page_number: int, dpi: int, color_mode: str = COLOR_RGB) -> np.ndarray:
+        images = self._convert_from_path(
+            str(self.pdf_path),
+            dpi=dpi,
+            first_page=page_number,
+            last_page=page_number,
+            grayscale=check_color_mode(color_mode) != COLOR_RGB,
+        )
+        if not images:
+            raise RuntimeError(f"pdf2image returned no image for page {page_number}")
+        return self._to_array(images[0], color_mode)
+
+    def render_range(
+        self,
+        first_page: int,
+        last_page: int,
+        dpi: int,
+        thread_count: int = 1,
+        color_mode: str = COLOR_RGB,
+    ) -> List[np.ndarray]:
+        """Render a page range with parallel ``pdftoppm`` processes, in memory.
+
+        Pages come back as raw PPM/PGM buffers (no PNG encode/decode).
+        """
+        images = self._convert_from_path(
+            str(self.pdf_path),
+            dpi=dpi,
+            first_page=first_page,
+            last_page=last_page,
+            thread_count=max(1, thread_count),
+            grayscale=check_color_mode(color_mode) != COLOR_RGB,
+        )
+        return [self._to_array(img, color_mode) for img in images]
+
+    def render_to_file(
+        self, page_number: int, dpi: int, out_path: Path, color_mode: str = COLOR_RGB
+    ) -> Path:
+        if color_mode == COLOR_BITONAL:
+            return save_png(self.render_page(page_number, dpi, color_mode), out_path)
+        images = self._convert_from_path(
+            str(self.pdf_path),
+            dpi=dpi,
+            fmt="png",
+            first_page=page_number,
+            last_page=page_number,
+            grayscale=check_color_mode(color_mode) == COLOR_GRAY,
+        )
+        if not images:
+            raise RuntimeError(f"pdf2image returned no image for page {page_number}")
+        images[0].save(out_path, "PNG")
+        return out_path
+
+    def render_range_to_dir(
+        self,
+        first_page: int,
+        last_page: int,
+        dpi: int,
+        output_dir: Path,
+        thread_count: int = 1,
+        color_mode: str = COLOR_RGB,
+    ) -> Dict[int, Path]:
+        """Render a page range with parallel ``pdftoppm`` processes.
+
+        ``pdftoppm`` writes the PNGs itself (``output_folder`` + ``paths_only``), so
+        nothing is decoded into PIL and re-encoded. Files land in a staging folder
+        first and are renamed into place, so a crash never leaves a partial
+        ``page_NNNN.png`` behind for the resume logic to pick up. Bitonal pages
+        are thresholded in Python (pdftoppm's ``-mono`` writes PBM only).
+        """
+        if check_color_mode(color_mode) == COLOR_BITONAL:
+            return super().render_range_to_dir(
+                first_page, last_page, dpi, output_dir, thread_count, color_mode
+            )
+        staging = Path(tempfile.mkdtemp(prefix=".render_", dir=str(output_dir)))
+        try:
+            paths = self._convert_from_path(
+                str(self.pdf_path),
+                dpi=dpi,
+                fmt="png",
+                first_page=first_page,
+                last_page=last_page,
+                thread_count=max(1, thread_count),
+                grayscale=color_mode == COLOR_GRAY,
+                output_folder=str(staging),
+                output_file="p",
+                paths_only=True,
+            )
+            out: Dict[int, Path] = {}
+            for path in paths:
+                # pdftoppm names files "<prefix>-<page>.png" (page zero-padded).
+                page_number = int(Path(path).stem.rsplit("-", 1)[1])
+                target = output_dir / page_image_name(page_number)
+                os.replace(path, target)
+                out[page_number] = target
+            return out
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+class PyMuPDFRenderer(PageRenderer):
+    """In-process PyMuPDF renderer; the document is opened once per renderer."""
+
+    name = RENDERER_PYMUPDF
+
+    def __init__(self, pdf_path: Path, session: Optional["DocumentSession"] = None) -> None:
+        super().__init__(pdf_path, session)
+        if fitz is None:
+            raise ImportError("PyMuPDF not installed. Install with: pip install pymupdf")
+        self._owns_doc = session is None
+        self._doc = fitz.open(str(pdf_path)) if session is None else session.doc
+
+    def close(self) -> None:
+        if self._doc is not None and self._owns_doc:
+            self._doc.close()
+        self._doc = None
+
+    def page_count(self) -> int:
+        return len(self._doc)
+
+    def _pixmap(
+        self,
+        page_number: int,
+        dpi: int,
+        color_mode: str = COLOR_RGB,
+        clip: Optional[Tuple[float, float, float, float]] = None,
+    ) -> "fitz.Pixmap":
+        """Rasterize a page (or just ``clip``); gray/bitonal draw straight into one channel."""
+        page = self._doc[page_number - 1]
+        zoom = dpi / 72  # 72 is default PDF DPI
+        colorspace = fitz.csRGB if check_color_mode(color_mode) == COLOR_RGB else fitz.csGRAY
+        return page.get_pixmap(
+            matrix=fitz.Matrix(zoom, zoom),
+            colorspace=colorspace,
+            clip=fitz.Rect(*clip) if clip is not None else None,
+            alpha=False,
+        )
+
+    def render_page(self, page_number: int, dpi: int, color_mode: str = COLOR_RGB) -> np.ndarray:
+        image = pixmap_to_array(self._pixmap(page_number, dpi, color_mode))
+        return image if color_mode == COLOR_RGB else convert_color_mode(image[:, :, 0], color_mode)
+
+    def render_clip(
+        self,
+        page_number: int,
+        dpi: int,
+        clip: Tuple[float, float, float, float],
+        color_mode: str = COLOR_RGB,
+    ) -> np.ndarray:
+        """Rasterize only the clip rectangle; the rest of the page is never drawn."""
+        image = pixmap_to_array(self._pixmap(page_number, dpi, color_mode, clip))
+        return image if color_mode == COLOR_RGB else convert_color_mode(image[:, :, 0], color_mode)
+
+    def render_to_file(
+        self, page_number: int, dpi: int, out_path: Path, color_mode: str = COLOR_RGB
+    ) -> Path:
+        if color_mode == COLOR_BITONAL:
+            return save_png(self.render_page(page_number, dpi, color_mode), out_path)
+        self._pixmap(page_number, dpi, color_mode).save(str(out_path))
+        return out_path
+
+
+def pixmap_to_array(pix: "fitz.Pixmap") -> np.ndarray:
+    """Copy a PyMuPDF pixmap into an (H, W, n) uint8 array (n=1 gray, 3 RGB)."""
+    buf = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+    rows = buf.reshape(pix.height, pix.stride)[:, : pix.width * pix.n]
+    return rows.reshape(pix.height, pix.width, pix.n).copy()
+
+
+_RENDERERS: Dict[str, Type[PageRenderer]] = {
+    RENDERER_PDF2IMAGE: Pdf2ImageRenderer,
+    RENDERER_PYMUPDF: PyMuPDFRenderer,
+}
+
+RENDERER_NAMES = tuple(_RENDERERS)
+
+
+def renderer_class(name: str) -> Type[PageRenderer]:
+    """Renderer class by name, without opening anything (for ``name``/``version``)."""
+    try:
+        return _RENDERERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown renderer: {name!r} (expected one of: {', '.join(RENDERER_NAMES)})"
+        ) from None
+
+
+def get_renderer(
+    name: str,
+    pdf_path: Path,
+    session: Optional["DocumentSession"] = None,
+) -> PageRenderer:
+    """Create a renderer by name (``pdf2image`` or ``pymupdf``).
+
+    With a ``session`` the renderer reuses its open document and cached page count.
+    """
+    return renderer_class(name)(pdf_path, session)
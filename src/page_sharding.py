@@ -0,0 +1,96 @@
+"""Sharding comprehensive-mode pages across worker processes.
+
+One process drives one PP-Structure engine page after page, which leaves most
+cores of a many-core CPU idle. With ``--workers N`` the pages are split into N
+shards, each processed by its own process and engine (see
+comprehensive_table_parser._process_sharded), and merged back in page order.
+
+A page's cost is estimated without rendering it: its pixel count at the DPI it
+will be rendered at, times one plus the number of table blocks the PyMuPDF
+prepass finds in its text layer (every region is one more PP-Structure call).
+``shard_pages`` balances the shards by that cost (largest page first, onto the
+lightest shard).
+
+Every worker gets an equal share of the cores for its math libraries, OpenCV
+and Paddle (``worker_threads``), so N workers do not each start a thread per
+core. The thread variables are read when those libraries load, so they are set
+in the parent's environment while the workers are spawned (``worker_thread_env``);
+``limit_worker_threads`` sets the rest inside each worker.
+"""
+
+from __future__ import annotations
+
+import os
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from .document_session import DocumentSession
+from .engine_registry import set_cpu_threads
+from .pymupdf_prepass import detect_page_table_regions
+
+# Thread-count variables of the BLAS/OpenMP runtimes numpy, OpenCV and Paddle use.
+_THREAD_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def page_cost(session: Optional[DocumentSession], page_num: int, dpi: int) -> float:
+    """Estimated work of one page: pixels at ``dpi`` x (1 + prepass table blocks); 1.0 without a session."""
+    if session is None:
+        return 1.0
+    width, height = session.page_size(page_num)
+    pixels = (width * dpi / 72) * (height * dpi / 72)
+    try:
+        regions = len(detect_page_table_regions(session.page(page_num), page_num - 1))
+    except Exception:
+        regions = 0
+    return pixels * (1 + regions)
+
+
+def shard_pages(costs: Dict[int, float], workers: int) -> List[List[int]]:
+    """
+    Split pages into at most ``workers`` shards of similar total cost.
+
+    Pages are placed largest first onto the currently lightest shard (ties go
+    to the lower page number and the lower shard), so the split is the same on
+    every run.
+
+    Returns:
+        Non-empty shards, each in page order
+    """
+    shards: List[List[int]] = [[] for _ in range(max(1, min(workers, len(costs))))]
+    loads = [0.0] * len(shards)
+    for page_num in sorted(costs, key=lambda n: (-costs[n], n)):
+        i = loads.index(min(loads))
+        shards[i].append(page_num)
+        loads[i] += costs[page_num]
+    return [sorted(s) for s in shards if s]
+
+
+def worker_threads(workers: int) -> int:
+    """Threads per worker so that ``workers`` of them fill the cores once."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+@contextmanager
+def worker_thread_env(threads: int) -> Iterator[None]:
+    """Set the thread-count variables for processes spawned inside, then restore them."""
+    saved = {name: os.environ.get(name) for name in _THREAD_VARS}
+    os.environ.update({name: str(threads) for name in _THREAD_VARS})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def limit_worker_threads(threads: int) -> None:
+    """Worker process initializer: OpenCV and PP-Structure engines use ``threads`` threads."""
+    try:
+        import cv2
+
+        cv2.setNumThreads(threads)
+    except ImportError:
+        pass
+    set_cpu_threads(threads)
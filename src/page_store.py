@@ -0,0 +1,131 @@
+"""Memory-mapped store of rendered page images, one per document.
+
+Pages are kept as raw (uncompressed) pixel buffers in a single ``pages.bin``,
+with an ``index.json`` mapping page number -> offset/shape/dtype. Reading a
+page maps it straight from the file: no PNG decode, and crops of a page are
+plain slices of the mapping, so only the rows a crop touches are ever paged in.
+
+The store is tied to a render fingerprint (PDF content hash, DPI, colour mode,
+renderer); opening it with a different fingerprint starts it afresh. It gives
+random access by page for resume, reprocessing and ``--visual-pages``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from .page_renderer import COLOR_RGB, renderer_class
+from .render_cache import pdf_content_hash, render_fingerprint
+
+
+DATA_NAME = "pages.bin"
+INDEX_NAME = "index.json"
+
+# Page buffers start on page-size boundaries so each maps cleanly on its own.
+_ALIGN = 4096
+
+
+class PageStore:
+    """Append-only page image store under ``root`` (one writer at a time).
+
+    ``get`` returns read-only arrays backed by the memory map; callers that
+    draw on a page must copy it first (``draw_table_grid`` already does).
+    """
+
+    def __init__(self, root: Path, fingerprint: Dict[str, object]) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.data_path = self.root / DATA_NAME
+        self.index_path = self.root / INDEX_NAME
+        self.fingerprint = fingerprint
+        self._pages: Dict[int, Dict[str, object]] = {}
+
+        try:
+            index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            index = {}
+        if index.get("fingerprint") == fingerprint and self.data_path.exists():
+            self._pages = {int(k): v for k, v in index.get("pages", {}).items()}
+        else:
+            # Different PDF/DPI/colour mode/renderer (or a fresh store): start over.
+            self.data_path.write_bytes(b"")
+            self._write_index()
+
+    def __contains__(self, page_number: object) -> bool:
+        return page_number in self._pages
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def pages(self) -> List[int]:
+        return sorted(self._pages)
+
+    def get(self, page_number: int) -> Optional[np.ndarray]:
+        """Page image as a read-only array mapped from disk, or None if not stored."""
+        entry = self._pages.get(page_number)
+        if entry is None:
+            return None
+        mapped = np.memmap(
+            self.data_path,
+            dtype=np.dtype(str(entry["dtype"])),
+            mode="r",
+            offset=int(entry["offset"]),
+            shape=tuple(entry["shape"]),
+        )
+        return mapped.view(np.ndarray)
+
+    def put(self, page_number: int, image: np.ndarray) -> np.ndarray:
+        """Store a page image (replacing any earlier one) and return the mapped copy."""
+        image = np.ascontiguousarray(image)
+        # Always append (a replaced page's old bytes stay until the store is reset):
+        # existing mappings stay valid, and the index is only updated once the
+        # pixels are written, so a crash never leaves an entry pointing at a partial page.
+        with self.data_path.open("ab") as f:
+            end = f.seek(0, os.SEEK_END)
+            offset = -(-end // _ALIGN) * _ALIGN
+            f.write(b"\0" * (offset - end))
+            f.write(image.tobytes())
+        self._pages[page_number] = {
+            "offset": offset,
+            "shape": list(image.shape),
+            "dtype": image.dtype.str,
+        }
+        self._write_index()
+        return self.get(page_number)
+
+    def _write_index(self) -> None:
+        tmp = self.index_path.with_name(f".{INDEX_NAME}.tmp")
+        tmp.write_text(
+            json.dumps(
+                {
+                    "fingerprint": self.fingerprint,
+                    "pages": {str(k): v for k, v in sorted(self._pages.items())},
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.index_path)
+
+
+def open_page_store(
+    root: Path,
+    pdf_path: Path,
+    dpi: Union[int, str],
+    renderer: str,
+    color_mode: str = COLOR_RGB,
+) -> PageStore:
+    """Open (or start afresh) the store for pages of ``pdf_path`` rendered this way.
+
+    ``dpi`` is a fixed DPI or a DPI planner label (``DpiPlanner.label``).
+    """
+    backend = renderer_class(renderer)
+    fingerprint = render_fingerprint(
+        pdf_content_hash(pdf_path), dpi, backend.name, backend.version, color_mode
+    )
+    return PageStore(root, fingerprint)
@@ -0,0 +1,119 @@
+"""Tiling for pages above a pixel budget (A3 fold-outs and larger).
+
+A page whose render would exceed ``max_pixels`` is cut into a grid of
+overlapping tiles that each fit the budget. Every tile owns a *core*
+rectangle; the cores partition the page, and tiles extend past their core by
+half the overlap on interior sides. Results found in several tiles are
+de-duplicated by ownership: an OCR token is kept only by the tile whose core
+contains its centre, and region boxes that meet in an overlap band are merged.
+
+Pure functions, no I/O; coordinates are page pixels at the render DPI.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Sequence, Tuple
+
+Box = Tuple[float, float, float, float]
+
+
+@dataclass(frozen=True)
+class Tile:
+    # Rendered area: x0, y0, x1, y1
+    box: Tuple[int, int, int, int]
+    # Owned area (cores of all tiles partition the page)
+    core: Tuple[int, int, int, int]
+
+    @property
+    def pixels(self) -> int:
+        return (self.box[2] - self.box[0]) * (self.box[3] - self.box[1])
+
+    def owns(self, x: float, y: float) -> bool:
+        return self.core[0] <= x < self.core[2] and self.core[1] <= y < self.core[3]
+
+
+def _cuts(length: int, parts: int) -> List[int]:
+    return [round(k * length / parts) for k in range(parts + 1)]
+
+
+def plan_tiles(width: int, height: int, max_pixels: int, overlap: int) -> List[Tile]:
+    """Smallest grid of overlapping tiles, each at most ``max_pixels``.
+
+    A page within the budget is a single tile.
+    """
+    if width * height <= max_pixels:
+        return [Tile((0, 0, width, height), (0, 0, width, height))]
+    if max_pixels <= (2 * overlap) ** 2:
+        raise ValueError(f"Tile overlap {overlap} px is too large for a {max_pixels} pixel budget")
+
+    def tile_pixels(cols: int, rows: int) -> float:
+        w = math.ceil(width / cols) + (overlap if cols > 1 else 0)
+        h = math.ceil(height / rows) + (overlap if rows > 1 else 0)
+        return w * h
+
+    needed = width * height / max_pixels
+    cols = max(1, int(math.sqrt(needed * width / height)))
+    rows = max(1, math.ceil(needed / cols))
+    while tile_pixels(cols, rows) > max_pixels:
+        # Split along the longer tile side.
+        if width / cols >= height / rows:
+            cols += 1
+        else:
+            rows += 1
+
+    half = overlap // 2
+    xs, ys = _cuts(width, cols), _cuts(height, rows)
+    tiles: List[Tile] = []
+    for r in range(rows):
+        for c in range(cols):
+            core = (xs[c], ys[r], xs[c + 1], ys[r + 1])
+            box = (
+                max(0, core[0] - half),
+                max(0, core[1] - half),
+                min(width, core[2] + half),
+                min(height, core[3] + half),
+            )
+            tiles.append(Tile(box, core))
+    return tiles
+
+
+def fit_dpi(width_pt: float, height_pt: float, dpi: int, max_pixels: int) -> int:
+    """Largest DPI <= ``dpi`` at which a ``width_pt`` x ``height_pt`` area fits the budget."""
+    area_in2 = (width_pt / 72.0) * (height_pt / 72.0)
+    if area_in2 <= 0:
+        return dpi
+    return max(1, min(dpi, int(math.sqrt(max_pixels / area_in2))))
+
+
+def owned_tokens(tile: Tile, texts: Sequence[Any], boxes: Iterable[Any]) -> List[Tuple[str, Box]]:
+    """OCR tokens of one tile in page coordinates, keeping those whose centre ``tile`` owns.
+
+    ``boxes`` are (x0, y0, x1, y1) in tile pixels, parallel to ``texts``.
+    """
+    ox, oy = tile.box[0], tile.box[1]
+    out: List[Tuple[str, Box]] = []
+    for text, b in zip(texts, boxes, strict=False):
+        x0, y0, x1, y1 = (float(b[0]) + ox, float(b[1]) + oy, float(b[2]) + ox, float(b[3]) + oy)
+        if tile.owns((x0 + x1) / 2.0, (y0 + y1) / 2.0):
+            out.append((str(text), (x0, y0, x1, y1)))
+    return out
+
+
+def merge_boxes(boxes: Iterable[Box], gap: float = 0.0) -> List[Box]:
+    """Union boxes that intersect (or lie within ``gap`` of each other)."""
+    merged: List[Box] = []
+    for box in boxes:
+        x0, y0, x1, y1 = box
+        changed = True
+        while changed:
+            changed = False
+            for i, (a0, b0, a1, b1) in enumerate(merged):
+                if x0 <= a1 + gap and a0 <= x1 + gap and y0 <= b1 + gap and b0 <= y1 + gap:
+                    x0, y0, x1, y1 = min(x0, a0), min(y0, b0), max(x1, a1), max(y1, b1)
+                    del merged[i]
+                    changed = True
+                    break
+        merged.append((x0, y0, x1, y1))
+    return merged
@@ -4,13 +4,53 @@ import json
 from pathlib import Path
 from typing import List, Dict
 
-from .config import DEFAULT_OUT_DIR
+from .config import DEFAULT_OUT_DIR, PAGE_TILE_MAX_PIXELS, PREDICT_BATCH_MAX_PIXELS, PREDICT_BATCH_SIZE
+from .document_session import DocumentSession, open_document_session
+from .dpi_planner import DpiPlanner
+from .render_cache import RenderCache
+from .table_templates import TemplateCache
 from .pymupdf_prepass import save_table_regions, crop_table_images
 from .table_fixer import fix_parsed_tables
 from .text_cleanup import cleanup_parsed_text
 from .validate_financials import validate_all_financials, format_validation_report, add_validation_comments_to_markdown
 from .repair_tables import repair_table_markdown, RepairRecord
 from .ocr_dedup import filter_ocr_text_against_tables
+from .pymupdf_tables_parser import PYMUPDF_TABLES_OFF, PYMUPDF_TABLES_ONLY, extract_native_tables
+
+
+def _parse_native_tables(
+    mode: str,
+    session: DocumentSession | None,
+) -> str:
+    """
+    Markdown from PyMuPDF's table finder, or "" to go on with the other parsers.
+
+    With mode "first" the result is kept only when no page needs OCR and it
+    found at least one table; with "only" it is always kept.
+
+    Raises:
+        RuntimeError: If mode is "only" and the table finder fails
+    """
+    print("\nPyMuPDF table finder (text layer, no OCR)...")
+    try:
+        if session is None:
+            raise ImportError("PyMuPDF not installed. Install with: pip install pymupdf")
+        result = extract_native_tables(session)
+    except Exception as e:
+        if mode == PYMUPDF_TABLES_ONLY:
+            raise RuntimeError(f"PyMuPDF table finder failed: {e}") from e
+        print(f"  PyMuPDF table finder failed: {e}")
+        return ""
+
+    print(f"  Found {result.tables} tables on {session.page_count} pages")
+    if mode == PYMUPDF_TABLES_ONLY or result.complete:
+        return result.markdown
+    if result.ocr_pages:
+        shown = ", ".join(str(p) for p in result.ocr_pages[:10])
+        print(f"  {len(result.ocr_pages)} pages need OCR ({shown}); continuing with the other parsers")
+    else:
+        print("  No tables found; continuing with the other parsers")
+    return ""
 
 
 def process_pdf(
@@ -24,6 +64,27 @@ def process_pdf(
     comprehensive_mode: bool = False,
     comprehensive_max_pages: int | None = None,
     comprehensive_start_page: int = 1,
+    comprehensive_renderer: str = "pdf2image",
+    comprehensive_save_page_images: bool = True,
+    comprehensive_debug_images: bool = False,
+    comprehensive_two_pass: bool = False,
+    comprehensive_render_cache: RenderCache | None = None,
+    comprehensive_color_mode: str = "rgb",
+    use_page_store: bool = False,
+    comprehensive_dpi: int = 300,
+    adaptive_dpi: bool = False,
+    comprehensive_skip_pages: bool = False,
+    comprehensive_tile_max_pixels: int = PAGE_TILE_MAX_PIXELS,
+    comprehensive_grid_engine: str = "morphology",
+    comprehensive_region_source: str = "opencv",
+    comprehensive_text_layer: bool = False,
+    comprehensive_pack_regions: bool = False,
+    comprehensive_template_cache: TemplateCache | None = None,
+    comprehensive_single_pass: bool = False,
+    comprehensive_predict_batch: int = PREDICT_BATCH_SIZE,
+    comprehensive_predict_batch_pixels: int = PREDICT_BATCH_MAX_PIXELS,
+    comprehensive_workers: int = 1,
+    pymupdf_tables: str = "off",
 ) -> Path:
     """
     Process a single PDF file with PyMuPDF prepass + MinerU/Docling + fixes.
@@ -38,6 +99,42 @@ def process_pdf(
         out_dir: Directory for output files (defaults to DEFAULT_OUT_DIR)
         use_mineru: Use MinerU as primary parser (recommended for tables)
         use_gpu: Whether to use CUDA GPU acceleration
+        comprehensive_renderer: Page renderer for comprehensive mode ("pdf2image" or "pymupdf")
+        comprehensive_save_page_images: Write page PNGs (linked from the markdown)
+        comprehensive_debug_images: Write gridded table-region PNGs for debugging
+        comprehensive_two_pass: Low-DPI triage, then clip-render only table regions at full DPI
+        comprehensive_render_cache: Shared cache of rendered pages (None disables it)
+        comprehensive_color_mode: Page render colour mode ("rgb", "gray" or "bitonal")
+        use_page_store: Keep rendered pages in a memory-mapped work/page_store (comprehensive
+            mode and visual table pages) so reruns map them instead of rendering/decoding
+        comprehensive_dpi: Page render DPI in comprehensive mode (the ceiling with adaptive_dpi)
+        adaptive_dpi: Pick each page's DPI from its smallest numeric font size (comprehensive
+            mode and visual table pages); see dpi_planner.py
+        comprehensive_skip_pages: Skip OCR on blank pages and reuse results for repeated pages
+        comprehensive_tile_max_pixels: Pixel budget per render; larger pages are processed
+            in overlapping tiles (0 disables tiling)
+        comprehensive_grid_engine: Table grid engine ("morphology" or "projection"); see
+            grid_profiles.py
+        comprehensive_region_source: Table region detection ("opencv" on the rendered page,
+            "vector" from the PDF's vector rules, "prepass" from numeric text blocks, or
+            "layout" from PP-Structure's layout model); see vector_rules.py and
+            pymupdf_prepass.py
+        comprehensive_text_layer: Take born-digital pages' words from the PDF text layer
+            instead of OCR; see text_layer.py
+        comprehensive_pack_regions: Predict small table regions together on shared
+            canvases; see region_packing.py
+        comprehensive_template_cache: Table layout templates shared across runs; regions
+            matching one are read with OCR only (None disables it); see table_templates.py
+        comprehensive_single_pass: One PP-Structure call per page for both text and tables;
+            table regions are predicted again only where that call got them wrong
+        comprehensive_predict_batch: Images per PP-Structure call for a page's table
+            regions (1 predicts them one at a time); see predict_batch.py
+        comprehensive_predict_batch_pixels: Pixel budget of one batched call
+        comprehensive_workers: Worker processes sharing the pages, each with its own
+            PP-Structure engine (1 processes them in this process); see page_sharding.py
+        pymupdf_tables: PyMuPDF's native table finder ("off", "first" to try it before
+            MinerU/Docling or comprehensive mode and keep it when the text layer covers
+            every page, or "only"); see pymupdf_tables_parser.py
 
     Returns:
         Path to the generated markdown file
@@ -49,12 +146,93 @@ def process_pdf(
     if not pdf_path.exists():
         raise FileNotFoundError(f"PDF file not found: {pdf_path}")
 
+    # Open the PDF once; every stage below shares this session (None without PyMuPDF).
+    with open_document_session(pdf_path) as session:
+        return _process_pdf(
+            pdf_path,
+            out_dir=out_dir,
+            use_mineru=use_mineru,
+            use_gpu=use_gpu,
+            validate_with_second_parser=validate_with_second_parser,
+            use_visual_table_detection=use_visual_table_detection,
+            visual_table_pages=visual_table_pages,
+            comprehensive_mode=comprehensive_mode,
+            comprehensive_max_pages=comprehensive_max_pages,
+            comprehensive_start_page=comprehensive_start_page,
+            comprehensive_renderer=comprehensive_renderer,
+            comprehensive_save_page_images=comprehensive_save_page_images,
+            comprehensive_debug_images=comprehensive_debug_images,
+            comprehensive_two_pass=comprehensive_two_pass,
+            comprehensive_render_cache=comprehensive_render_cache,
+            comprehensive_color_mode=comprehensive_color_mode,
+            use_page_store=use_page_store,
+            comprehensive_dpi=comprehensive_dpi,
+            adaptive_dpi=adaptive_dpi,
+            comprehensive_skip_pages=comprehensive_skip_pages,
+            comprehensive_tile_max_pixels=comprehensive_tile_max_pixels,
+            comprehensive_grid_engine=comprehensive_grid_engine,
+            comprehensive_region_source=comprehensive_region_source,
+            comprehensive_text_layer=comprehensive_text_layer,
+            comprehensive_pack_regions=comprehensive_pack_regions,
+            comprehensive_template_cache=comprehensive_template_cache,
+            comprehensive_single_pass=comprehensive_single_pass,
+            comprehensive_predict_batch=comprehensive_predict_batch,
+            comprehensive_predict_batch_pixels=comprehensive_predict_batch_pixels,
+            comprehensive_workers=comprehensive_workers,
+            pymupdf_tables=pymupdf_tables,
+            session=session,
+        )
+
+
+def _process_pdf(
+    pdf_path: Path,
+    *,
+    out_dir: Path | None,
+    use_mineru: bool,
+    use_gpu: bool,
+    validate_with_second_parser: bool,
+    use_visual_table_detection: bool,
+    visual_table_pages: List[int] | None,
+    comprehensive_mode: bool,
+    comprehensive_max_pages: int | None,
+    comprehensive_start_page: int,
+    comprehensive_renderer: str,
+    comprehensive_save_page_images: bool,
+    comprehensive_debug_images: bool,
+    comprehensive_two_pass: bool,
+    comprehensive_render_cache: RenderCache | None,
+    comprehensive_color_mode: str,
+    use_page_store: bool,
+    comprehensive_dpi: int,
+    adaptive_dpi: bool,
+    comprehensive_skip_pages: bool,
+    comprehensive_tile_max_pixels: int,
+    comprehensive_grid_engine: str,
+    comprehensive_region_source: str,
+    comprehensive_text_layer: bool,
+    comprehensive_pack_regions: bool,
+    comprehensive_template_cache: TemplateCache | None,
+    comprehensive_single_pass: bool,
+    comprehensive_predict_batch: int,
+    comprehensive_predict_batch_pixels: int,
+    comprehensive_workers: int,
+    pymupdf_tables: str,
+    session: DocumentSession | None,
+) -> Path:
     out_dir = out_dir or DEFAULT_OUT_DIR
     out_dir.mkdir(parents=True, exist_ok=True)
     
     work_dir = out_dir / "work"
     work_dir.mkdir(parents=True, exist_ok=True)
 
+    # Cheap first attempt (or only parser): PyMuPDF's table finder, no rendering or models
+    native_md = ""
+    if pymupdf_tables != PYMUPDF_TABLES_OFF:
+        native_md = _parse_native_tables(pymupdf_tables, session)
+        if native_md and comprehensive_mode:
+            print("  Skipping comprehensive mode: using the PyMuPDF table finder output")
+            comprehensive_mode = False
+
     # Comprehensive mode: process ALL pages with visual detection
     if comprehensive_mode:
         print("=" * 70)
@@ -70,10 +248,30 @@ def process_pdf(
             result = process_all_pages_comprehensive(
                 pdf_path,
                 work_dir,
-                dpi=300,
+                dpi=comprehensive_dpi,
                 max_pages=comprehensive_max_pages,
                 start_page=comprehensive_start_page,
                 use_gpu=use_gpu,
+                renderer=comprehensive_renderer,
+                session=session,
+                save_page_images=comprehensive_save_page_images,
+                save_debug_images=comprehensive_debug_images,
+                two_pass=comprehensive_two_pass,
+                render_cache=comprehensive_render_cache,
+                color_mode=comprehensive_color_mode,
+                use_page_store=use_page_store,
+                dpi_planner=DpiPlanner(max_dpi=comprehensive_dpi) if adaptive_dpi else None,
+                skip_pages=comprehensive_skip_pages,
+                tile_max_pixels=comprehensive_tile_max_pixels,
+                grid_engine=comprehensive_grid_engine,
+                region_source=comprehensive_region_source,
+                text_layer=comprehensive_text_layer,
+                pack_regions=comprehensive_pack_regions,
+                templates=comprehensive_template_cache,
+                single_pass=comprehensive_single_pass,
+                predict_batch=comprehensive_predict_batch,
+                predict_batch_pixels=comprehensive_predict_batch_pixels,
+                workers=comprehensive_workers,
             )
 
             # Repair pass (deterministic, equation-based) on extracted tables.
@@ -114,6 +312,12 @@ def process_pdf(
                 page_num = int(page_item.get("page", 0) or 0)
                 md_parts.append(f"\n## Page {page_num}\n\n")
 
+                skip = page_item.get("skip") or {}
+                if skip.get("reason") == "blank":
+                    md_parts.append("*Blank page*\n\n")
+                elif skip.get("same_as"):
+                    md_parts.append(f"*Same content as page {skip['same_as']}*\n\n")
+
                 # Page image reference (keeps original visual context)
                 page_image = page_item.get("page_image")
                 if page_image:
@@ -239,9 +443,23 @@ def process_pdf(
         print("Step 0: Visual table detection for problematic pages...")
         try:
             from .table_image_builder import process_table_page_visually
+            from .page_renderer import DEFAULT_RENDERER
+            from .page_store import open_page_store
             
             # Default: process page 37 (Vesihuoltolaitoksen tase) if not specified
             pages_to_process = visual_table_pages or [37]
+            planner = DpiPlanner() if adaptive_dpi else None
+            page_dpis = planner.plan(session, pages_to_process) if planner else {}
+            store = (
+                open_page_store(
+                    work_dir / "page_store",
+                    pdf_path,
+                    planner.label if planner else 300,
+                    DEFAULT_RENDERER,
+                )
+                if use_page_store
+                else None
+            )
             
             for page_num in pages_to_process:
                 print(f"  Processing page {page_num} visually...")
@@ -251,6 +469,9 @@ def process_pdf(
                     work_dir / "visual_tables",
                     lang='en',  # Use English models (works well for numbers/tables)
                     use_gpu=use_gpu,
+                    session=session,
+                    store=store,
+                    dpi=page_dpis.get(page_num, 300),
                 )
                 if table_md:
                     visual_tables[page_num] = table_md
@@ -265,7 +486,7 @@ def process_pdf(
     # Step 1: PyMuPDF prepass - detect table regions
     print("\nStep 1: PyMuPDF prepass - detecting table regions...")
     try:
-        regions_json = save_table_regions(pdf_path, work_dir / "regions")
+        regions_json = save_table_regions(pdf_path, work_dir / "regions", session=session)
         print(f"  Found table regions, saved to: {regions_json}")
         
         # Crop table images for focused parsing
@@ -274,6 +495,7 @@ def process_pdf(
             regions_json,
             work_dir / "tables",
             dpi=150,
+            session=session,
         )
         print(f"  Cropped {len(table_images)} table images")
     except Exception as e:
@@ -286,7 +508,10 @@ def process_pdf(
     md_text: str = ""
     second_parser_text: str = ""
 
-    if use_mineru:
+    if native_md:
+        print("\nStep 2: Using PyMuPDF table finder output")
+        md_text = native_md
+    elif use_mineru:
         print("\nStep 2: Using MinerU parser (state-of-the-art for tables)...")
         try:
             from .mineru_parser import parse_with_mineru
@@ -297,7 +522,7 @@ def process_pdf(
             print("  Falling back to Docling...")
             use_mineru = False
 
-    if not use_mineru or not md_text:
+    if not md_text:
         print("\nStep 2: Using Docling parser...")
         try:
             from .docling_parser import parse_with_docling
@@ -4,19 +4,29 @@ Uses PyMuPDF to detect table regions in PDF before passing to MinerU/Docling.
 This provides accurate bounding boxes for tables that can be used to:
 1. Crop tables to separate images for focused parsing
 2. Guide table replacement in post-processing
+3. Replace OpenCV region detection in comprehensive mode (``--regions prepass``)
+
+A page can hold several tables: numeric rows are clustered into vertical
+blocks, split by blank gaps, narrative paragraphs and changes of column layout,
+and each block becomes its own region.
 """
 
 import json
+import math
 import re
 from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import List, Tuple
+from statistics import median
+from typing import Dict, List, Optional, Tuple
 
 try:
     import fitz  # PyMuPDF
 except ImportError:
     fitz = None
 
+from .document_session import DocumentSession, open_document_session
+from .text_layer import phrases
+
 
 @dataclass
 class TableRegion:
@@ -31,6 +41,7 @@ def detect_table_regions(
     pdf_path: Path,
     min_rows: int = 3,
     min_numeric_ratio: float = 0.3,
+    session: Optional[DocumentSession] = None,
 ) -> List[TableRegion]:
     """
     Detect table regions in PDF using PyMuPDF layout analysis.
@@ -39,6 +50,7 @@ def detect_table_regions(
         pdf_path: Path to PDF file
         min_rows: Minimum number of rows to consider a block a table
         min_numeric_ratio: Minimum ratio of numeric content in lines
+        session: Open document session to reuse (opened and closed here if None)
         
     Returns:
         List of detected table regions
@@ -46,112 +58,214 @@ def detect_table_regions(
     if fitz is None:
         raise ImportError("PyMuPDF not installed. Install with: pip install pymupdf")
     
-    doc = fitz.open(str(pdf_path))
-    regions: List[TableRegion] = []
+    with open_document_session(pdf_path, session) as sess:
+        return _detect_table_regions(sess.doc, min_rows, min_numeric_ratio)
+
+
+# Known table labels; each detected block is named after the nearest match.
+TABLE_LABELS = [
+    r'vesihuoltolaitoksen\s+tase',
+    r'taloustiedot\s+\d{4}',
+    r'tuloslaskelma',
+    r'rahoituslaskelma',
+    r'vastaavaa',
+    r'vastattavaa',
+]
+
+# Numeric rows start a new block after blank space of more than _MAX_GAP line
+# heights, after more than _MAX_TEXT_ROWS text rows (narrative), or when none of
+# their amounts overlaps a column of the block. A label is looked for up to
+# _LABEL_ROWS rows above a block.
+_MAX_GAP = 2.5
+_MAX_TEXT_ROWS = 3
+_LABEL_ROWS = 3
+_PADDING = 20
+
+
+@dataclass
+class _Row:
+    """One visual text row of a page, in unrotated PDF points."""
+    y0: float
+    y1: float
+    x0: float
+    x1: float
+    text: str
+    numeric: bool
+    # x ranges of the row's phrases that contain digits (its columns)
+    spans: List[Tuple[float, float]]
+
+
+def _page_rows(page: "fitz.Page", min_numeric_ratio: float) -> List[_Row]:
+    words = sorted(phrases(page), key=lambda w: ((w[0].y0 + w[0].y1) / 2, w[0].x0))
+    if not words:
+        return []
+    tol = median(r.height for r, _ in words) / 2
+
+    groups: List[List[Tuple["fitz.Rect", str]]] = []
+    centre = None
+    for rect, text in words:
+        y = (rect.y0 + rect.y1) / 2
+        if centre is None or y - centre > tol:
+            groups.append([])
+            centre = y
+        groups[-1].append((rect, text))
+
+    rows: List[_Row] = []
+    for group in groups:
+        group.sort(key=lambda w: w[0].x0)
+        text = ' '.join(t for _, t in group)
+        # Same numeric test as before: digits among the row's non-space characters
+        chars = len(text.replace(' ', ''))
+        digits = sum(1 for c in text if c.isdigit())
+        rows.append(
+            _Row(
+                y0=min(r.y0 for r, _ in group),
+                y1=max(r.y1 for r, _ in group),
+                x0=min(r.x0 for r, _ in group),
+                x1=max(r.x1 for r, _ in group),
+                text=text,
+                numeric=chars > 0 and digits / chars >= min_numeric_ratio,
+                spans=[(r.x0, r.x1) for r, t in group if any(c.isdigit() for c in t)],
+            )
+        )
+    return rows
+
+
+def _overlaps(spans: List[Tuple[float, float]], columns: List[Tuple[float, float]]) -> bool:
+    return any(x0 < c1 and c0 < x1 for x0, x1 in spans for c0, c1 in columns)
+
+
+def _blocks(rows: List[_Row]) -> List[Tuple[int, int]]:
+    """(first, last) row indices of runs of numeric rows that belong together."""
+    if not rows:
+        return []
+    line = median(r.y1 - r.y0 for r in rows)
+    blocks: List[Tuple[int, int]] = []
+    first = last = None
+    columns: List[Tuple[float, float]] = []
+    for idx, row in enumerate(rows):
+        if not row.numeric:
+            continue
+        if last is not None:
+            gap = max(rows[i + 1].y0 - rows[i].y1 for i in range(last, idx))
+            if (
+                gap <= _MAX_GAP * line
+                and idx - last - 1 <= _MAX_TEXT_ROWS
+                and _overlaps(row.spans, columns)
+            ):
+                last = idx
+                columns.extend(row.spans)
+                continue
+            blocks.append((first, last))
+        first = last = idx
+        columns = list(row.spans)
+    if last is not None:
+        blocks.append((first, last))
+    return blocks
+
+
+def detect_page_table_regions(
+    page: "fitz.Page",
+    page_index: int,
+    min_rows: int = 3,
+    min_numeric_ratio: float = 0.3,
+) -> List[TableRegion]:
+    """
+    Table regions of one page: blocks of numeric rows split by gaps and column alignment.
     
-    # Known table labels to help detection
-    table_labels = [
-        r'vesihuoltolaitoksen\s+tase',
-        r'taloustiedot\s+\d{4}',
-        r'tuloslaskelma',
-        r'rahoituslaskelma',
-        r'vastaavaa',
-        r'vastattavaa',
-    ]
+    Rows whose characters are at least ``min_numeric_ratio`` digits are
+    numeric. Numeric rows, with the few text rows between them (headings,
+    subtotal captions), form a block while no blank gap or narrative paragraph
+    separates them and their amounts stay in the block's columns. Blocks with
+    at least ``min_rows`` numeric rows become regions, each labelled by the
+    nearest ``TABLE_LABELS`` match just above it or in its first rows (a
+    region starts at a label row above it).
     
+    Returns:
+        Regions top to bottom, bboxes in unrotated PDF points
+    """
+    rows = _page_rows(page, min_numeric_ratio)
+    blocks = [
+        (first, last) for first, last in _blocks(rows)
+        if sum(1 for r in rows[first:last + 1] if r.numeric) >= min_rows
+    ]
+    bounds = page.rect * page.derotation_matrix
+
+    labelled: List[Tuple[int, int, str]] = []
+    for k, (first, last) in enumerate(blocks):
+        above = blocks[k - 1][1] + 1 if k else 0
+        label = ""
+        # Nearest first: the rows just above the block, then its first rows.
+        candidates = list(range(first - 1, max(above, first - _LABEL_ROWS) - 1, -1))
+        candidates += list(range(first, min(last + 1, first + _LABEL_ROWS)))
+        for idx in candidates:
+            if any(re.search(pattern, rows[idx].text, re.IGNORECASE) for pattern in TABLE_LABELS):
+                label = rows[idx].text.strip()
+                first = min(first, idx)
+                break
+        if not label:
+            label = f"Table on page {page_index + 1}"
+            if len(blocks) > 1:
+                label = f"Table {k + 1} on page {page_index + 1}"
+        labelled.append((first, last, label))
+
+    regions: List[TableRegion] = []
+    for k, (first, last, label) in enumerate(labelled):
+        block = rows[first:last + 1]
+        # Padding, but at most halfway to the neighbouring blocks
+        top, bottom = bounds.y0, bounds.y1
+        if k:
+            top = (rows[labelled[k - 1][1]].y1 + block[0].y0) / 2
+        if k + 1 < len(labelled):
+            bottom = (block[-1].y1 + rows[labelled[k + 1][0]].y0) / 2
+        bbox = (
+            max(bounds.x0, min(r.x0 for r in block) - _PADDING),
+            max(top, block[0].y0 - _PADDING),
+            min(bounds.x1, max(r.x1 for r in block) + _PADDING),
+            min(bottom, block[-1].y1 + _PADDING),
+        )
+        regions.append(TableRegion(page=page_index, bbox=bbox, label=label))
+    return regions
+
+
+def region_pixels(region: TableRegion, page: "fitz.Page", dpi: int) -> Dict:
+    """A region's bbox as a region dict in pixels of the page rendered at ``dpi``."""
+    zoom = dpi / 72.0
+    rect = (fitz.Rect(region.bbox) * page.rotation_matrix) & page.rect
+    x0, y0 = int(rect.x0 * zoom), int(rect.y0 * zoom)
+    x1, y1 = math.ceil(rect.x1 * zoom), math.ceil(rect.y1 * zoom)
+    return {'x': x0, 'y': y0, 'width': max(0, x1 - x0), 'height': max(0, y1 - y0)}
+
+
+def _detect_table_regions(
+    doc: "fitz.Document",
+    min_rows: int,
+    min_numeric_ratio: float,
+) -> List[TableRegion]:
+    regions: List[TableRegion] = []
     for page_index, page in enumerate(doc):
-        # Get text blocks with coordinates
-        blocks = page.get_text("blocks")  # (x0, y0, x1, y1, text, block_no, block_type)
-        
-        # Group blocks by vertical position (rows)
-        row_blocks: dict[float, List[Tuple]] = {}
-        
-        for block in blocks:
-            if len(block) < 5:
-                continue
-            x0, y0, x1, y1, text, *_rest = block
-            
-            if not text or not text.strip():
-                continue
-            
-            # Round y0 to group nearby blocks into rows
-            row_key = round(y0, 1)
-            if row_key not in row_blocks:
-                row_blocks[row_key] = []
-            row_blocks[row_key].append((x0, y0, x1, y1, text))
-        
-        # Analyze rows for table-like structure
-        numeric_rows = 0
-        total_rows = len(row_blocks)
-        table_start_y = None
-        table_end_y = None
-        table_x0 = float('inf')
-        table_x1 = 0
-        detected_label = ""
-        
-        for y_pos, blocks_in_row in sorted(row_blocks.items()):
-            row_text = ' '.join(block[4] for block in blocks_in_row)
-            
-            # Check for table labels
-            for pattern in table_labels:
-                if re.search(pattern, row_text, re.IGNORECASE):
-                    detected_label = row_text.strip()
-                    table_start_y = y_pos
-                    break
-            
-            # Count numeric content
-            numeric_chars = sum(1 for c in row_text if c.isdigit())
-            total_chars = len(row_text.replace(' ', ''))
-            
-            if total_chars > 0:
-                numeric_ratio = numeric_chars / total_chars
-                if numeric_ratio >= min_numeric_ratio:
-                    numeric_rows += 1
-                    if table_start_y is None:
-                        table_start_y = y_pos
-                    table_end_y = y_pos
-                    
-                    # Expand bounding box
-                    for x0, y0, x1, y1, _ in blocks_in_row:
-                        table_x0 = min(table_x0, x0)
-                        table_x1 = max(table_x1, x1)
-        
-        # If we found a table-like region, add it
-        if numeric_rows >= min_rows and table_start_y is not None:
-            # Add some padding
-            padding = 20
-            bbox = (
-                max(0, table_x0 - padding),
-                max(0, table_start_y - padding),
-                min(page.rect.width, table_x1 + padding),
-                min(page.rect.height, (table_end_y or table_start_y) + padding + 50),
-            )
-            
-            regions.append(
-                TableRegion(
-                    page=page_index,
-                    bbox=bbox,
-                    label=detected_label or f"Table on page {page_index + 1}",
-                )
-            )
-    
-    doc.close()
+        regions.extend(detect_page_table_regions(page, page_index, min_rows, min_numeric_ratio))
     return regions
 
 
-def save_table_regions(pdf_path: Path, out_dir: Path) -> Path:
+def save_table_regions(
+    pdf_path: Path,
+    out_dir: Path,
+    session: Optional[DocumentSession] = None,
+) -> Path:
     """
     Detect and save table regions to JSON.
     
     Args:
         pdf_path: Path to PDF file
         out_dir: Output directory for JSON file
+        session: Open document session to reuse
         
     Returns:
         Path to saved JSON file
     """
     out_dir.mkdir(parents=True, exist_ok=True)
-    regions = detect_table_regions(pdf_path)
+    regions = detect_table_regions(pdf_path, session=session)
     
     out_json = out_dir / f"{pdf_path.stem}.tables.json"
     
@@ -171,6 +285,7 @@ def crop_table_images(
     regions_json: Path,
     crop_dir: Path,
     dpi: int = 150,
+    session: Optional[DocumentSession] = None,
 ) -> List[Tuple[int, Path]]:
     """
     Crop table regions from PDF to separate PNG images.
@@ -180,6 +295,7 @@ def crop_table_images(
         regions_json: Path to JSON with table regions
         crop_dir: Directory for cropped images
         dpi: Resolution for output images
+        session: Open document session to reuse
         
     Returns:
         List of (page_index, image_path) tuples
@@ -189,30 +305,30 @@ def crop_table_images(
     
     crop_dir.mkdir(parents=True, exist_ok=True)
     
-    doc = fitz.open(str(pdf_path))
     regions_data = json.loads(regions_json.read_text(encoding="utf-8"))
     
     out_paths: List[Tuple[int, Path]] = []
     
-    for idx, r in enumerate(regions_data):
-        page_index = r["page"]
-        bbox = r["bbox"]
-        
-        page = doc[page_index]
-        rect = fitz.Rect(*bbox)
-        
-        # Create matrix for desired DPI
-        zoom = dpi / 72  # 72 is default PDF DPI
-        mat = fitz.Matrix(zoom, zoom)
-        
-        # Get pixmap of the region
-        pix = page.get_pixmap(matrix=mat, clip=rect)
-        
-        # Save as PNG
-        out_path = crop_dir / f"{pdf_path.stem}_table_{idx+1:03d}_p{page_index+1}.png"
-        pix.save(str(out_path))
-        out_paths.append((page_index, out_path))
+    with open_document_session(pdf_path, session) as sess:
+        doc = sess.doc
+        for idx, r in enumerate(regions_data):
+            page_index = r["page"]
+            bbox = r["bbox"]
+            
+            page = doc[page_index]
+            rect = fitz.Rect(*bbox)
+            
+            # Create matrix for desired DPI
+            zoom = dpi / 72  # 72 is default PDF DPI
+            mat = fitz.Matrix(zoom, zoom)
+            
+            # Get pixmap of the region
+            pix = page.get_pixmap(matrix=mat, clip=rect)
+            
+            # Save as PNG
+            out_path = crop_dir / f"{pdf_path.stem}_table_{idx+1:03d}_p{page_index+1}.png"
+            pix.save(str(out_path))
+            out_paths.append((page_index, out_path))
     
-    doc.close()
     return out_paths
 
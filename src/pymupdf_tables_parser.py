@@ -0,0 +1,152 @@
+"""PyMuPDF's native table finder as a parser backend.
+
+Born-digital PDFs carry every cell's text and, for ruled tables, its borders.
+PyMuPDF's ``page.find_tables()`` reads tables straight from that text and the
+vector rules without rendering or a model, so on such PDFs it is a much cheaper
+parser than MinerU or PP-Structure. Ruled tables are found with its "lines"
+strategy. Its "text" strategy cuts multi-word amounts (``10 815 721,55``) at
+column guesses, so on pages without ruled tables the blocks of numeric rows of
+the PyMuPDF prepass (unruled statements) are instead grouped into rows and
+columns from the text layer's phrases (text_layer.tokens_to_rows).
+
+The markdown has the same shape as parse_with_pdfplumber's, so it goes through
+fix_parsed_tables and validate_all_financials unchanged. ``extract_native_tables``
+also reports the pages whose text layer cannot be trusted (scans, unmapped
+glyphs), which the pipeline uses to decide whether the cheap attempt is enough.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+from .config import TEXT_LAYER_MAX_GARBLED, TEXT_LAYER_MAX_IMAGE_SHARE
+from .document_session import DocumentSession, open_document_session
+from .pdfplumber_parser import _table_to_markdown
+from .pymupdf_prepass import detect_page_table_regions, region_pixels
+from .text_layer import covered_share, garbled_share, text_layer_tokens, tokens_in, tokens_to_rows
+from .vector_rules import image_boxes
+
+# How the pipeline uses this backend: not at all, as a cheap first attempt
+# (kept only when ``NativeTables.complete``) or as the only parser.
+PYMUPDF_TABLES_OFF = "off"
+PYMUPDF_TABLES_FIRST = "first"
+PYMUPDF_TABLES_ONLY = "only"
+PYMUPDF_TABLES_MODES = (PYMUPDF_TABLES_OFF, PYMUPDF_TABLES_FIRST, PYMUPDF_TABLES_ONLY)
+
+
+@dataclass
+class NativeTables:
+    """Markdown of a document from its text layer, plus what it could not read."""
+    markdown: str
+    tables: int = 0
+    ocr_pages: List[int] = field(default_factory=list)  # 1-indexed pages needing OCR
+
+    @property
+    def complete(self) -> bool:
+        """Whether the text layer covered every page and gave at least one table."""
+        return self.tables > 0 and not self.ocr_pages
+
+
+def _needs_ocr(page: "fitz.Page") -> bool:
+    """Whether a page's content is a scan or its text layer is garbled."""
+    tokens = text_layer_tokens(page, dpi=72)
+    if tokens and garbled_share(tokens) > TEXT_LAYER_MAX_GARBLED:
+        return True
+    page_box = {'x': 0, 'y': 0, 'width': round(page.rect.width), 'height': round(page.rect.height)}
+    return covered_share(page_box, image_boxes(page, 72)) > TEXT_LAYER_MAX_IMAGE_SHARE
+
+
+def page_tables(page: "fitz.Page", page_index: int = 0) -> List[List[List[Optional[str]]]]:
+    """
+    Tables of one page as rows of cell strings (None for empty cells).
+
+    Args:
+        page: PyMuPDF page
+        page_index: 0-indexed page number (used for prepass labels only)
+
+    Returns:
+        Tables top to bottom, each with its header row first
+    """
+    if not hasattr(page, "find_tables"):
+        raise ImportError("PyMuPDF too old for find_tables(). Install with: pip install -U pymupdf")
+
+    tables = []
+    for table in page.find_tables(strategy="lines").tables:
+        rows = table.extract()
+        header = table.header
+        if header is not None and header.external and any(header.names):
+            # A header row above the table body (not part of extract()).
+            rows = [list(header.names)] + rows
+        tables.append((table.bbox[1], rows))
+    if not tables:
+        # Unruled statements: the prepass's numeric blocks, grouped from the text layer.
+        tokens = text_layer_tokens(page, dpi=72)
+        for region in detect_page_table_regions(page, page_index):
+            rows = tokens_to_rows(tokens_in(tokens, region_pixels(region, page, 72)))
+            tables.append((region.bbox[1], rows))
+
+    out = []
+    for _top, rows in sorted(tables, key=lambda t: t[0]):
+        rows = [row for row in rows if any(cell not in (None, "") for cell in row)]
+        if len(rows) >= 2:
+            out.append(rows)
+    return out
+
+
+def extract_native_tables(session: DocumentSession) -> NativeTables:
+    """Page text and find_tables() tables of a whole document as markdown."""
+    markdown_parts = []
+    result = NativeTables(markdown="")
+    for page_num in range(1, session.page_count + 1):
+        page = session.page(page_num)
+        if _needs_ocr(page):
+            result.ocr_pages.append(page_num)
+
+        text = page.get_text().strip()
+        if text:
+            markdown_parts.append(f"\n## Page {page_num}\n\n{text}\n")
+
+        tables = page_tables(page, page_num - 1)
+        if tables:
+            markdown_parts.append(f"\n### Tables on page {page_num}\n\n")
+            for table_idx, table in enumerate(tables, start=1):
+                markdown_parts.append(f"\n#### Table {table_idx}\n\n{_table_to_markdown(table)}\n\n")
+            result.tables += len(tables)
+
+    result.markdown = "\n".join(markdown_parts)
+    return result
+
+
+def parse_with_pymupdf_tables(
+    pdf_path: Path,
+    out_dir: Path,
+    use_gpu: bool = False,  # find_tables() doesn't use GPU
+    session: DocumentSession | None = None,
+) -> Tuple[str, List[Path]]:
+    """
+    Parse PDF using PyMuPDF's native table finder.
+
+    Args:
+        pdf_path: Path to PDF file
+        out_dir: Output directory (not heavily used, kept for consistency)
+        use_gpu: Ignored (find_tables() doesn't use GPU)
+        session: Open document session to reuse (None opens the PDF)
+
+    Returns:
+        Tuple of (markdown_text, image_paths)
+    """
+    if fitz is None:
+        raise ImportError("PyMuPDF not installed. Install with: pip install pymupdf")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    with open_document_session(pdf_path, session) as doc_session:
+        result = extract_native_tables(doc_session)
+    return result.markdown, []
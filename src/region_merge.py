@@ -0,0 +1,82 @@
+"""Clean-up of a page's table regions before PP-Structure.
+
+Region detection returns every external contour of the page's line masks, so
+the rule fragments of one table (a frame broken by a gap, a header band drawn
+apart from the body) come back as several regions, each of which would get its
+own grid drawing and model call. ``merge_regions`` unions regions that overlap
+(a region inside another one disappears into it) and fragments that sit side
+by side or stacked within a small gap while lining up across it, then caps the
+count per page.
+
+Pure functions, no I/O; regions are the ``{'x', 'y', 'width', 'height'}``
+pixel dicts of detect_table_regions_in_image.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+from .config import MAX_REGIONS_PER_PAGE, REGION_MERGE_ALIGN, REGION_MERGE_GAP_300
+
+Box = Tuple[int, int, int, int]
+
+
+def _joins(a: Box, b: Box, gap: float, align: float) -> bool:
+    """Whether two boxes (x0, y0, x1, y1) belong to one region."""
+    # Overlap along each axis; negative is the gap between the boxes.
+    dx = min(a[2], b[2]) - max(a[0], b[0])
+    dy = min(a[3], b[3]) - max(a[1], b[1])
+    if dx > 0 and dy > 0:
+        return True
+    # Side by side: close horizontally, sharing most of the shorter height.
+    if -gap <= dx <= 0 and dy >= align * min(a[3] - a[1], b[3] - b[1]):
+        return True
+    # Stacked: close vertically, sharing most of the narrower width.
+    return -gap <= dy <= 0 and dx >= align * min(a[2] - a[0], b[2] - b[0])
+
+
+def merge_regions(
+    regions: Sequence[Dict],
+    scale: float = 1.0,
+    max_regions: int = MAX_REGIONS_PER_PAGE,
+    gap: float = REGION_MERGE_GAP_300,
+    align: float = REGION_MERGE_ALIGN,
+) -> List[Dict]:
+    """
+    Merge overlapping and adjacent table regions of one page.
+
+    Args:
+        regions: Region dicts in page pixels
+        scale: Image DPI relative to 300 DPI; ``gap`` is in 300 DPI pixels
+        max_regions: Keep at most this many regions, the largest (0: no cap)
+        gap: Largest gap between two aligned fragments of one region
+        align: Share of the shorter side two fragments must have in common
+            across the gap
+
+    Returns:
+        Region dicts, top to bottom
+    """
+    merged: List[Box] = []
+    for r in regions:
+        box = (r['x'], r['y'], r['x'] + r['width'], r['y'] + r['height'])
+        # A union can reach regions merged earlier: repeat until nothing joins.
+        changed = True
+        while changed:
+            changed = False
+            for i, other in enumerate(merged):
+                if _joins(box, other, gap * scale, align):
+                    box = (
+                        min(box[0], other[0]),
+                        min(box[1], other[1]),
+                        max(box[2], other[2]),
+                        max(box[3], other[3]),
+                    )
+                    del merged[i]
+                    changed = True
+                    break
+        merged.append(box)
+
+    if max_regions and len(merged) > max_regions:
+        merged = sorted(merged, key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True)[:max_regions]
+    merged.sort(key=lambda b: (b[1], b[0]))
+    return [{'x': x0, 'y': y0, 'width': x1 - x0, 'height': y1 - y0} for x0, y0, x1, y1 in merged]
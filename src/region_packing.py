@@ -0,0 +1,181 @@
+"""Packing small table crops onto shared canvases for one PP-Structure call each.
+
+Notes pages often hold several small tables, and every region crop costs a
+full ``predict`` call whose fixed overhead (layout detection, OCR detection
+set-up) dwarfs the work on a few hundred pixels. ``pack_crops`` lays gridded
+crops out in shelves on white canvases, separated by white gutters so the
+layout model keeps the tables apart. ``split_result`` maps the tables
+PP-Structure finds on a canvas back to the crops by coordinate and shifts
+their boxes into crop pixels, so each table keeps the region it came from.
+
+A table that cannot be placed (no boxes to locate it, or spread over two
+crops) makes ``split_result`` give up on the canvas; its crops are then
+predicted one by one as before.
+
+Pure functions, no I/O.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+Box = Tuple[float, float, float, float]
+
+# Keys of a table_res_list entry holding boxes in canvas pixels.
+_BOX_KEYS = ("cell_box_list",)
+_OCR_BOX_KEYS = ("rec_boxes", "rec_polys", "dt_polys")
+
+
+@dataclass(frozen=True)
+class Slot:
+    """Where one crop sits on a canvas."""
+    key: int  # the caller's index of the crop (its region index)
+    x: int
+    y: int
+    width: int
+    height: int
+
+    @property
+    def box(self) -> Box:
+        return (self.x, self.y, self.x + self.width, self.y + self.height)
+
+
+def pack_crops(
+    crops: Sequence[Tuple[int, np.ndarray]],
+    gutter: int,
+    max_width: int,
+    max_height: int,
+) -> List[Tuple[np.ndarray, List[Slot]]]:
+    """
+    Shelf-pack (key, 3-channel crop) pairs onto white canvases.
+
+    Crops are placed tallest first, left to right in shelves, with ``gutter``
+    pixels of white around each. A canvas holds crops until the next one does
+    not fit within ``max_width`` x ``max_height``; a crop larger than that gets
+    a canvas of its own.
+
+    Returns:
+        (canvas, slots) pairs
+    """
+    order = sorted(range(len(crops)), key=lambda i: -crops[i][1].shape[0])
+    layouts: List[List[Slot]] = []
+    slots: List[Slot] = []
+    x = y = gutter
+    shelf = 0
+    for i in order:
+        key, crop = crops[i]
+        h, w = crop.shape[:2]
+        if slots and x + w + gutter > max_width:
+            # Next shelf
+            x, y = gutter, y + shelf + gutter
+            shelf = 0
+        if slots and y + h + gutter > max_height:
+            layouts.append(slots)
+            slots = []
+            x = y = gutter
+            shelf = 0
+        slots.append(Slot(key, x, y, w, h))
+        x += w + gutter
+        shelf = max(shelf, h)
+    if slots:
+        layouts.append(slots)
+
+    by_key = {key: crop for key, crop in crops}
+    out: List[Tuple[np.ndarray, List[Slot]]] = []
+    for layout in layouts:
+        width = max(s.x + s.width for s in layout) + gutter
+        height = max(s.y + s.height for s in layout) + gutter
+        canvas = np.full((height, width, 3), 255, dtype=np.uint8)
+        for s in layout:
+            canvas[s.y:s.y + s.height, s.x:s.x + s.width] = by_key[s.key]
+        out.append((canvas, sorted(layout, key=lambda s: s.key)))
+    return out
+
+
+def _extent(boxes: Any) -> Optional[Box]:
+    """Bounding box of (N, 4) boxes or (N, K, 2) polygons; None if there are none."""
+    try:
+        arr = np.asarray(boxes, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if arr.size == 0:
+        return None
+    if arr.ndim == 2 and arr.shape[1] == 4:
+        return (arr[:, 0].min(), arr[:, 1].min(), arr[:, 2].max(), arr[:, 3].max())
+    if arr.ndim == 3 and arr.shape[2] == 2:
+        return (arr[:, :, 0].min(), arr[:, :, 1].min(), arr[:, :, 0].max(), arr[:, :, 1].max())
+    return None
+
+
+def table_extent(table: Dict[str, Any]) -> Optional[Box]:
+    """Canvas box of a table_res_list entry, from its cell boxes or else its OCR boxes."""
+    for key in _BOX_KEYS:
+        box = _extent(table.get(key))
+        if box is not None:
+            return box
+    ocr = table.get("table_ocr_pred")
+    if isinstance(ocr, dict):
+        for key in _OCR_BOX_KEYS:
+            box = _extent(ocr.get(key))
+            if box is not None:
+                return box
+    return None
+
+
+def _overlap(a: Box, b: Box) -> float:
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    return w * h if w > 0 and h > 0 else 0.0
+
+
+def _shifted(boxes: Any, dx: float, dy: float) -> Any:
+    arr = np.asarray(boxes, dtype=np.float64)
+    if arr.ndim == 2 and arr.shape[1] == 4:
+        arr = arr - (dx, dy, dx, dy)
+    elif arr.ndim == 3 and arr.shape[2] == 2:
+        arr = arr - (dx, dy)
+    else:
+        return boxes
+    return arr.tolist() if isinstance(boxes, list) else arr
+
+
+def _to_slot(table: Dict[str, Any], slot: Slot) -> Dict[str, Any]:
+    """A table_res_list entry with its boxes moved from canvas into crop pixels."""
+    out = dict(table)
+    for key in _BOX_KEYS:
+        if out.get(key) is not None:
+            out[key] = _shifted(out[key], slot.x, slot.y)
+    ocr = out.get("table_ocr_pred")
+    if isinstance(ocr, dict):
+        ocr = dict(ocr)
+        for key in _OCR_BOX_KEYS:
+            if ocr.get(key) is not None:
+                ocr[key] = _shifted(ocr[key], slot.x, slot.y)
+        out["table_ocr_pred"] = ocr
+    return out
+
+
+def split_result(page_res: Dict[str, Any], slots: Sequence[Slot]) -> Optional[Dict[int, Dict[str, Any]]]:
+    """
+    Split a canvas result's ``table_res_list`` by the crop each table lies on.
+
+    Returns:
+        Slot key -> result dict with that crop's tables (boxes in crop pixels),
+        for every slot; None when a table cannot be located or covers more than
+        one crop
+    """
+    per_slot: Dict[int, Dict[str, Any]] = {s.key: {"table_res_list": []} for s in slots}
+    for table in page_res.get("table_res_list") or []:
+        if not isinstance(table, dict):
+            return None
+        box = table_extent(table)
+        if box is None:
+            return None
+        hits = [s for s in slots if _overlap(box, s.box) > 0]
+        if len(hits) != 1:
+            return None
+        per_slot[hits[0].key]["table_res_list"].append(_to_slot(table, hits[0]))
+    return per_slot
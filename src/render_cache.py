@@ -0,0 +1,307 @@
+"""Content-addressed cache of rendered PDF pages, shared across runs.
+
+Entries are PNGs keyed by the PDF's content hash, page number, DPI, colour mode
+and renderer name/version, so a rerun at another DPI (or after the PDF changes)
+never picks up a stale image. The cache lives outside any single ``out_dir``
+(see ``RENDER_CACHE_DIR``), is bounded by a disk budget with least-recently-used
+eviction, and takes a lock file for writes so concurrent runs can share it.
+Inserts keep a running total of the cache's bytes in a small size file, so
+only an insert that takes the cache over its budget scans the entries.
+
+Rendered-image directories inside ``out_dir`` (``page_images/``) carry a small
+manifest with the same fingerprint; images from a different render are dropped
+instead of reused.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+from .config import RENDER_CACHE_DIR, RENDER_CACHE_MAX_MB
+
+
+MANIFEST_NAME = "render_manifest.json"
+SIZE_NAME = ".size"
+
+# (resolved path, size, mtime_ns) -> sha256; hashing a 10 MB PDF costs ~20 ms.
+_pdf_hash_memo: Dict[Tuple[str, int, int], str] = {}
+
+
+def pdf_content_hash(pdf_path: Path) -> str:
+    """SHA-256 of the PDF file contents (memoized per path/size/mtime)."""
+    st = pdf_path.stat()
+    memo_key = (str(pdf_path.resolve()), st.st_size, st.st_mtime_ns)
+    if memo_key not in _pdf_hash_memo:
+        h = hashlib.sha256()
+        with pdf_path.open("rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _pdf_hash_memo[memo_key] = h.hexdigest()
+    return _pdf_hash_memo[memo_key]
+
+
+def render_fingerprint(
+    pdf_hash: str,
+    dpi: Union[int, str],
+    renderer: str,
+    renderer_version: str,
+    color_mode: str = "rgb",
+) -> Dict[str, object]:
+    """Everything that determines a rendered page's pixels, except the page number.
+
+    ``dpi`` is a fixed DPI, or a DPI planner label for per-page DPIs.
+    """
+    return {
+        "pdf_sha256": pdf_hash,
+        "dpi": dpi if isinstance(dpi, str) else int(dpi),
+        "color_mode": color_mode,
+        "renderer": renderer,
+        "renderer_version": renderer_version,
+    }
+
+
+def prepare_image_dir(image_dir: Path, fingerprint: Dict[str, object]) -> bool:
+    """Make ``image_dir`` safe to reuse for a render with ``fingerprint``.
+
+    If the directory's manifest records a different render (or is missing while
+    page images exist, i.e. written before manifests), the old ``page_NNNN.png``
+    files are removed so they are re-rendered rather than silently reused.
+
+    Returns:
+        True if existing page images were kept
+    """
+    image_dir.mkdir(parents=True, exist_ok=True)
+    manifest = image_dir / MANIFEST_NAME
+    try:
+        kept = json.loads(manifest.read_text(encoding="utf-8")) == fingerprint
+    except (OSError, ValueError):
+        kept = False
+    if not kept:
+        for stale in image_dir.glob("page_[0-9]*.png"):
+            stale.unlink(missing_ok=True)
+        manifest.write_text(json.dumps(fingerprint, indent=2), encoding="utf-8")
+    return kept
+
+
+class CacheLock:
+    """Inter-process lock: exclusive creation of a lock file (atomic on Windows/Unix).
+
+    A lock older than ``stale_after`` seconds is assumed to belong to a crashed
+    process and is broken.
+    """
+
+    def __init__(self, path: Path, timeout: float = 60.0, stale_after: float = 300.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+
+    def __enter__(self) -> "CacheLock":
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                with self.path.open("x", encoding="utf-8") as f:
+                    f.write(f"pid={os.getpid()}\n")
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - self.path.stat().st_mtime > self.stale_after:
+                        self.path.unlink(missing_ok=True)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Render cache is locked: {self.path}") from None
+                time.sleep(0.05)
+
+    def __exit__(self, *exc: object) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class RenderCache:
+    """Disk cache of page PNGs under ``root`` with an LRU size budget.
+
+    Reads are lock-free: a hit refreshes the entry's mtime (the LRU clock), and
+    an entry evicted by another process between lookup and read is treated as
+    a miss. Inserts and eviction hold ``root/.lock``; under it they keep the
+    total size of the entries in ``root/.size`` (recounted by every eviction
+    scan, and whenever the file is missing or unreadable).
+    """
+
+    def __init__(self, root: Path = RENDER_CACHE_DIR, max_mb: int = RENDER_CACHE_MAX_MB) -> None:
+        self.root = Path(root)
+        self.max_bytes = int(max_mb) * 1024 * 1024
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock_path = self.root / ".lock"
+        self._size_path = self.root / SIZE_NAME
+
+    @staticmethod
+    def key(
+        pdf_hash: str,
+        page_number: int,
+        dpi: int,
+        renderer: str,
+        renderer_version: str,
+        color_mode: str = "rgb",
+    ) -> str:
+        raw = f"{pdf_hash}|{page_number}|{int(dpi)}|{color_mode}|{renderer}|{renderer_version}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.png"
+
+    def get(self, key: str) -> Optional[Path]:
+        """Path of the cached PNG (marked as recently used), or None on a miss."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def load(self, key: str) -> Optional[np.ndarray]:
+        """Decode a cached page to an RGB array, or None on a miss."""
+        if cv2 is None:
+            raise ImportError(
+                "opencv-python not installed. Install with: pip install opencv-python-headless"
+            )
+        path = self.get(key)
+        if path is None:
+            return None
+        image = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            return None
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return image
+
+    def export(self, key: str, dest: Path) -> bool:
+        """Place a cached page at ``dest`` (hard link, or copy across filesystems)."""
+        path = self.get(key)
+        if path is None:
+            return False
+        tmp = dest.with_name(f".{dest.name}.tmp")
+        try:
+            tmp.unlink(missing_ok=True)
+            try:
+                os.link(path, tmp)
+            except OSError:
+                shutil.copyfile(path, tmp)
+            os.replace(tmp, dest)
+        except FileNotFoundError:
+            # Evicted by another process after lookup.
+            tmp.unlink(missing_ok=True)
+            return False
+        return True
+
+    def put_file(self, key: str, src: Path) -> Path:
+        """Copy an already-encoded PNG into the cache."""
+        return self._insert(key, lambda tmp: shutil.copyfile(src, tmp))
+
+    def put_array(self, key: str, image: np.ndarray) -> Path:
+        """Encode an RGB (or single-channel) array as PNG into the cache."""
+        if cv2 is None:
+            raise ImportError(
+                "opencv-python not installed. Install with: pip install opencv-python-headless"
+            )
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+        def write(tmp: Path) -> None:
+            # Fast compression: the cache trades a little disk for encode time.
+            ok, buf = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+            if not ok:
+                raise RuntimeError("PNG encoding failed")
+            tmp.write_bytes(buf.tobytes())
+
+        return self._insert(key, write)
+
+    def _insert(self, key: str, write: Callable[[Path], object]) -> Path:
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=".put_", suffix=".png", dir=str(path.parent))
+        os.close(fd)
+        tmp = Path(tmp_name)
+        try:
+            write(tmp)
+            added = tmp.stat().st_size
+            with CacheLock(self._lock_path):
+                total = self._read_size_locked()
+                try:
+                    total -= path.stat().st_size  # replacing an entry
+                except FileNotFoundError:
+                    pass
+                os.replace(tmp, path)
+                total += added
+                if total > self.max_bytes:
+                    self._evict_locked(keep=path)
+                else:
+                    self._write_size_locked(total)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return path
+
+    def size_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> int:
+        """Drop least-recently-used entries until the cache fits its budget.
+
+        Returns:
+            Number of bytes removed
+        """
+        with CacheLock(self._lock_path):
+            return self._evict_locked()
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries: List[Tuple[float, int, Path]] = []
+        for path in self.root.glob("??/*.png"):
+            if path.name.startswith("."):
+                continue  # an insert's temporary file
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _read_size_locked(self) -> int:
+        """The running total from the size file; a full recount if it is missing or bad."""
+        try:
+            return int(self._size_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            total = self.size_bytes()
+            self._write_size_locked(total)
+            return total
+
+    def _write_size_locked(self, total: int) -> None:
+        self._size_path.write_text(str(max(0, total)), encoding="utf-8")
+
+    def _evict_locked(self, keep: Optional[Path] = None) -> int:
+        entries = sorted(self._entries(), key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += size
+        self._write_size_locked(total)
+        return removed
+
@@ -4,9 +4,8 @@ Renders PDF pages as images, draws grid lines between text blocks,
 and uses PaddleOCR PP-Structure to extract structured tables.
 """
 
-import os
 from pathlib import Path
-from typing import Optional, Tuple, List, Dict, Any
+from typing import TYPE_CHECKING, Optional, Tuple, List, Dict, Any
 import numpy as np
 
 try:
@@ -14,119 +13,178 @@ try:
 except ImportError:
     cv2 = None
 
-try:
-    from pdf2image import convert_from_path
-except ImportError:
-    convert_from_path = None
+from .html_table import html_table_to_rows, rows_to_markdown, build_confidence_by_text
+from .document_session import DocumentSession
+from .page_renderer import COLOR_RGB, DEFAULT_RENDERER, get_renderer
+from .page_store import PageStore
+from .grid_profiles import projection_separators
+from .engine_registry import get_pp_engine
+from .ppstructure_postprocess import OCRToken, try_balance_sheet_3col
 
-# Must be set before importing paddleocr to avoid slow network checks / hanging.
-os.environ.setdefault("DISABLE_MODEL_SOURCE_CHECK", "True")
-os.environ.setdefault("HUGGINGFACE_HUB_DISABLE_OFFLINE", "1")
-os.environ.setdefault("HF_HUB_OFFLINE", "1")
+if TYPE_CHECKING:
+    from .page_preprocess import PagePreprocess
 
-try:
-    import paddleocr as paddleocr_mod
-except ImportError:
-    paddleocr_mod = None
+# Grid engines for draw_table_grid: OpenCV morphology (default) or numpy projection profiles.
+GRID_ENGINE_MORPHOLOGY = "morphology"
+GRID_ENGINE_PROJECTION = "projection"
+GRID_ENGINES = (GRID_ENGINE_MORPHOLOGY, GRID_ENGINE_PROJECTION)
 
-from .html_table import html_table_to_rows, rows_to_markdown, build_confidence_by_text
-from .paddle_device import configure_paddle_device
-from .ppstructure_postprocess import OCRToken, try_balance_sheet_3col
+
+def check_grid_engine(engine: str) -> str:
+    if engine not in GRID_ENGINES:
+        raise ValueError(f"Unknown grid engine: {engine!r} (expected one of: {', '.join(GRID_ENGINES)})")
+    return engine
 
 
-def pdf_page_to_image(pdf_path: Path, page_number: int, dpi: int = 300) -> Optional[np.ndarray]:
+def pdf_page_to_image(
+    pdf_path: Path,
+    page_number: int,
+    dpi: int = 300,
+    renderer: str = DEFAULT_RENDERER,
+    session: Optional[DocumentSession] = None,
+    color_mode: str = COLOR_RGB,
+) -> Optional[np.ndarray]:
     """
     Render PDF page to image.
     
-    Uses pdf2image as mandated (requires Poppler).
+    Uses pdf2image by default as mandated (requires Poppler); ``renderer="pymupdf"``
+    renders in-process with PyMuPDF instead.
     
     Args:
         pdf_path: Path to PDF file
         page_number: Page number (1-indexed)
         dpi: Resolution for rendering
+        renderer: Page renderer backend (see page_renderer.py)
+        session: Open document session to reuse
+        color_mode: ``rgb``, ``gray`` or ``bitonal`` (single-channel arrays)
         
     Returns:
-        Image as numpy array (RGB) or None if failed
+        Image as numpy array (RGB, or 2-D for gray/bitonal) or None if failed
     """
-    if convert_from_path is not None:
-        try:
-            images = convert_from_path(
-                str(pdf_path),
-                dpi=dpi,
-                first_page=page_number,
-                last_page=page_number,
-            )
-            if images:
-                return np.array(images[0])
-        except Exception as e:
-            print(f"  Error rendering PDF page {page_number} with pdf2image: {e}")
-            return None
-    else:
-        raise ImportError(
-            "pdf2image not available. Install with: pip install pdf2image"
-        )
-    
-    return None
+    try:
+        with get_renderer(renderer, pdf_path, session=session) as page_renderer:
+            return page_renderer.render_page(page_number, dpi, color_mode)
+    except ImportError:
+        raise
+    except Exception as e:
+        print(f"  Error rendering PDF page {page_number} with {renderer}: {e}")
+        return None
 
 
-def draw_table_grid(image: np.ndarray) -> np.ndarray:
+def find_grid_separators(
+    image: np.ndarray,
+    prep: Optional["PagePreprocess"] = None,
+    engine: str = GRID_ENGINE_MORPHOLOGY,
+) -> Tuple[List[int], List[int]]:
     """
-    Draw grid lines between text rows and columns using OpenCV.
-    
-    Uses morphological operations to detect text regions and draws
-    horizontal and vertical lines to create a visual table structure.
-    
-    Improved version: Detects gaps between text rows/columns automatically
-    using morphological analysis.
+    Find the row and column separators ``draw_table_grid`` draws.
     
     Args:
-        image: Input image (RGB numpy array)
+        image: Input image (RGB, or single-channel gray/bitonal numpy array)
+        prep: Preprocessing of this image's page, cropped to it (see page_preprocess.py);
+            reused instead of converting and thresholding ``image`` again
+        engine: GRID_ENGINE_MORPHOLOGY (OpenCV openings + contours) or
+            GRID_ENGINE_PROJECTION (numpy projection profiles, see grid_profiles.py)
         
     Returns:
-        Image with grid lines drawn
+        (row ys, column xs), sorted and unique
     """
+    check_grid_engine(engine)
     if cv2 is None:
         raise ImportError("opencv-python not installed. Install with: pip install opencv-python-headless")
     
-    # Convert to grayscale
-    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    h_len = image.shape[1] // 3
+    v_len = image.shape[0] // 10
+    if prep is not None:
+        binary = prep.binary
+        # The page line masks are openings with shorter kernels; where opening them
+        # again finds the same lines as opening the binary, start from them.
+        h_source = prep.horizontal if prep.reusable(h_len, prep.h_len) else binary
+        v_source = prep.vertical if prep.reusable(v_len, prep.v_len) else binary
+    else:
+        # Convert to grayscale
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        
+        # Binary threshold - invert so text is white
+        _, binary = cv2.threshold(gray, 180, 255, cv2.THRESH_BINARY_INV)
+        h_source = v_source = binary
     
-    # Binary threshold - invert so text is white
-    _, binary = cv2.threshold(gray, 180, 255, cv2.THRESH_BINARY_INV)
+    if engine == GRID_ENGINE_PROJECTION:
+        # The page masks hold every rule the openings below can find, and are sparser.
+        return projection_separators(h_source, v_source)
     
     # Detect horizontal lines (rows) - use larger kernel for better detection
-    horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (image.shape[1] // 3, 1))
-    detect_horizontal = cv2.morphologyEx(binary, cv2.MORPH_OPEN, horizontal_kernel, iterations=2)
+    horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (h_len, 1))
+    detect_horizontal = cv2.morphologyEx(h_source, cv2.MORPH_OPEN, horizontal_kernel, iterations=2)
     
     # Detect vertical lines (columns) - use adaptive kernel size
-    vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, image.shape[0] // 10))
-    detect_vertical = cv2.morphologyEx(binary, cv2.MORPH_OPEN, vertical_kernel, iterations=2)
+    vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, v_len))
+    detect_vertical = cv2.morphologyEx(v_source, cv2.MORPH_OPEN, vertical_kernel, iterations=2)
     
     # Dilate to connect nearby lines
     horizontal_dilated = cv2.dilate(detect_horizontal, cv2.getStructuringElement(cv2.MORPH_RECT, (5, 1)), iterations=1)
     vertical_dilated = cv2.dilate(detect_vertical, cv2.getStructuringElement(cv2.MORPH_RECT, (1, 5)), iterations=1)
     
-    # Combine horizontal and vertical
-    grid = cv2.add(horizontal_dilated, vertical_dilated)
-    
-    # Draw lines on original image
-    result = image.copy()
-    
-    # Draw horizontal lines (row separators)
+    # Row separators
+    rows = set()
     h_contours, _ = cv2.findContours(horizontal_dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     for cnt in h_contours:
         x, y, w, h = cv2.boundingRect(cnt)
         if w > image.shape[1] * 0.3:  # At least 30% of image width
-            # Draw horizontal line
-            cv2.line(result, (0, y + h // 2), (image.shape[1], y + h // 2), (0, 0, 0), 2)
+            rows.add(y + h // 2)
     
-    # Draw vertical lines (column separators)
+    # Column separators
+    cols = set()
     v_contours, _ = cv2.findContours(vertical_dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     for cnt in v_contours:
         x, y, w, h = cv2.boundingRect(cnt)
         if h > image.shape[0] * 0.2:  # At least 20% of image height
-            # Draw vertical line
-            cv2.line(result, (x + w // 2, 0), (x + w // 2, image.shape[0]), (0, 0, 0), 2)
+            cols.add(x + w // 2)
+    
+    return sorted(rows), sorted(cols)
+
+
+def draw_table_grid(
+    image: np.ndarray,
+    prep: Optional["PagePreprocess"] = None,
+    engine: str = GRID_ENGINE_MORPHOLOGY,
+    separators: Optional[Tuple[List[int], List[int]]] = None,
+) -> np.ndarray:
+    """
+    Draw grid lines between text rows and columns using OpenCV.
+    
+    Uses morphological operations (or, with GRID_ENGINE_PROJECTION, projection
+    profiles) to detect rules and draws horizontal and vertical lines to create
+    a visual table structure.
+    
+    Improved version: Detects gaps between text rows/columns automatically
+    using morphological analysis.
+    
+    Args:
+        image: Input image (RGB, or single-channel gray/bitonal numpy array)
+        prep: Preprocessing of this image's page, cropped to it (see page_preprocess.py);
+            reused instead of converting and thresholding ``image`` again
+        engine: Grid engine, see find_grid_separators
+        separators: (row ys, column xs) from find_grid_separators, if the caller
+            already has them
+        
+    Returns:
+        Image with grid lines drawn (same channel layout as the input)
+    """
+    if separators is None:
+        separators = find_grid_separators(image, prep=prep, engine=engine)
+    rows, cols = separators
+    
+    # Draw lines on original image
+    result = image.copy()
+    
+    # Draw horizontal lines (row separators)
+    for y in rows:
+        cv2.line(result, (0, y), (image.shape[1], y), (0, 0, 0), 2)
+    
+    # Draw vertical lines (column separators)
+    for x in cols:
+        cv2.line(result, (x, 0), (x, image.shape[0]), (0, 0, 0), 2)
     
     return result
 
@@ -138,31 +196,16 @@ def run_paddleocr_table(
     Run PaddleOCR v3 PP-Structure (PPStructureV3) to extract table structure.
     
     Args:
-        image_path_or_np: Image path (preferred) or numpy array
+        image_path_or_np: Image path or numpy array (BGR, as read by cv2)
         lang: Language code (default: 'en')
+        use_gpu: Request the GPU for the engine (shared per language and device,
+            see engine_registry)
         
     Returns:
         List of table result dicts (table_res_list) or None if failed
     """
-    if paddleocr_mod is None or not hasattr(paddleocr_mod, "PPStructureV3"):
-        raise ImportError(
-            "PP-Structure engine not available. Required stack:\n"
-            "- paddleocr==3.3.2\n"
-            "- paddlex[ocr]==3.3.11\n"
-            "Install: pip install \"paddleocr==3.3.2\" \"paddlex[ocr]==3.3.11\""
-        )
-    
     try:
-        configure_paddle_device(use_gpu=use_gpu)
-        pp_engine = paddleocr_mod.PPStructureV3(
-            lang=lang,
-            use_table_recognition=True,
-            use_region_detection=False,
-            use_doc_unwarping=False,
-            use_seal_recognition=False,
-            use_formula_recognition=False,
-            use_chart_recognition=False,
-        )
+        pp_engine = get_pp_engine(lang=lang, use_gpu=use_gpu)
         pp_out = pp_engine.predict(
             image_path_or_np,
             use_wireless_table_cells_trans_to_html=True,
@@ -173,6 +216,8 @@ def run_paddleocr_table(
         page_res = pp_out[0]
         table_res_list = page_res.get("table_res_list") or []
         return table_res_list if table_res_list else None
+    except ImportError:
+        raise
     except Exception as e:
         print(f"  PaddleOCR error: {e}")
         return None
@@ -245,6 +290,9 @@ def process_table_page_visually(
     output_dir: Path,
     lang: str = 'en',
     use_gpu: bool = True,
+    session: Optional[DocumentSession] = None,
+    store: Optional[PageStore] = None,
+    dpi: int = 300,
 ) -> Optional[str]:
     """
     Process a single PDF page visually to extract table structure.
@@ -260,15 +308,23 @@ def process_table_page_visually(
         page_number: Page number (1-indexed)
         output_dir: Directory for intermediate images
         lang: Language code for OCR
+        session: Open document session to reuse
+        store: Page store for RGB pages of this PDF at ``dpi`` (see page_store.py);
+            a stored page is mapped instead of rendered, a rendered one is added
+        dpi: Render resolution (per page when planned by dpi_planner.py)
         
     Returns:
         Markdown table string or None
     """
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Step 1: Render PDF page
-    print(f"  Rendering page {page_number} to image...")
-    image = pdf_page_to_image(pdf_path, page_number, dpi=300)
+    # Step 1: Render PDF page (or map it from the page store)
+    image = store.get(page_number) if store is not None else None
+    if image is None:
+        print(f"  Rendering page {page_number} to image...")
+        image = pdf_page_to_image(pdf_path, page_number, dpi=dpi, session=session)
+        if image is not None and store is not None:
+            store.put(page_number, image)
     
     if image is None:
         return None
@@ -278,14 +334,15 @@ def process_table_page_visually(
     grid_image = draw_table_grid(image)
     
     # Save intermediate image for debugging
+    grid_bgr = cv2.cvtColor(grid_image, cv2.COLOR_RGB2BGR)
     grid_path = output_dir / f"page_{page_number}_grid.png"
-    cv2.imwrite(str(grid_path), cv2.cvtColor(grid_image, cv2.COLOR_RGB2BGR))
+    cv2.imwrite(str(grid_path), grid_bgr)
     print(f"  Saved grid image: {grid_path}")
     
     # Step 3: Run PaddleOCR
     print(f"  Running PaddleOCR with structure detection...")
-    # Prefer passing the saved file path to PPStructureV3
-    result = run_paddleocr_table(str(grid_path), lang=lang, use_gpu=use_gpu)
+    # PPStructureV3 accepts BGR arrays; no need to re-read the PNG we just wrote.
+    result = run_paddleocr_table(grid_bgr, lang=lang, use_gpu=use_gpu)
     
     if result is None:
         return None
@@ -0,0 +1,318 @@
+"""Layout templates of recurring tables, shared across pages, years and documents.
+
+Financial statements from the same accounting software repeat one balance
+sheet, income statement or cash-flow layout page after page and year after
+year. Once PP-Structure has recognized such a table, ``TemplateCache.learn``
+keeps its layout: where the gridded region's rules are (as shares of its width,
+so the DPI does not matter), its row pitch, its header words and its column
+bounds. A later region with the same rules and pitch is then read with OCR
+only (no table structure model): when its header words agree and its texts fit
+the template's columns (``TemplateCache.match``), ``template_rows`` lays them
+out on the cached columns. Otherwise it is a miss and goes through full
+structure recognition, which may add a template.
+
+Templates live in one JSON file (``TEMPLATE_CACHE_PATH``) that ``save`` merges
+into under a lock, so concurrent runs share it; least recently used templates
+are dropped beyond ``TEMPLATE_CACHE_MAX``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import time
+from bisect import bisect_right
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from statistics import median
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .config import (
+    TEMPLATE_CACHE_MAX,
+    TEMPLATE_CACHE_PATH,
+    TEMPLATE_GEOMETRY_TOL,
+    TEMPLATE_HEADER_MIN_SIMILARITY,
+    TEMPLATE_MAX_STRADDLING,
+    TEMPLATE_PITCH_TOL,
+)
+from .html_table import html_table_to_rows
+from .ppstructure_postprocess import OCRToken, _group_by_rows, _norm_ws
+from .render_cache import CacheLock
+
+_FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Geometry:
+    """Grid rules of a region, as found before any model runs."""
+    rules: Tuple[float, ...]  # column rule x positions, shares of the region width
+    pitch: Optional[float]  # median row rule spacing, share of the region width
+
+    @classmethod
+    def from_separators(
+        cls, row_ys: Sequence[int], col_xs: Sequence[int], width: int
+    ) -> "Geometry":
+        """Geometry from find_grid_separators' output for a region ``width`` pixels wide."""
+        width = max(width, 1)
+        gaps = [b - a for a, b in zip(row_ys, row_ys[1:])]
+        return cls(
+            rules=tuple(round(x / width, 4) for x in col_xs),
+            pitch=round(median(gaps) / width, 4) if gaps else None,
+        )
+
+    def matches(self, other: "Geometry") -> bool:
+        if len(self.rules) != len(other.rules):
+            return False
+        if any(abs(a - b) > TEMPLATE_GEOMETRY_TOL for a, b in zip(self.rules, other.rules)):
+            return False
+        if self.pitch is None or other.pitch is None:
+            return self.pitch is None and other.pitch is None
+        return abs(self.pitch - other.pitch) <= TEMPLATE_PITCH_TOL * other.pitch
+
+
+@dataclass
+class TableTemplate:
+    """One recurring table layout."""
+    key: str
+    rules: List[float]
+    pitch: Optional[float]
+    header: List[str]  # normalized header words (digits as '#')
+    bounds: List[float]  # x of each column bound, share of the region width
+    hits: int = 0
+    last_used: float = field(default_factory=time.time)
+
+    @property
+    def geometry(self) -> Geometry:
+        return Geometry(tuple(self.rules), self.pitch)
+
+
+def _header_words(tokens: Sequence[OCRToken]) -> List[str]:
+    """Words of the first text row, lower-cased with digits as '#' (years change, layouts don't)."""
+    tokens = [t for t in tokens if t.text.strip()]
+    if not tokens:
+        return []
+    height = median(t.box[3] - t.box[1] for t in tokens)
+    first = _group_by_rows(tokens, y_tol=height / 2)[0]
+    words = " ".join(t.text for t in first).lower().split()
+    return sorted(re.sub(r"\d", "#", w) for w in words)
+
+
+def _similarity(a: Sequence[str], b: Sequence[str]) -> float:
+    sa, sb = set(a), set(b)
+    if not sa or not sb:
+        return 0.0
+    return len(sa & sb) / len(sa | sb)
+
+
+def _straddling(tokens: Sequence[OCRToken], bounds: Sequence[float]) -> float:
+    """Share of tokens crossing a column bound (in pixels) by more than a few pixels."""
+    if not tokens:
+        return 1.0
+    crossing = sum(
+        1 for t in tokens
+        if any(t.box[0] + 3 < b < t.box[2] - 3 for b in bounds)
+    )
+    return crossing / len(tokens)
+
+
+def _column_bounds(cell_boxes: Any, columns: int, width: int) -> Optional[List[float]]:
+    """Column bounds from PP-Structure cell boxes: the starts of columns 2..n.
+
+    Cells of one column start at the same x (a spanning cell starts at its
+    first column), so cell starts are clustered within TEMPLATE_GEOMETRY_TOL of
+    the width; clusters of one cell are dropped. None unless there are exactly
+    ``columns`` clusters.
+    """
+    try:
+        starts = sorted(float(box[0]) for box in cell_boxes)
+    except (TypeError, ValueError, IndexError):
+        return None
+    clusters: List[List[float]] = []
+    for x in starts:
+        if clusters and x - clusters[-1][-1] <= TEMPLATE_GEOMETRY_TOL * width:
+            clusters[-1].append(x)
+        else:
+            clusters.append([x])
+    clusters = [c for c in clusters if len(c) > 1]
+    if len(clusters) != columns:
+        return None
+    return [round(min(c) / width, 4) for c in clusters[1:]]
+
+
+def ocr_tokens(ocr: Any) -> List[OCRToken]:
+    """OCR tokens of a ``table_ocr_pred``/``overall_ocr_res`` dict (rec_texts/scores/boxes)."""
+    if not isinstance(ocr, dict):
+        return []
+    texts, scores, boxes = ocr.get("rec_texts"), ocr.get("rec_scores"), ocr.get("rec_boxes")
+    if not isinstance(texts, list) or scores is None or boxes is None:
+        return []
+    try:
+        return [
+            OCRToken(
+                text=str(t),
+                confidence=float(s),
+                box=(float(b[0]), float(b[1]), float(b[2]), float(b[3])),
+            )
+            for t, s, b in zip(texts, list(scores), list(boxes), strict=True)
+            if str(t).strip()
+        ]
+    except (TypeError, ValueError, IndexError):
+        return []
+
+
+def template_rows(
+    template: TableTemplate, tokens: Sequence[OCRToken], width: int
+) -> List[List[str]]:
+    """Lay tokens (region pixels) out on a template's columns, one row per text line."""
+    tokens = [t for t in tokens if t.text.strip()]
+    if not tokens:
+        return []
+    height = median(t.box[3] - t.box[1] for t in tokens)
+    bounds = [b * width for b in template.bounds]
+    rows = []
+    for line in _group_by_rows(tokens, y_tol=height / 2):
+        cells: List[List[str]] = [[] for _ in range(len(bounds) + 1)]
+        for t in line:
+            cells[bisect_right(bounds, t.x_center)].append(_norm_ws(t.text))
+        rows.append([" ".join(c) for c in cells])
+    return rows
+
+
+class TemplateCache:
+    """Table layout templates in a JSON file, with this run's hit/miss counts."""
+
+    def __init__(
+        self, path: Path = TEMPLATE_CACHE_PATH, max_templates: int = TEMPLATE_CACHE_MAX
+    ) -> None:
+        self.path = Path(path)
+        self.max_templates = max_templates
+        self.templates: Dict[str, TableTemplate] = self._read()
+        self.hits = 0
+        self.misses = 0
+        self.learned = 0
+        self._dirty = False
+
+    def _read(self) -> Dict[str, TableTemplate]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+        if data.get("version") != _FORMAT_VERSION:
+            return {}
+        out = {}
+        for raw in data.get("templates", []):
+            try:
+                template = TableTemplate(**raw)
+            except TypeError:
+                continue
+            out[template.key] = template
+        return out
+
+    def candidates(self, geometry: Geometry) -> List[TableTemplate]:
+        """Templates whose rules and row pitch match a region's, most used first."""
+        found = [t for t in self.templates.values() if geometry.matches(t.geometry)]
+        return sorted(found, key=lambda t: -t.hits)
+
+    def match(
+        self,
+        candidates: Sequence[TableTemplate],
+        tokens: Sequence[OCRToken],
+        width: int,
+    ) -> Optional[TableTemplate]:
+        """The first candidate whose header words agree and whose columns fit the tokens."""
+        header = _header_words(tokens)
+        for template in candidates:
+            if _similarity(header, template.header) < TEMPLATE_HEADER_MIN_SIMILARITY:
+                continue
+            if _straddling(tokens, [b * width for b in template.bounds]) > TEMPLATE_MAX_STRADDLING:
+                continue
+            return template
+        return None
+
+    def hit(self, template: TableTemplate) -> None:
+        self.hits += 1
+        template.hits += 1
+        template.last_used = time.time()
+        self._dirty = True
+
+    def miss(self) -> None:
+        self.misses += 1
+
+    def learn(
+        self, geometry: Geometry, region_res: Dict[str, Any], width: int
+    ) -> Optional[TableTemplate]:
+        """
+        Keep the layout of the single table PP-Structure found in a region.
+
+        Args:
+            geometry: The region's grid rules (Geometry.from_separators)
+            region_res: PP-Structure result for the region (boxes in region pixels)
+            width: Region width in pixels
+
+        Returns:
+            The template, or None when the region does not hold exactly one table
+            with at least two rows and columns whose columns can be located
+        """
+        tables = [t for t in region_res.get("table_res_list") or [] if isinstance(t, dict)]
+        if len(tables) != 1:
+            return None
+        table = tables[0]
+        rows = html_table_to_rows(table.get("pred_html") or "")
+        columns = max((len(r) for r in rows), default=0)
+        if len(rows) < 2 or columns < 2:
+            return None
+        bounds = _column_bounds(table.get("cell_box_list"), columns, max(width, 1))
+        header = _header_words(ocr_tokens(table.get("table_ocr_pred")))
+        if bounds is None or not header:
+            return None
+        raw = json.dumps([list(geometry.rules), geometry.pitch, header, bounds])
+        key = hashlib.sha1(raw.encode()).hexdigest()[:16]
+        if key not in self.templates:
+            self.templates[key] = TableTemplate(
+                key=key,
+                rules=list(geometry.rules),
+                pitch=geometry.pitch,
+                header=header,
+                bounds=bounds,
+            )
+            self.learned += 1
+            self._dirty = True
+        return self.templates[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "learned": self.learned,
+            "templates": len(self.templates),
+        }
+
+    def save(self) -> None:
+        """Merge this run's templates into the file (newest use wins).
+
+        Templates beyond ``max_templates`` are dropped, least recently used first.
+        """
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with CacheLock(self.path.with_name(self.path.name + ".lock")):
+            merged = self._read()
+            for key, template in self.templates.items():
+                if key not in merged or merged[key].last_used <= template.last_used:
+                    merged[key] = template
+            newest = sorted(merged.values(), key=lambda t: t.last_used, reverse=True)
+            kept = newest[: self.max_templates]
+            tmp = self.path.with_name(f".{self.path.name}.tmp")
+            tmp.write_text(
+                json.dumps(
+                    {"version": _FORMAT_VERSION, "templates": [asdict(t) for t in kept]},
+                    ensure_ascii=False,
+                    indent=1,
+                ),
+                encoding="utf-8",
+            )
+            os.replace(tmp, self.path)
+        self.templates = {t.key: t for t in kept}
+        self._dirty = False
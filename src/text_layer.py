@@ -0,0 +1,168 @@
+"""Words of a PDF's text layer as OCR tokens, for pages that need no OCR.
+
+Born-digital pages (exported from accounting software) carry every word and its
+box in the text layer. ``page_tokens`` turns PyMuPDF's words into the
+``OCRToken``s PP-Structure's OCR would give (confidence 1.0, page pixels at the
+render DPI). Words of one text line a space apart are joined into a phrase, so
+an amount such as ``1 191 012,25`` is one token as in OCR output, while words
+further apart (table columns) stay separate tokens.
+
+A text layer is not trusted when it is missing, garbled (glyphs without a
+Unicode mapping) or sits on a scan; those pages and regions still go through
+OCR. ``tokens_to_rows`` is the generic row/column grouping of tokens into a
+table grid, for tables the balance-sheet heuristics do not claim.
+"""
+
+from __future__ import annotations
+
+import unicodedata
+from bisect import bisect_right
+from statistics import median
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+from .config import TEXT_LAYER_MAX_GARBLED, TEXT_LAYER_MAX_IMAGE_SHARE, TEXT_LAYER_MIN_WORDS
+from .ppstructure_postprocess import OCRToken, _group_by_rows, _norm_ws
+from .vector_rules import image_boxes
+
+# Words of a line at most this many line heights apart are one phrase (a space
+# is ~0.2; table columns are further apart).
+_PHRASE_GAP = 0.5
+
+
+def _garbled(ch: str) -> bool:
+    # Unmapped glyphs come out as U+FFFD, private-use or control characters.
+    return ch == "\ufffd" or unicodedata.category(ch) in ("Co", "Cn", "Cc", "Cs")
+
+
+def garbled_share(tokens: Sequence[OCRToken]) -> float:
+    """Share of the tokens' non-space characters that are unmapped glyphs."""
+    chars = [ch for t in tokens for ch in t.text if not ch.isspace()]
+    if not chars:
+        return 0.0
+    return sum(1 for ch in chars if _garbled(ch)) / len(chars)
+
+
+def covered_share(region: Dict, boxes: Sequence[Dict]) -> float:
+    """Share of a region dict's area covered by ``boxes`` (overlaps between boxes counted once each)."""
+    area = region['width'] * region['height']
+    if area <= 0:
+        return 0.0
+    covered = 0
+    for b in boxes:
+        w = min(region['x'] + region['width'], b['x'] + b['width']) - max(region['x'], b['x'])
+        h = min(region['y'] + region['height'], b['y'] + b['height']) - max(region['y'], b['y'])
+        if w > 0 and h > 0:
+            covered += w * h
+    return min(1.0, covered / area)
+
+
+def phrases(page: "fitz.Page") -> List[Tuple["fitz.Rect", str]]:
+    """The page's words joined into phrases, as (rectangle, text) in unrotated PDF points."""
+    if fitz is None:
+        raise ImportError("PyMuPDF not installed. Install with: pip install pymupdf")
+
+    out: List[List] = []  # [rect, text, (block, line)]
+    for x0, y0, x1, y1, text, block, line, _word in page.get_text("words"):
+        rect = fitz.Rect(x0, y0, x1, y1)
+        if out:
+            last = out[-1]
+            gap = rect.x0 - last[0].x1
+            if last[2] == (block, line) and gap <= _PHRASE_GAP * max(rect.height, 1e-6):
+                last[0] |= rect
+                last[1] = f"{last[1]} {text}"
+                continue
+        out.append([rect, text, (block, line)])
+    return [(rect, text) for rect, text, _line in out]
+
+
+def text_layer_tokens(page: "fitz.Page", dpi: int = 300) -> List[OCRToken]:
+    """The page's phrases as tokens, boxes in page pixels at ``dpi``."""
+    words = phrases(page)
+    matrix = page.rotation_matrix * fitz.Matrix(dpi / 72.0, dpi / 72.0)
+    tokens = []
+    for rect, text in words:
+        r = rect * matrix
+        tokens.append(OCRToken(text=text, confidence=1.0, box=(r.x0, r.y0, r.x1, r.y1)))
+    return tokens
+
+
+def page_tokens(page: "fitz.Page", dpi: int = 300) -> Optional[List[OCRToken]]:
+    """Text-layer tokens of a page, or None when the page needs OCR.
+
+    A page needs OCR when it has fewer than TEXT_LAYER_MIN_WORDS words, when its
+    text is garbled, or when raster images cover most of it (a scan, possibly
+    with an OCR'd invisible text layer of unknown quality).
+    """
+    tokens = text_layer_tokens(page, dpi)
+    if sum(len(t.text.split()) for t in tokens) < TEXT_LAYER_MIN_WORDS:
+        return None
+    if garbled_share(tokens) > TEXT_LAYER_MAX_GARBLED:
+        return None
+    k = dpi / 72.0
+    page_box = {'x': 0, 'y': 0, 'width': round(page.rect.width * k), 'height': round(page.rect.height * k)}
+    if covered_share(page_box, image_boxes(page, dpi)) > TEXT_LAYER_MAX_IMAGE_SHARE:
+        return None
+    return tokens
+
+
+def in_region(token: OCRToken, region: Dict) -> bool:
+    """Whether a token's centre lies in a region dict (same pixels)."""
+    return (
+        region['x'] <= token.x_center < region['x'] + region['width']
+        and region['y'] <= token.y_center < region['y'] + region['height']
+    )
+
+
+def tokens_in(tokens: Sequence[OCRToken], region: Dict) -> List[OCRToken]:
+    """Tokens whose centre lies in a region dict, with boxes relative to the region."""
+    x0, y0 = region['x'], region['y']
+    return [
+        OCRToken(
+            text=t.text,
+            confidence=t.confidence,
+            box=(t.box[0] - x0, t.box[1] - y0, t.box[2] - x0, t.box[3] - y0),
+        )
+        for t in tokens
+        if in_region(t, region)
+    ]
+
+
+def tokens_to_rows(tokens: Sequence[OCRToken]) -> List[List[str]]:
+    """Group tokens into a grid of cell strings.
+
+    Rows are tokens within half a line height of each other. Columns are the x
+    ranges the tokens of multi-token rows cover, split where none of them
+    crosses; single-token rows (titles, notes) do not shape the columns.
+
+    Returns:
+        Rows of cells, or [] unless there are two columns and two rows using both
+    """
+    if not tokens:
+        return []
+    height = median(t.box[3] - t.box[1] for t in tokens)
+    rows = _group_by_rows(tokens, y_tol=height / 2)
+
+    columns: List[List[float]] = []
+    for x0, x1 in sorted((t.box[0], t.box[2]) for row in rows if len(row) > 1 for t in row):
+        if columns and x0 <= columns[-1][1]:
+            columns[-1][1] = max(columns[-1][1], x1)
+        else:
+            columns.append([x0, x1])
+    if len(columns) < 2:
+        return []
+
+    starts = [c[0] for c in columns]
+    grid: List[List[str]] = []
+    for row in rows:
+        cells: List[List[str]] = [[] for _ in columns]
+        for t in row:
+            cells[max(0, bisect_right(starts, t.x_center) - 1)].append(_norm_ws(t.text))
+        grid.append([" ".join(c) for c in cells])
+    if sum(1 for cells in grid if sum(1 for c in cells if c) >= 2) < 2:
+        return []
+    return grid
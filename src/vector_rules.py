@@ -0,0 +1,241 @@
+"""Ruled-table regions from a PDF page's vector drawings, without rasterizing.
+
+Born-digital pages draw table rules as vector paths: thin filled rectangles or
+stroked lines. ``vector_table_regions`` takes the paths dark enough to count as
+ink for the OpenCV threshold, snaps them to the pixel grid of the requested
+DPI and runs the region detection of ``detect_table_regions_in_image`` on them
+as ink runs (see grid_profiles.py): horizontal and vertical line openings, then
+the external contours of what survives.
+
+Text is not ink here, and neither are raster images: rules inside an image
+(a scanned page, a pasted table) are left to OpenCV on the image's area, see
+``image_boxes``. Grid drawing still runs on the rendered crop, where text
+strokes are ink too.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+from .grid_profiles import Runs, external_boxes, merge_runs, open_runs
+from .page_preprocess import H_LINE_LEN_300, V_LINE_LEN_300, line_length
+from .page_renderer import BITONAL_THRESHOLD
+
+
+def _gray(color: Optional[tuple], opacity: Optional[float]) -> Optional[float]:
+    """0-255 gray of a PDF colour over white, as cv2.COLOR_RGB2GRAY would see it."""
+    if not color:
+        return None
+    if len(color) == 1:
+        gray = color[0] * 255
+    elif len(color) == 3:
+        gray = (0.299 * color[0] + 0.587 * color[1] + 0.114 * color[2]) * 255
+    else:
+        # CMYK
+        c, m, y, k = color
+        gray = (0.299 * (1 - c) + 0.587 * (1 - m) + 0.114 * (1 - y)) * (1 - k) * 255
+    alpha = 1.0 if opacity is None else opacity
+    return 255 - alpha * (255 - gray)
+
+
+def _stroke_rects(item: tuple, half: float) -> List["fitz.Rect"]:
+    """Axis-aligned stroked segments of a path item, widened to the line width."""
+    kind = item[0]
+    if kind == "l":
+        p, q = item[1], item[2]
+        if abs(p.y - q.y) < 0.01:
+            return [fitz.Rect(min(p.x, q.x), p.y - half, max(p.x, q.x), p.y + half)]
+        if abs(p.x - q.x) < 0.01:
+            return [fitz.Rect(p.x - half, min(p.y, q.y), p.x + half, max(p.y, q.y))]
+        return []
+    if kind in ("re", "qu"):
+        r = item[1] if kind == "re" else item[1].rect
+        return [
+            fitz.Rect(r.x0 - half, r.y0 - half, r.x1 + half, r.y0 + half),
+            fitz.Rect(r.x0 - half, r.y1 - half, r.x1 + half, r.y1 + half),
+            fitz.Rect(r.x0 - half, r.y0 - half, r.x0 + half, r.y1 + half),
+            fitz.Rect(r.x1 - half, r.y0 - half, r.x1 + half, r.y1 + half),
+        ]
+    return []
+
+
+def _subtract(
+    rects: List[Tuple["fitz.Rect", float]], cover: "fitz.Rect"
+) -> List[Tuple["fitz.Rect", float]]:
+    """``rects`` minus the area of ``cover``, as axis-aligned pieces."""
+    out: List[Tuple["fitz.Rect", float]] = []
+    for r, gray in rects:
+        if cover.x0 >= r.x1 or cover.x1 <= r.x0 or cover.y0 >= r.y1 or cover.y1 <= r.y0:
+            out.append((r, gray))
+            continue
+        if cover.y0 > r.y0:
+            out.append((fitz.Rect(r.x0, r.y0, r.x1, cover.y0), gray))
+        if cover.y1 < r.y1:
+            out.append((fitz.Rect(r.x0, cover.y1, r.x1, r.y1), gray))
+        top, bottom = max(r.y0, cover.y0), min(r.y1, cover.y1)
+        if cover.x0 > r.x0:
+            out.append((fitz.Rect(r.x0, top, cover.x0, bottom), gray))
+        if cover.x1 < r.x1:
+            out.append((fitz.Rect(cover.x1, top, r.x1, bottom), gray))
+    return out
+
+
+def _ink_rects(page: "fitz.Page") -> List[Tuple["fitz.Rect", float]]:
+    """Dark axis-aligned filled rectangles and stroked lines of a page, in points.
+
+    Paths are taken in painting order: an opaque light rectangle painted later
+    (e.g. a cell background over a coloured band) removes the ink under it.
+
+    Returns:
+        (rectangle, 0-255 gray) pairs
+    """
+    rects: List[Tuple["fitz.Rect", float]] = []
+    for path in page.get_drawings():
+        kind = path.get("type", "")
+        items = path["items"]
+        if "f" in kind:
+            filled: List["fitz.Rect"] = []
+            if all(it[0] == "re" for it in items):
+                filled = [it[1] for it in items]
+            elif all(it[0] == "qu" and it[1].is_rectangular for it in items):
+                filled = [it[1].rect for it in items]
+            elif all(it[0] in ("l", "re", "qu") for it in items):
+                # A polygon of straight edges: its box (thin rules drawn as paths).
+                filled = [path["rect"]]
+            fill = _gray(path.get("fill"), path.get("fill_opacity"))
+            if fill is not None and fill <= BITONAL_THRESHOLD:
+                rects.extend((r, fill) for r in filled)
+            elif fill is not None and (path.get("fill_opacity") or 1.0) >= 0.99:
+                for cover in filled:
+                    rects = _subtract(rects, cover)
+        stroke = _gray(path.get("color"), path.get("stroke_opacity"))
+        if "s" in kind and stroke is not None and stroke <= BITONAL_THRESHOLD:
+            half = (path.get("width") or 0.0) / 2
+            for item in items:
+                rects.extend((r, stroke) for r in _stroke_rects(item, half))
+    if page.rotation:
+        rects = [(r * page.rotation_matrix, gray) for r, gray in rects]
+    return rects
+
+
+def image_boxes(page: "fitz.Page", dpi: int = 300) -> List[Dict]:
+    """Pixel boxes at ``dpi`` of the raster images drawn on a page.
+
+    Rules inside an image are not vector paths: region detection there is
+    left to OpenCV.
+    """
+    k = dpi / 72.0
+    width, height = round(page.rect.width * k), round(page.rect.height * k)
+    boxes = []
+    for info in page.get_image_info():
+        r = fitz.Rect(info["bbox"])
+        if page.rotation:
+            r = r * page.rotation_matrix
+        r = r & page.rect
+        if r.is_empty:
+            continue
+        x0, y0 = max(0, int(r.x0 * k)), max(0, int(r.y0 * k))
+        x1, y1 = min(width, int(np.ceil(r.x1 * k))), min(height, int(np.ceil(r.y1 * k)))
+        if x1 > x0 and y1 > y0:
+            boxes.append({'x': x0, 'y': y0, 'width': x1 - x0, 'height': y1 - y0})
+    return boxes
+
+
+def _covered(lo: np.ndarray, hi: np.ndarray, need: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pixel span [start, end) of [lo, hi) where each pixel's coverage is at least ``need``."""
+    first = np.floor(lo)
+    last = np.ceil(hi) - 1
+    start = np.where(np.minimum(hi, first + 1) - lo >= need, first, first + 1)
+    end = np.where(hi - np.maximum(lo, last) >= need, last + 1, last)
+    return start.astype(np.int64), end.astype(np.int64)
+
+
+def _pixel_rects(rects: List[Tuple["fitz.Rect", float]], dpi: int, width: int, height: int) -> np.ndarray:
+    """Pixel rectangles at ``dpi`` that the render thresholds to ink.
+
+    An anti-aliased edge pixel is ink when the partial coverage of the path's
+    gray over white still reaches the threshold.
+    """
+    if not rects:
+        return np.empty((0, 4), dtype=np.int64)
+    k = dpi / 72.0
+    box = np.array([(r.x0, r.y0, r.x1, r.y1) for r, _ in rects], dtype=np.float64) * k
+    box = np.concatenate([np.minimum(box[:, :2], box[:, 2:]), np.maximum(box[:, :2], box[:, 2:])], axis=1)
+    gray = np.array([g for _, g in rects], dtype=np.float64)
+    need = (255 - BITONAL_THRESHOLD) / np.maximum(255 - gray, 1e-6)
+    x0, x1 = _covered(box[:, 0], box[:, 2], need)
+    y0, y1 = _covered(box[:, 1], box[:, 3], need)
+    pixels = np.stack([np.clip(x0, 0, width), np.clip(y0, 0, height), np.clip(x1, 0, width), np.clip(y1, 0, height)], axis=1)
+    return pixels[(pixels[:, 2] > pixels[:, 0]) & (pixels[:, 3] > pixels[:, 1])]
+
+
+def _band_runs(rects: np.ndarray, horizontal: bool, size: int) -> Tuple[np.ndarray, Runs]:
+    """Rectangles as runs per band of identical pixel lines.
+
+    Between consecutive rectangle edges every pixel row (column) holds the same
+    runs, so one line per band stands for all of them; bands cover ``[0, size)``
+    and consecutive band indices are adjacent lines. Returns the band edges and
+    the runs, with the band index as line.
+    """
+    lo, hi = (rects[:, 1], rects[:, 3]) if horizontal else (rects[:, 0], rects[:, 2])
+    start, end = (rects[:, 0], rects[:, 2]) if horizontal else (rects[:, 1], rects[:, 3])
+    edges = np.unique(np.concatenate([lo, hi, [0, size]]))
+    first = np.searchsorted(edges, lo)
+    count = np.searchsorted(edges, hi) - first
+    offset = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+    return edges, (np.repeat(first, count) + offset, np.repeat(start, count), np.repeat(end, count))
+
+
+def _band_rects(edges: np.ndarray, runs: Runs, horizontal: bool) -> np.ndarray:
+    """Runs per band back to pixel rectangles (x0, y0, x1, y1)."""
+    line, start, end = runs
+    lo, hi = edges[line], edges[line + 1]
+    if horizontal:
+        return np.stack([start, lo, end, hi], axis=1)
+    return np.stack([lo, start, hi, end], axis=1)
+
+
+def vector_table_regions(page: "fitz.Page", dpi: int = 300) -> Optional[List[Dict]]:
+    """Table regions of a page from its vector rules, in pixels at ``dpi``.
+
+    Returns:
+        Region dicts as ``detect_table_regions_in_image`` returns them, sorted
+        top to bottom; None when the page draws no dark vector paths at all
+        (e.g. a scanned page), so detection has to fall back to OpenCV.
+    """
+    if fitz is None:
+        raise ImportError("PyMuPDF not installed. Install with: pip install pymupdf")
+
+    width = round(page.rect.width * dpi / 72)
+    height = round(page.rect.height * dpi / 72)
+    rects = _pixel_rects(_ink_rects(page), dpi, width, height)
+    if not len(rects):
+        return None
+
+    # The page line masks of detect_table_regions_in_image, as bands of runs.
+    scale = dpi / 300
+    h_edges, h_runs = _band_runs(rects, True, height)
+    h_len = line_length(H_LINE_LEN_300, scale)
+    horizontal = open_runs(merge_runs(h_runs, width), width, h_len, centred=True)
+    v_edges, v_runs = _band_runs(rects, False, width)
+    v_len = line_length(V_LINE_LEN_300, scale)
+    vertical = open_runs(merge_runs(v_runs, height), height, v_len, centred=True)
+    # Both masks as rectangles, then as row bands again for their combined contours.
+    mask = np.concatenate([_band_rects(h_edges, horizontal, True), _band_rects(v_edges, vertical, False)])
+    edges, runs = _band_runs(mask, True, height)
+
+    regions = []
+    for first, last, x0, x1 in external_boxes(runs, width).tolist():
+        y0, y1 = int(edges[first]), int(edges[last + 1])
+        w, h = x1 - x0, y1 - y0
+        if w > 100 * scale and h > 50 * scale:  # Minimum table size
+            regions.append({'x': x0, 'y': y0, 'width': w, 'height': h})
+    regions.sort(key=lambda r: (r['y'], r['x']))
+    return regions
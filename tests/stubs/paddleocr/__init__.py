@@ -0,0 +1,25 @@
+"""Stand-in ``paddleocr`` for tests that run pages in spawned worker processes.
+
+Tests put ``tests/stubs`` first on ``sys.path``; spawned workers inherit the
+parent's path, so their engine registry imports this module instead of the
+real one. ``PPStructureV3`` loads no models and finds one fixed table in
+every image.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+TABLE_HTML = (
+    "<table><tr><td>erä</td><td>2024</td></tr>"
+    "<tr><td>Myyntisaamiset</td><td>1 191 012,25</td></tr></table>"
+)
+
+
+class PPStructureV3:
+    def __init__(self, **_kwargs: Any) -> None:
+        pass
+
+    def predict(self, image: Any, **_kwargs: Any) -> List[Dict[str, Any]]:
+        images = image if isinstance(image, list) else [image]
+        return [{"table_res_list": [{"pred_html": TABLE_HTML}]} for _ in images]
@@ -0,0 +1,824 @@
+"""Tests for the comprehensive (visual) table pipeline without PaddleOCR models."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from src import engine_registry
+from src.comprehensive_table_parser import (
+    detect_table_regions_in_image,
+    iter_page_images,
+    process_page_for_tables,
+    weak_table_structure,
+)
+
+
+TEST_PDF = Path("data/Kauhava-Tilinpaatos-2024.pdf")
+
+TABLE_HTML = (
+    "<table><tr><td>erä</td><td>2024</td></tr>"
+    "<tr><td>Myyntisaamiset</td><td>1 191 012,25</td></tr></table>"
+)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_engines() -> Any:
+    """Engines are process-wide; don't let one test's fake serve the next."""
+    yield
+    engine_registry.release_engines()
+
+
+class FakeEngine:
+    """Stands in for PPStructureV3: records inputs, returns one fixed table."""
+
+    def __init__(self) -> None:
+        self.inputs: List[Any] = []
+
+    def predict(self, image: Any, **_kwargs: Any) -> List[Dict[str, Any]]:
+        self.inputs.append(image)
+        return [{"table_res_list": [{"pred_html": TABLE_HTML}]}]
+
+
+class FakePaddleModule:
+    """Stands in for the ``paddleocr`` module; always hands out the same engine."""
+
+    def __init__(self, engine: FakeEngine) -> None:
+        self.engine = engine
+
+    def PPStructureV3(self, **_kwargs: Any) -> FakeEngine:  # noqa: N802
+        return self.engine
+
+
+@pytest.fixture
+def fake_engine(monkeypatch: pytest.MonkeyPatch) -> FakeEngine:
+    """The engine the registry hands out during the test, whatever its language and pipelines."""
+    engine = FakeEngine()
+    monkeypatch.setattr(engine_registry, "paddleocr_mod", FakePaddleModule(engine))
+    return engine
+
+
+def draw_ruled_table(
+    page: Any, ys: Sequence[float], xs: Sequence[float] = (72, 300, 520), width: float = 1
+) -> None:
+    """Vector rules on a PyMuPDF page: row rules at ``ys``, column rules at ``xs``."""
+    for y in ys:
+        page.draw_line((xs[0], y), (xs[-1], y), width=width)
+    for x in xs:
+        page.draw_line((x, ys[0]), (x, ys[-1]), width=width)
+
+
+def balance_rows_page(page: Any) -> None:
+    """A born-digital 2x2 balance-sheet table: vector rules and a text layer."""
+    draw_ruled_table(page, (100, 130, 160))
+    page.insert_text((80, 120), "Myyntisaamiset", fontsize=9)
+    page.insert_text((310, 120), "1 191 012,25", fontsize=9)
+    page.insert_text((80, 150), "Muut saamiset", fontsize=9)
+    page.insert_text((310, 150), "12 345,67", fontsize=9)
+
+
+@pytest.fixture
+def make_pdf(tmp_path: Path) -> Callable[..., Path]:
+    """Writes ``doc.pdf`` with one page per drawing function (None: a blank page)."""
+    fitz = pytest.importorskip("fitz")
+
+    def make(
+        *pages: Optional[Callable[[Any], None]], width: float = 595, height: float = 842
+    ) -> Path:
+        pdf = tmp_path / "doc.pdf"
+        with fitz.open() as doc:
+            for draw in pages:
+                page = doc.new_page(width=width, height=height)
+                if draw is not None:
+                    draw(page)
+            doc.save(str(pdf))
+        return pdf
+
+    return make
+
+
+def ruled_page(width: int = 800, height: int = 600) -> Any:
+    """White RGB page with one ruled 3x3 grid."""
+    img = np.full((height, width, 3), 255, dtype=np.uint8)
+    x0, y0, x1, y1 = 100, 100, 700, 400
+    for y in (y0, 200, 300, y1):
+        cv2.line(img, (x0, y), (x1, y), (0, 0, 0), 2)
+    for x in (x0, 300, 500, x1):
+        cv2.line(img, (x, y0), (x, y1), (0, 0, 0), 2)
+    return img
+
+
+def test_detect_table_regions_in_image_accepts_array() -> None:
+    regions = detect_table_regions_in_image(ruled_page())
+
+    assert len(regions) == 1
+    r = regions[0]
+    assert 95 <= r["x"] <= 105 and 95 <= r["y"] <= 105
+    assert 590 <= r["width"] <= 610 and 290 <= r["height"] <= 310
+
+
+def test_process_page_for_tables_passes_arrays_to_model(tmp_path: Path) -> None:
+    engine = FakeEngine()
+
+    tables, same_engine = process_page_for_tables(1, ruled_page(), tmp_path, pp_engine=engine)
+
+    assert same_engine is engine
+    assert len(tables) == 1
+    assert tables[0]["grid_image"] is None
+    assert all(isinstance(x, np.ndarray) and x.ndim == 3 for x in engine.inputs)
+    assert not list(tmp_path.iterdir())
+
+
+def test_gray_page_is_expanded_only_for_the_model(tmp_path: Path) -> None:
+    engine = FakeEngine()
+    gray = cv2.cvtColor(ruled_page(), cv2.COLOR_RGB2GRAY)
+
+    assert len(detect_table_regions_in_image(gray)) == 1
+    tables, _ = process_page_for_tables(1, gray, tmp_path, pp_engine=engine)
+
+    assert len(tables) == 1
+    assert all(x.ndim == 3 and x.shape[2] == 3 for x in engine.inputs)
+
+
+def test_fragments_of_one_table_get_one_model_call(tmp_path: Path) -> None:
+    img = ruled_page()
+    # Break the frame: a white band splits the grid into a header and a body.
+    img[196:204, :] = 255
+    engine = FakeEngine()
+
+    assert len(detect_table_regions_in_image(img)) == 2
+    tables, _ = process_page_for_tables(1, img, tmp_path, pp_engine=engine)
+
+    assert len(tables) == 1 and len(engine.inputs) == 1
+    assert engine.inputs[0].shape[0] >= 290
+
+
+class LocatingEngine(FakeEngine):
+    """Returns one table per separate block of ink, with its cell box."""
+
+    def predict(self, image: Any, **_kwargs: Any) -> List[Dict[str, Any]]:
+        self.inputs.append(image)
+        ink = (image.min(axis=2) < 128).astype(np.uint8)
+        blobs = cv2.dilate(ink, np.ones((15, 15), np.uint8))
+        n, _labels, stats, _ = cv2.connectedComponentsWithStats(blobs)
+        tables = [
+            {"pred_html": TABLE_HTML, "cell_box_list": [[x, y, x + w, y + h]]}
+            for x, y, w, h, _area in stats[1:n].tolist()
+        ]
+        return [{"table_res_list": tables}]
+
+
+def small_tables_page() -> Any:
+    """White RGB page with three small ruled 2x2 grids."""
+    img = np.full((900, 800, 3), 255, dtype=np.uint8)
+    for top in (100, 350, 600):
+        for y in (top, top + 60, top + 120):
+            cv2.line(img, (100, y), (500, y), (0, 0, 0), 2)
+        for x in (100, 300, 500):
+            cv2.line(img, (x, top), (x, top + 120), (0, 0, 0), 2)
+    return img
+
+
+def test_packed_regions_share_one_model_call(tmp_path: Path) -> None:
+    engine = LocatingEngine()
+
+    tables, _ = process_page_for_tables(
+        1,
+        small_tables_page(),
+        tmp_path,
+        pp_engine=engine,
+        pack_regions=True,
+        save_debug_images=True,
+    )
+
+    assert len(engine.inputs) == 1
+    assert [t["region"] for t in tables] == [0, 1, 2]
+    assert [Path(t["grid_image"]).name for t in tables] == [
+        f"page_0001_table_{i}_grid.png" for i in range(3)
+    ]
+    assert all(t["canvas"] == 0 for t in tables)
+
+
+def test_unattributable_canvas_falls_back_to_one_call_per_region(tmp_path: Path) -> None:
+    engine = FakeEngine()  # tables without boxes
+
+    tables, _ = process_page_for_tables(
+        1, small_tables_page(), tmp_path, pp_engine=engine, pack_regions=True
+    )
+
+    assert len(engine.inputs) == 4  # the canvas, then each region
+    assert [t["region"] for t in tables] == [0, 1, 2]
+    assert not any("canvas" in t for t in tables)
+
+
+class BatchEngine(FakeEngine):
+    """Returns one table per image of a list, marked with its place in the list."""
+
+    def predict(self, image: Any, **_kwargs: Any) -> List[Dict[str, Any]]:
+        self.inputs.append(image)
+        images = image if isinstance(image, list) else [image]
+        return [
+            {"table_res_list": [{"pred_html": TABLE_HTML.replace("erä", f"erä {i}")}]}
+            for i in range(len(images))
+        ]
+
+
+def test_batched_regions_keep_their_region(tmp_path: Path) -> None:
+    from src.predict_batch import PredictBatcher
+
+    engine = BatchEngine()
+    batcher = PredictBatcher(size=2)
+
+    tables, _ = process_page_for_tables(
+        1, small_tables_page(), tmp_path, pp_engine=engine, batcher=batcher
+    )
+
+    # Regions 0 and 1 in one call, region 2 on its own.
+    assert [len(x) if isinstance(x, list) else 1 for x in engine.inputs] == [2, 1]
+    assert [t["region"] for t in tables] == [0, 1, 2]
+    assert [t["rows"][0][0] for t in tables] == ["erä 0", "erä 1", "erä 0"]
+    assert batcher.stats()["batches"] == 1 and batcher.stats()["images"] == 2
+
+
+def test_process_page_for_tables_writes_grid_only_for_debug(tmp_path: Path) -> None:
+    tables, _ = process_page_for_tables(
+        1, ruled_page(), tmp_path, pp_engine=FakeEngine(), save_debug_images=True
+    )
+
+    assert Path(tables[0]["grid_image"]).exists()
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_iter_page_images_renders_in_memory_and_reuses_pngs(tmp_path: Path) -> None:
+    pytest.importorskip("fitz")
+    reused = np.zeros((10, 20, 3), dtype=np.uint8)
+    cv2.imwrite(str(tmp_path / "page_0002.png"), reused)
+
+    pages = list(
+        iter_page_images(
+            TEST_PDF, [1, 2, 3], dpi=30, renderer="pymupdf", chunk_size=2, reuse_dir=tmp_path
+        )
+    )
+
+    assert [n for n, _ in pages] == [1, 2, 3]
+    assert pages[1][1].shape == (10, 20, 3)
+    assert pages[0][1].shape[2] == 3 and pages[0][1].shape[0] > 10
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["page_0002.png"]
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+@pytest.mark.parametrize("renderer", ["pymupdf", "pdf2image"])
+def test_two_pass_never_sends_a_full_dpi_page(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, fake_engine: FakeEngine, renderer: str
+) -> None:
+    fitz = pytest.importorskip("fitz")
+    import src.comprehensive_table_parser as ctp
+    from src.page_renderer import Pdf2ImageRenderer
+
+    def no_full_pages(*_args: Any, **_kwargs: Any) -> Any:
+        raise AssertionError("two-pass rendered a whole page with pdf2image")
+
+    monkeypatch.setattr(Pdf2ImageRenderer, "render_page", no_full_pages)
+
+    result = ctp.process_all_pages_comprehensive(
+        TEST_PDF,
+        tmp_path,
+        dpi=200,
+        max_pages=2,
+        start_page=30,
+        use_gpu=False,
+        renderer=renderer,
+        save_page_images=False,
+        two_pass=True,
+        triage_dpi=50,
+        text_dpi=100,
+    )
+
+    assert [p["page"] for p in result["pages"]] == [30, 31]
+    with fitz.open(str(TEST_PDF)) as doc:
+        rect = doc[29].rect
+    full_page_px = (rect.width * 200 / 72) * (rect.height * 200 / 72)
+    assert fake_engine.inputs
+    assert all(x.shape[0] * x.shape[1] < 0.9 * full_page_px for x in fake_engine.inputs)
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_adaptive_dpi_is_recorded_per_page(tmp_path: Path, fake_engine: FakeEngine) -> None:
+    pytest.importorskip("fitz")
+    import json
+
+    import src.comprehensive_table_parser as ctp
+    from src.dpi_planner import DpiPlanner
+
+    planner = DpiPlanner(max_dpi=120, min_dpi=60)
+
+    result = ctp.process_all_pages_comprehensive(
+        TEST_PDF,
+        tmp_path,
+        dpi=120,
+        max_pages=3,
+        use_gpu=False,
+        renderer="pymupdf",
+        save_page_images=False,
+        dpi_planner=planner,
+    )
+
+    progress = json.loads((tmp_path / "progress.json").read_text(encoding="utf-8"))
+    page_dpis = {p["page"]: p["dpi"] for p in result["pages"]}
+    assert result["dpi_plan"] == planner.label == progress["dpi_plan"]
+    assert progress["page_dpis"] == {str(k): v for k, v in page_dpis.items()}
+    assert result["tables"]
+    assert all(t["dpi"] == page_dpis[t["page"]] for t in result["tables"])
+
+
+def test_comprehensive_reuses_results_for_skipped_pages(
+    tmp_path: Path, make_pdf: Callable[..., Path], fake_engine: FakeEngine
+) -> None:
+    import src.comprehensive_table_parser as ctp
+
+    def cover(page: Any) -> None:
+        page.insert_text((72, 100), "Tilinpäätös 2024", fontsize=24)
+        draw_ruled_table(page, (200, 240, 280))
+
+    pdf = make_pdf(cover, None, cover)
+    result = ctp.process_all_pages_comprehensive(
+        pdf, tmp_path / "work", dpi=72, use_gpu=False, renderer="pymupdf",
+        save_page_images=False, skip_pages=True,
+    )
+
+    pages = {p["page"]: p for p in result["pages"]}
+    assert sorted(pages) == [1, 2, 3]
+    assert pages[1]["skip"] is None
+    assert pages[2]["skip"]["reason"] == "blank" and pages[2]["text"] == ""
+    assert pages[3]["skip"] == {"reason": "duplicate", "same_as": 1, "ink": pages[3]["skip"]["ink"]}
+    page1_tables = [t for t in result["tables"] if t["page"] == 1]
+    page3_tables = [t for t in result["tables"] if t["page"] == 3]
+    assert len(page3_tables) == len(page1_tables) > 0
+    assert all(t["duplicate_of"] == 1 for t in page3_tables)
+    assert len(fake_engine.inputs) <= 3  # page text + table regions of page 1 only
+
+
+def test_large_page_is_processed_in_tiles(
+    tmp_path: Path, make_pdf: Callable[..., Path], fake_engine: FakeEngine
+) -> None:
+    import src.comprehensive_table_parser as ctp
+
+    def foldout(page: Any) -> None:
+        # One ruled table spanning the whole width, so every tile edge cuts it.
+        draw_ruled_table(page, (200, 300, 400, 500), xs=(60, 400, 800, 1130), width=2)
+
+    pdf = make_pdf(foldout, width=1190, height=842)  # A3 landscape
+    budget = 300_000  # the page is ~970k pixels at 72 DPI
+    result = ctp.process_all_pages_comprehensive(
+        pdf, tmp_path / "work", dpi=72, use_gpu=False, renderer="pymupdf",
+        tile_max_pixels=budget, tile_overlap=40,
+    )
+
+    page_item = result["pages"][0]
+    assert page_item["tiles"] > 1
+    assert page_item["page_image"].endswith("page_0001_preview.png")
+    assert len(result["tables"]) == 1  # regions cut by tile edges are merged
+    # +-1 px rounding
+    assert all(x.shape[0] * x.shape[1] <= budget * 1.01 for x in fake_engine.inputs)
+
+
+@pytest.mark.parametrize("two_pass", [False, True])
+def test_vector_regions_replace_opencv_detection(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    make_pdf: Callable[..., Path],
+    fake_engine: FakeEngine,
+    two_pass: bool,
+) -> None:
+    import src.comprehensive_table_parser as ctp
+
+    pdf = make_pdf(
+        lambda page: draw_ruled_table(page, (200, 260, 320)),
+        lambda page: page.insert_text((72, 100), "Tilinpäätös 2024", fontsize=24),
+    )
+
+    def no_opencv(*_args: Any, **_kwargs: Any) -> None:
+        raise AssertionError("OpenCV region detection on a page with vector rules")
+
+    monkeypatch.setattr(ctp, "preprocess_page", no_opencv)
+    result = ctp.process_all_pages_comprehensive(
+        pdf, tmp_path / "work", dpi=150, use_gpu=False, renderer="pymupdf",
+        save_page_images=False, two_pass=two_pass, triage_dpi=75, text_dpi=100,
+        region_source="vector", max_pages=1,
+    )
+
+    assert result["pages"][0]["regions"] == "vector"
+    assert [t["page"] for t in result["tables"]] == [1]
+    with pytest.raises(ValueError, match="region source"):
+        ctp.process_all_pages_comprehensive(pdf, tmp_path / "work", region_source="contours")
+
+
+def test_pages_without_vector_rules_record_their_fallback(
+    tmp_path: Path, make_pdf: Callable[..., Path], fake_engine: FakeEngine
+) -> None:
+    import json
+
+    import src.comprehensive_table_parser as ctp
+
+    def unruled(page: Any) -> None:
+        page.insert_text((72, 80), "Tase 2024", fontsize=14)
+        page.insert_text((80, 120), "Myyntisaamiset 1 191 012,25", fontsize=9)
+
+    # Text-layer regions fall back to OpenCV on a thumbnail.
+    pdf = make_pdf(unruled)
+    result = ctp.process_all_pages_comprehensive(
+        pdf, tmp_path / "work", dpi=150, use_gpu=False, renderer="pymupdf",
+        save_page_images=False, text_layer=True, region_source="vector",
+    )
+
+    progress = json.loads((tmp_path / "work" / "progress.json").read_text(encoding="utf-8"))
+    assert result["pages"][0]["regions"] == "opencv"
+    assert progress["pages_pdf_regions"] == 0
+
+
+def test_text_layer_pages_skip_ocr(
+    tmp_path: Path, make_pdf: Callable[..., Path], fake_engine: FakeEngine
+) -> None:
+    import src.comprehensive_table_parser as ctp
+
+    def balance_sheet(page: Any) -> None:
+        page.insert_text((72, 80), "Tase 2024", fontsize=14)
+        balance_rows_page(page)
+
+    pdf = make_pdf(balance_sheet, None)  # page 2 has no text layer: OCR'd
+    result = ctp.process_all_pages_comprehensive(
+        pdf, tmp_path / "work", dpi=150, use_gpu=False, renderer="pymupdf",
+        save_page_images=False, text_layer=True,
+    )
+
+    first, second = result["pages"]
+    assert first["text_source"] == "text_layer" and second["text_source"] == "ocr"
+    assert "Myyntisaamiset" in first["text"]
+    page1 = [t for t in result["tables"] if t["page"] == 1]
+    assert len(page1) == 1 and page1[0]["source"] == "text_layer"
+    assert "| Muut saamiset | 12 345,67 |" in page1[0]["markdown"]
+    assert len(fake_engine.inputs) == 2  # page 2 only: page text + whole-page region
+
+
+def test_page_renderer_is_closed_when_a_page_fails(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    make_pdf: Callable[..., Path],
+    fake_engine: FakeEngine,
+) -> None:
+    import src.comprehensive_table_parser as ctp
+    from src.page_renderer import PyMuPDFRenderer
+
+    closed: List[int] = []
+    close = PyMuPDFRenderer.close
+
+    def spy_close(self: PyMuPDFRenderer) -> None:
+        closed.append(1)
+        close(self)
+
+    def fail(*_args: Any, **_kwargs: Any) -> None:
+        raise RuntimeError("page failed")
+
+    monkeypatch.setattr(PyMuPDFRenderer, "close", spy_close)
+    monkeypatch.setattr(ctp, "_process_page_text_layer", fail)
+    pdf = make_pdf(balance_rows_page)
+    with pytest.raises(RuntimeError, match="page failed"):
+        ctp.process_all_pages_comprehensive(
+            pdf, tmp_path / "work", dpi=150, use_gpu=False, renderer="pymupdf",
+            save_page_images=False, text_layer=True,
+        )
+
+    assert closed
+
+
+def test_text_layer_pages_save_a_low_dpi_preview(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    make_pdf: Callable[..., Path],
+    fake_engine: FakeEngine,
+) -> None:
+    import src.comprehensive_table_parser as ctp
+    from src.page_renderer import PyMuPDFRenderer
+
+    pdf = make_pdf(balance_rows_page, None)  # page 2 has no text layer: rendered whole
+    whole_pages: List[Any] = []
+    pixmap = PyMuPDFRenderer._pixmap
+
+    def spy(
+        self: Any, page_number: int, dpi: int, color_mode: str = "rgb", clip: Any = None
+    ) -> Any:
+        if clip is None:
+            whole_pages.append((page_number, dpi))
+        return pixmap(self, page_number, dpi, color_mode, clip)
+
+    monkeypatch.setattr(PyMuPDFRenderer, "_pixmap", spy)
+    result = ctp.process_all_pages_comprehensive(
+        pdf, tmp_path / "work", dpi=300, use_gpu=False, renderer="pymupdf", text_layer=True,
+    )
+
+    first, second = result["pages"]
+    assert first["text_source"] == "text_layer"
+    assert first["page_image"].endswith("page_0001_preview.png")
+    assert second["page_image"].endswith("page_0002.png")
+    assert max(dpi for n, dpi in whole_pages if n == 1) <= 100
+    assert (2, 300) in whole_pages
+
+
+def test_prepass_regions_crop_each_table(
+    tmp_path: Path, make_pdf: Callable[..., Path], fake_engine: FakeEngine
+) -> None:
+    import src.comprehensive_table_parser as ctp
+
+    def statements(page: Any) -> None:
+        for top, title in ((100, "TULOSLASKELMA 2024 2023"), (300, "VASTAAVAA 2024 2023")):
+            page.insert_text((72, top), title, fontsize=10)
+            for i in range(1, 4):
+                page.insert_text((72, top + 14 * i), f"Rivi {i}", fontsize=9)
+                page.insert_text((300, top + 14 * i), f"{i} 191 012,25", fontsize=9)
+        page.insert_text((72, 200), "Toimintatuotot kasvoivat edellisestä vuodesta.", fontsize=9)
+
+    pdf = make_pdf(statements, None)  # page 2 has no text layer: OpenCV
+    result = ctp.process_all_pages_comprehensive(
+        pdf, tmp_path / "work", dpi=150, use_gpu=False, renderer="pymupdf",
+        save_page_images=False, region_source="prepass",
+    )
+
+    first, second = result["pages"]
+    assert first["regions"] == "prepass" and second["regions"] == "opencv"
+    page1 = [t for t in result["tables"] if t["page"] == 1]
+    assert [t["region"] for t in page1] == [0, 1]
+    # Two separate crops, each well short of the page height.
+    crops = fake_engine.inputs[:2]
+    assert all(c.shape[0] < 150 * 11 / 3 for c in crops)
+
+
+def test_prepass_blocks_are_not_joined_like_fragments(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    make_pdf: Callable[..., Path],
+    fake_engine: FakeEngine,
+) -> None:
+    import src.comprehensive_table_parser as ctp
+
+    # Two stacked tables 4 px apart at 150 DPI: rule fragments that close are joined.
+    blocks = [
+        {'x': 150, 'y': 200, 'width': 900, 'height': 200},
+        {'x': 150, 'y': 404, 'width': 900, 'height': 200},
+    ]
+    assert len(ctp._merged_regions(blocks, 0.5)) == 1
+    monkeypatch.setattr(ctp, "detect_prepass_regions", lambda page, dpi: list(blocks))
+    pdf = make_pdf(lambda page: draw_ruled_table(page, (100, 190, 290)))
+    result = ctp.process_all_pages_comprehensive(
+        pdf, tmp_path / "work", dpi=150, use_gpu=False, renderer="pymupdf",
+        save_page_images=False, region_source="prepass",
+    )
+
+    assert result["pages"][0]["regions"] == "prepass"
+    assert [t["region"] for t in result["tables"]] == [0, 1]
+
+
+STRONG_HTML = (
+    "<table><tr><td>erä</td><td>2024</td><td>2023</td></tr>"
+    "<tr><td>Myyntisaamiset</td><td>1 191 012,25</td><td>1 010 000,00</td></tr></table>"
+)
+
+
+class LayoutEngine(FakeEngine):
+    """Whole pages get ``page_result``; anything smaller gets the fixed table."""
+
+    def __init__(self, page_shape: tuple, page_result: Dict[str, Any]) -> None:
+        super().__init__()
+        self.page_shape = page_shape
+        self.page_result = page_result
+
+    def predict(self, image: Any, **kwargs: Any) -> List[Dict[str, Any]]:
+        if image.shape[:2] == self.page_shape:
+            self.inputs.append(image)
+            return [self.page_result]
+        return super().predict(image, **kwargs)
+
+
+def test_layout_tables_are_kept_and_only_weak_ones_regridded(tmp_path: Path) -> None:
+    from src.comprehensive_table_parser import _process_page_layout
+
+    page = ruled_page()
+    page_result = {
+        "overall_ocr_res": {"rec_texts": ["Tase"], "rec_boxes": [[100, 50, 200, 80]]},
+        "layout_det_res": {"boxes": [
+            {"label": "table", "coordinate": [100, 100, 700, 250]},
+            {"label": "table", "coordinate": [100, 300, 700, 400]},
+            {"label": "table", "coordinate": [100, 450, 700, 580]},  # not recognized
+        ]},
+        "table_res_list": [
+            {"pred_html": STRONG_HTML, "cell_box_list": [[100, 100, 700, 250]]},
+            {"pred_html": "<table><tr><td>kaikki yhdessä solussa</td></tr></table>",
+             "cell_box_list": [[100, 300, 700, 400]]},
+        ],
+    }
+    engine = LayoutEngine(page.shape[:2], page_result)
+
+    text, tables, _, used = _process_page_layout(
+        1, page, dpi=300, tables_dir=tmp_path, pp_engine=engine, use_gpu=False,
+        save_debug_images=False, grid_engine="morphology", pack_regions=False,
+    )
+
+    assert used and text == "Tase"
+    assert [t["region"] for t in tables] == [0, 1, 2]
+    assert "1 010 000,00" in tables[0]["markdown"]
+    # The whole page once, then the weak table and the unrecognized box, gridded.
+    assert len(engine.inputs) == 3
+    assert [x.shape[:2] for x in engine.inputs[1:]] == [(120, 620), (150, 620)]
+
+
+def test_layout_pages_without_tables_fall_back_to_opencv(tmp_path: Path) -> None:
+    from src.comprehensive_table_parser import _process_page_layout
+
+    page = ruled_page()
+    engine = LayoutEngine(page.shape[:2], {"table_res_list": []})
+
+    _text, tables, _, used = _process_page_layout(
+        1, page, dpi=300, tables_dir=tmp_path, pp_engine=engine, use_gpu=False,
+        save_debug_images=False, grid_engine="morphology", pack_regions=False,
+    )
+
+    assert not used
+    assert len(tables) == 1 and len(engine.inputs) == 2  # page, then the OpenCV region
+    assert weak_table_structure({"pred_html": STRONG_HTML}) is False
+    assert weak_table_structure({
+        "pred_html": STRONG_HTML, "table_ocr_pred": {"rec_texts": ["x"] * 20},
+    }) is True
+
+
+class TemplateEngine(FakeEngine):
+    """A recognized 2x2 table with cell and OCR boxes; only OCR texts without table recognition."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.kwargs: List[Dict[str, Any]] = []
+
+    def predict(self, image: Any, **kwargs: Any) -> List[Dict[str, Any]]:
+        self.inputs.append(image)
+        self.kwargs.append(kwargs)
+        texts = ["erä", "2024", "Myyntisaamiset", "1 191 012,25"]
+        if kwargs.get("use_table_recognition") is False:
+            texts = ["erä", "2025", *texts[2:]]
+        ocr = {
+            "rec_texts": texts,
+            "rec_scores": [0.99] * 4,
+            "rec_boxes": [
+                [20, 20, 60, 40], [250, 20, 300, 40], [20, 80, 150, 100], [220, 80, 350, 100],
+            ],
+        }
+        if kwargs.get("use_table_recognition") is False:
+            return [{"overall_ocr_res": ocr, "table_res_list": []}]
+        cells = [[2, 2, 200, 60], [200, 2, 400, 60], [2, 60, 200, 120], [200, 60, 400, 120]]
+        table = {"pred_html": TABLE_HTML, "cell_box_list": cells, "table_ocr_pred": ocr}
+        return [{"table_res_list": [table]}]
+
+
+def test_repeated_layouts_are_read_on_a_cached_template(tmp_path: Path) -> None:
+    from src.table_templates import TemplateCache
+
+    engine = TemplateEngine()
+    templates = TemplateCache(tmp_path / "templates.json")
+
+    tables, _ = process_page_for_tables(
+        1, small_tables_page(), tmp_path, pp_engine=engine, templates=templates
+    )
+
+    # The first grid is recognized in full; the two repeats are OCR'd only.
+    assert [kw.get("use_table_recognition") for kw in engine.kwargs] == [None, False, False]
+    assert [t.get("template") is not None for t in tables] == [False, True, True]
+    assert tables[1]["markdown"].splitlines()[2] == "| Myyntisaamiset | 1 191 012,25 |"
+    assert templates.stats() == {"hits": 2, "misses": 1, "learned": 1, "templates": 1}
+    templates.save()
+    assert len(TemplateCache(tmp_path / "templates.json").templates) == 1
+
+
+def test_single_pass_reuses_the_page_predict(tmp_path: Path) -> None:
+    from src.comprehensive_table_parser import _process_page_single_pass
+
+    page = ruled_page()
+    ocr = {
+        "rec_texts": ["Tase", "erä", "Myyntisaamiset"],
+        "rec_boxes": [[100, 50, 200, 80], [120, 120, 200, 150], [120, 220, 300, 250]],
+    }
+    strong = {"overall_ocr_res": ocr, "table_res_list": [
+        {"pred_html": STRONG_HTML, "cell_box_list": [[100, 100, 700, 400]]},
+    ]}
+    weak = {"overall_ocr_res": ocr, "table_res_list": [
+        {
+            "pred_html": "<table><tr><td>kaikki</td></tr></table>",
+            "cell_box_list": [[100, 100, 700, 400]],
+        },
+    ]}
+    kwargs = dict(dpi=300, tables_dir=tmp_path, use_gpu=False, save_debug_images=False,
+                  grid_engine="morphology", pack_regions=False)
+
+    engine = LayoutEngine(page.shape[:2], strong)
+    text, tables, _ = _process_page_single_pass(1, page, None, pp_engine=engine, **kwargs)
+    # The ruled region holds a strong first-pass table: no second call, and its
+    # texts are left out of the page text.
+    assert len(engine.inputs) == 1 and text == "Tase"
+    assert len(tables) == 1 and "1 010 000,00" in tables[0]["markdown"]
+
+    engine = LayoutEngine(page.shape[:2], weak)
+    text, tables, _ = _process_page_single_pass(1, page, None, pp_engine=engine, **kwargs)
+    # Weak structure: the region is gridded and predicted again.
+    assert len(engine.inputs) == 2 and engine.inputs[1].shape[:2] != page.shape[:2]
+    assert [t["region"] for t in tables] == [0] and text == "Tase"
+
+    blank = np.full((600, 800, 3), 255, dtype=np.uint8)
+    engine = LayoutEngine(blank.shape[:2], {"overall_ocr_res": ocr, "table_res_list": []})
+    text, tables, _ = _process_page_single_pass(1, blank, None, pp_engine=engine, **kwargs)
+    # No regions and no tables: the page predict is the only call.
+    assert len(engine.inputs) == 1 and tables == [] and text.startswith("Tase")
+
+
+class InlineExecutor:
+    """Stands in for ProcessPoolExecutor: runs each shard in this process, in order."""
+
+    def __init__(self, **_kwargs: Any) -> None:
+        pass
+
+    def __enter__(self) -> "InlineExecutor":
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        pass
+
+    def submit(self, fn: Any, *args: Any) -> Any:
+        from concurrent.futures import Future
+
+        future: Future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def test_sharded_pages_merge_like_a_single_process_run(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    make_pdf: Callable[..., Path],
+    fake_engine: FakeEngine,
+) -> None:
+    import src.comprehensive_table_parser as ctp
+
+    def appendix(n: int) -> Callable[[Any], None]:
+        def draw(page: Any) -> None:
+            page.insert_text((72, 100), f"Liite {n}", fontsize=24)
+            draw_ruled_table(page, (200, 240, 280 + 40 * n))
+
+        return draw
+
+    pdf = make_pdf(*(appendix(n % 4) for n in range(5)))  # page 5 repeats page 1
+    monkeypatch.setattr(ctp, "ProcessPoolExecutor", InlineExecutor)
+    options = dict(
+        dpi=72, use_gpu=False, renderer="pymupdf", save_page_images=False, skip_pages=True
+    )
+
+    single = ctp.process_all_pages_comprehensive(pdf, tmp_path / "one", **options)
+    sharded = ctp.process_all_pages_comprehensive(pdf, tmp_path / "two", workers=2, **options)
+
+    assert sharded["workers"] == 2
+    assert sharded["pages"] == single["pages"]
+    assert sharded["tables"] == single["tables"]
+    assert sharded["pages"][4]["skip"]["same_as"] == 1
+    assert (tmp_path / "two" / "progress.worker1.json").exists()
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_sharded_pages_run_in_spawned_workers(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, fake_engine: FakeEngine
+) -> None:
+    pytest.importorskip("fitz")
+    import json
+
+    import src.comprehensive_table_parser as ctp
+
+    # This process uses the fake engine; spawned workers inherit sys.path and
+    # import the stub ``paddleocr`` from tests/stubs.
+    monkeypatch.syspath_prepend(str(Path(__file__).parent / "stubs"))
+    options = dict(
+        dpi=72, max_pages=4, start_page=30, use_gpu=False, renderer="pymupdf",
+        save_page_images=False, skip_pages=True, text_layer=True,
+    )
+
+    single = ctp.process_all_pages_comprehensive(TEST_PDF, tmp_path / "one", **options)
+    sharded = ctp.process_all_pages_comprehensive(
+        TEST_PDF, tmp_path / "two", workers=2, **options
+    )
+
+    assert sharded["workers"] == 2
+    assert sorted({e["worker"] for e in sharded["engines"]}) == [0, 1]
+    assert sharded["pages"] == single["pages"]
+    assert sharded["tables"] == single["tables"]
+    one = json.loads((tmp_path / "one" / "progress.json").read_text(encoding="utf-8"))
+    two = json.loads((tmp_path / "two" / "progress.json").read_text(encoding="utf-8"))
+    assert set(two) == set(one) | {"workers", "shards"}
+    for key in ("page_dpis", "pages_skipped", "pages_tiled", "pages_text_layer", "two_pass"):
+        assert two[key] == one[key]
@@ -0,0 +1,48 @@
+"""Tests for the shared per-document PDF session."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fitz")
+
+from src.document_session import DocumentSession, open_document_session
+
+
+TEST_PDF = Path("data/Kauhava-Tilinpaatos-2024.pdf")
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_session_metadata_is_cached() -> None:
+    with DocumentSession(TEST_PDF) as session:
+        assert session.page_count > 1
+        assert len(session.page_sizes) == session.page_count
+        assert session.page_sizes is session.page_sizes
+        width, height = session.page_size(1)
+        assert width > 0 and height > 0
+        assert isinstance(session.toc, list)
+
+        h1 = session.page_hash(1)
+        assert h1 == session.page_hash(1)
+        assert h1 != session.page_hash(2)
+        assert isinstance(session.has_text_layer(1), bool)
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_open_document_session_reuses_caller_session() -> None:
+    with DocumentSession(TEST_PDF) as session:
+        with open_document_session(TEST_PDF, session) as same:
+            assert same is session
+        # Caller keeps ownership: the document is still open.
+        assert session.doc is not None
+        assert session.page_count > 0
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_get_pdf_page_count_uses_session() -> None:
+    from src.comprehensive_table_parser import get_pdf_page_count
+
+    with DocumentSession(TEST_PDF) as session:
+        assert get_pdf_page_count(TEST_PDF, session=session) == session.page_count
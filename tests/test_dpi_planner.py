@@ -0,0 +1,48 @@
+"""Tests for the per-page adaptive DPI planner."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from src.dpi_planner import DpiPlanner, smallest_numeric_font_size
+
+
+TEST_PDF = Path("data/Kauhava-Tilinpaatos-2024.pdf")
+
+
+def test_dpi_for_font_steps_and_clamps() -> None:
+    planner = DpiPlanner(max_dpi=300, min_dpi=150, target_px=28, step=25)
+
+    assert planner.dpi_for_font(7.0) == 300  # 288 -> next step
+    assert planner.dpi_for_font(10.0) == 225  # 201.6 -> next step
+    assert planner.dpi_for_font(5.0) == 300  # would need 403: capped
+    assert planner.dpi_for_font(40.0) == 150  # floor
+    assert planner.dpi_for_font(None) == 300  # no text layer
+
+
+def test_max_dpi_below_the_floor_is_never_exceeded() -> None:
+    planner = DpiPlanner(max_dpi=100)  # below the default 150 DPI floor
+
+    assert all(planner.dpi_for_font(size) <= 100 for size in (4.0, 10.0, 40.0, None))
+    assert planner.dpi_for_font(40.0) == 100
+
+
+def test_plan_without_session_uses_max_dpi() -> None:
+    assert DpiPlanner(max_dpi=250).plan(None, [1, 2]) == {1: 250, 2: 250}
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_plan_follows_smallest_numeric_font() -> None:
+    pytest.importorskip("fitz")
+    from src.document_session import DocumentSession
+
+    planner = DpiPlanner()
+    with DocumentSession(TEST_PDF) as session:
+        plan = planner.plan(session, range(1, 11))
+        sizes = {n: smallest_numeric_font_size(session.page(n)) for n in plan}
+
+    assert all(planner.min_dpi <= d <= planner.max_dpi for d in plan.values())
+    assert all(d == planner.dpi_for_font(sizes[n]) for n, d in plan.items())
+    assert min(plan.values()) < 300
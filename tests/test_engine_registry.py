@@ -0,0 +1,66 @@
+"""Tests for the process-wide PP-Structure engine registry."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import pytest
+
+from src import engine_registry
+from src.engine_registry import engine_stats, get_pp_engine, release_engines
+
+
+class FakeModule:
+    """Stands in for ``paddleocr``; counts the engines it builds."""
+
+    def __init__(self) -> None:
+        self.built: List[Dict[str, Any]] = []
+
+    def PPStructureV3(self, **kwargs: Any) -> Any:  # noqa: N802
+        self.built.append(kwargs)
+        return FakeEngine()
+
+
+class FakeEngine:
+    def predict(self, image: Any, **_kwargs: Any) -> List[Dict[str, Any]]:
+        return [{"table_res_list": []}]
+
+
+@pytest.fixture
+def module(monkeypatch: pytest.MonkeyPatch) -> Any:
+    fake = FakeModule()
+    monkeypatch.setattr(engine_registry, "paddleocr_mod", fake)
+    yield fake
+    release_engines()
+
+
+def test_one_engine_per_language_and_pipelines(module: FakeModule) -> None:
+    first = get_pp_engine(lang="en")
+
+    assert get_pp_engine(lang="en") is first
+    assert get_pp_engine(lang="fi") is not first
+    assert get_pp_engine(lang="en", use_table_recognition=False) is not first
+    assert len(module.built) == 3
+    assert module.built[0]["use_table_recognition"] and not module.built[0]["use_seal_recognition"]
+
+
+def test_warmup_is_the_first_predict_and_release_drops_engines(module: FakeModule) -> None:
+    engine = get_pp_engine()
+    engine.predict("page")
+    engine.predict("page")
+
+    (stats,) = engine_stats()
+    assert stats["warmup_seconds"] is not None and stats["predicts"] == 1
+
+    release_engines()
+    assert engine_stats() == []
+    assert get_pp_engine() is not engine and len(module.built) == 2
+
+
+def test_visual_tables_reuse_the_engine(module: FakeModule) -> None:
+    from src.table_image_builder import run_paddleocr_table
+
+    run_paddleocr_table("a.png", use_gpu=False)
+    run_paddleocr_table("b.png", use_gpu=False)
+
+    assert len(module.built) == 1
@@ -0,0 +1,90 @@
+"""Tests for the projection-profile grid engine."""
+
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from src.grid_profiles import projection_separators
+from src.page_preprocess import preprocess_page
+from src.table_image_builder import (
+    GRID_ENGINE_MORPHOLOGY,
+    GRID_ENGINE_PROJECTION,
+    draw_table_grid,
+    find_grid_separators,
+)
+
+
+def _ruled_crop(rng, height: int, width: int) -> np.ndarray:
+    crop = np.full((height, width, 3), 255, dtype=np.uint8)
+    # Rules of random length and thickness, some running into the crop edges.
+    for _ in range(rng.integers(2, 8)):
+        y = int(rng.integers(0, height))
+        x0, x1 = sorted(int(v) for v in rng.integers(-width // 4, width + width // 4, size=2))
+        cv2.line(crop, (x0, y), (x1, y), (0, 0, 0), int(rng.integers(1, 4)))
+    for _ in range(rng.integers(1, 6)):
+        x = int(rng.integers(0, width))
+        y0, y1 = sorted(int(v) for v in rng.integers(-height // 4, height + height // 4, size=2))
+        cv2.line(crop, (x, y0), (x, y1), (0, 0, 0), int(rng.integers(1, 4)))
+    for _ in range(rng.integers(0, 12)):
+        org = (int(rng.integers(0, width)), int(rng.integers(10, height)))
+        cv2.putText(crop, "1 234,56", org, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1)
+    return crop
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_projection_draws_the_morphology_grid(seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    # Odd and even sizes: OpenCV anchors even kernels off-centre.
+    crop = _ruled_crop(rng, int(rng.integers(60, 400)), int(rng.integers(60, 600)))
+
+    morphology = find_grid_separators(crop, engine=GRID_ENGINE_MORPHOLOGY)
+    assert find_grid_separators(crop, engine=GRID_ENGINE_PROJECTION) == morphology
+    assert np.array_equal(
+        draw_table_grid(crop, engine=GRID_ENGINE_PROJECTION),
+        draw_table_grid(crop, engine=GRID_ENGINE_MORPHOLOGY),
+    )
+
+
+def test_projection_on_shared_page_masks() -> None:
+    page = np.full((1200, 1600, 3), 255, dtype=np.uint8)
+    for y in (300, 420, 540, 700):
+        cv2.line(page, (300, y), (1300, y), (0, 0, 0), 3)
+    for x in (300, 700, 1000, 1300):
+        cv2.line(page, (x, 300), (x, 700), (0, 0, 0), 3)
+    prep = preprocess_page(page).crop(290, 290, 1020, 420)
+    crop = page[290:710, 290:1310]
+
+    rows, cols = find_grid_separators(crop, prep=prep, engine=GRID_ENGINE_PROJECTION)
+
+    assert (rows, cols) == find_grid_separators(crop)
+    assert rows == [10, 130, 250, 410]
+    assert cols == [10, 410, 710, 1010]
+
+
+def test_rule_inside_a_frame_is_not_drawn() -> None:
+    # Only external contours are drawn: a rule in a white window of a shaded
+    # block (a hole of the block's component) is skipped.
+    crop = np.zeros((400, 300, 3), dtype=np.uint8)
+    crop[60:340, 40:260] = 255
+    cv2.line(crop, (120, 100), (120, 300), (0, 0, 0), 2)
+
+    rows, cols = find_grid_separators(crop, engine=GRID_ENGINE_PROJECTION)
+
+    assert (rows, cols) == find_grid_separators(crop, engine=GRID_ENGINE_MORPHOLOGY)
+    assert 120 not in cols
+
+
+def test_rule_touching_both_edges_and_blank_crop() -> None:
+    binary = np.zeros((50, 90), dtype=np.uint8)
+    assert projection_separators(binary) == ([], [])
+
+    binary[20:22, :] = 255
+    assert projection_separators(binary) == ([21], [])
+
+
+def test_unknown_engine_is_rejected() -> None:
+    with pytest.raises(ValueError, match="grid engine"):
+        draw_table_grid(np.zeros((10, 10), dtype=np.uint8), engine="hough")
@@ -0,0 +1,124 @@
+"""Tests for the blank / repeated page pre-filter."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from src.config import PAGE_DUP_PIXEL_TOLERANCE, PAGE_FILTER_DPI
+from src.page_filter import SKIP_BLANK, SKIP_DUPLICATE, find_skippable_pages
+
+
+def text_page(shift: int = 0) -> "np.ndarray":
+    img = np.full((420, 300), 255, dtype=np.uint8)
+    for row in range(8):
+        text = f"Tase {row} 1 234,{row}5"
+        cv2.putText(img, text, (20, 40 + 40 * row), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 0, 1)
+    if shift:
+        cv2.putText(img, "9", (250, 40 + shift), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 0, 1)
+    return img
+
+
+class ThumbRenderer:
+    """Duck-typed renderer serving fixed grayscale thumbnails."""
+
+    def __init__(self, pages: Dict[int, "np.ndarray"]) -> None:
+        self.pages = pages
+
+    def render_range(
+        self, first: int, last: int, dpi: int, color_mode: str = "rgb"
+    ) -> List["np.ndarray"]:
+        return [self.pages[n] for n in range(first, last + 1)]
+
+
+def test_blank_and_repeated_pages_are_skipped() -> None:
+    blank = np.full((420, 300), 255, dtype=np.uint8)
+    blank[400:402, 148:152] = 0  # lone page-number blob
+    renderer = ThumbRenderer({1: text_page(), 2: blank, 3: text_page(), 4: text_page(shift=40)})
+
+    skips = find_skippable_pages(renderer, [1, 2, 3, 4], {n: 36 for n in range(1, 5)})
+
+    assert sorted(skips) == [2, 3]
+    assert skips[2].reason == SKIP_BLANK
+    assert skips[3].reason == SKIP_DUPLICATE and skips[3].same_as == 1
+
+
+def test_pages_drawing_different_forms_are_not_duplicates(tmp_path: Path) -> None:
+    fitz = pytest.importorskip("fitz")
+    from src.document_session import DocumentSession
+    from src.page_renderer import get_renderer
+
+    sources = fitz.open()
+    for amount in ("1 191 012,25", "2 483 907,60"):
+        page = sources.new_page()
+        for y in (200, 240, 280):
+            page.draw_line((72, y), (520, y))
+        page.insert_text((80, 230), "Myyntisaamiset", fontsize=11)
+        page.insert_text((380, 230), amount, fontsize=11)
+    doc = fitz.open()
+    for i in range(2):
+        # Each page's content stream is just "q /Fm0 Do Q".
+        doc.new_page().show_pdf_page(fitz.Rect(0, 0, 595, 842), sources, i)
+    pdf = tmp_path / "imposed.pdf"
+    doc.save(str(pdf))
+
+    with DocumentSession(pdf) as session:
+        assert session.page_hash(1) == session.page_hash(2)
+        with get_renderer("pymupdf", pdf, session=session) as renderer:
+            skips = find_skippable_pages(renderer, [1, 2], {1: 150, 2: 150}, session=session)
+
+    assert skips == {}
+
+
+def test_sparse_text_pages_are_not_blank(tmp_path: Path) -> None:
+    fitz = pytest.importorskip("fitz")
+    from src.document_session import DocumentSession
+    from src.page_renderer import get_renderer
+
+    doc = fitz.open()
+    # A small heading inks no more of a thumbnail than a page number does.
+    for text, size in (("Liite 3", 6), ("12", 10)):
+        doc.new_page().insert_text((290, 420), text, fontsize=size)
+    pdf = tmp_path / "sparse.pdf"
+    doc.save(str(pdf))
+
+    with DocumentSession(pdf) as session:
+        with get_renderer("pymupdf", pdf, session=session) as renderer:
+            skips = find_skippable_pages(renderer, [1, 2], {1: 150, 2: 150}, session=session)
+
+    assert sorted(skips) == [2] and skips[2].reason == SKIP_BLANK
+
+
+@pytest.mark.parametrize("with_session", [True, False])
+def test_one_changed_digit_is_not_a_repeat(tmp_path: Path, with_session: bool) -> None:
+    fitz = pytest.importorskip("fitz")
+    from src.document_session import DocumentSession
+    from src.page_renderer import get_renderer
+
+    doc = fitz.open()
+    for amount in ("1 191 012,25", "1 191 012,26", "1 191 012,25"):
+        page = doc.new_page()
+        for y in (200, 240, 280):
+            page.draw_line((72, y), (520, y))
+        page.insert_text((80, 230), "Myyntisaamiset", fontsize=9)
+        page.insert_text((380, 230), amount, fontsize=9)
+    pdf = tmp_path / "digits.pdf"
+    doc.save(str(pdf))
+
+    with DocumentSession(pdf) as session:
+        with get_renderer("pymupdf", pdf, session=session) as renderer:
+            # The thumbnails cannot tell the pages apart.
+            first, second = renderer.render_range(1, 2, PAGE_FILTER_DPI, color_mode="gray")
+            assert np.abs(first.astype(int) - second.astype(int)).max() <= PAGE_DUP_PIXEL_TOLERANCE
+            skips = find_skippable_pages(
+                renderer, [1, 2, 3], {1: 150, 2: 150, 3: 150},
+                session=session if with_session else None,
+            )
+
+    assert sorted(skips) == [3]
+    assert skips[3].reason == SKIP_DUPLICATE and skips[3].same_as == 1
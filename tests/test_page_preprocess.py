@@ -0,0 +1,77 @@
+"""Tests for the shared per-page OpenCV preprocessing."""
+
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from src.comprehensive_table_parser import detect_table_regions_in_image
+from src.page_preprocess import preprocess_page
+from src.table_image_builder import draw_table_grid
+
+
+@pytest.mark.parametrize("scale", [1.0, 0.675, 0.5])  # even, odd/even, even/odd kernels
+def test_grid_from_shared_buffers_matches_standalone(scale: float) -> None:
+    page = np.full((1200, 1600, 3), 255, dtype=np.uint8)
+    for y in (300, 420, 540, 700):
+        cv2.line(page, (300, y), (1300, y), (0, 0, 0), 3)
+    for x in (300, 700, 1000, 1300):
+        cv2.line(page, (x, 300), (x, 700), (0, 0, 0), 3)
+    cv2.putText(page, "Tase 31.12.2024", (220, 180), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 3)
+
+    prep = preprocess_page(page, scale)
+    regions = detect_table_regions_in_image(page, scale=scale, prep=prep)
+
+    assert len(regions) == 1
+    assert regions == detect_table_regions_in_image(page, scale=scale)
+    for r in regions:
+        crop = page[r["y"]:r["y"] + r["height"], r["x"]:r["x"] + r["width"]]
+        shared = draw_table_grid(crop, prep=prep.crop(r["x"], r["y"], r["width"], r["height"]))
+        assert np.array_equal(shared, draw_table_grid(crop))
+
+
+def test_page_masks_keep_the_detection_kernels() -> None:
+    page = np.full((600, 800), 255, dtype=np.uint8)
+    cv2.line(page, (100, 300), (700, 300), 0, 3)
+    cv2.line(page, (400, 100), (400, 500), 0, 3)
+    cv2.putText(page, "1 191 012,25", (120, 250), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+    _, binary = cv2.threshold(page, 180, 255, cv2.THRESH_BINARY_INV)
+
+    prep = preprocess_page(page)
+
+    h_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1))
+    v_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 30))
+    horizontal = cv2.morphologyEx(binary, cv2.MORPH_OPEN, h_kernel, iterations=2)
+    vertical = cv2.morphologyEx(binary, cv2.MORPH_OPEN, v_kernel, iterations=2)
+    # The same openings, without the pixel per iteration an even kernel shifts them.
+    assert (prep.h_len, prep.v_len) == (40, 30)
+    assert np.array_equal(prep.horizontal[:, :-2], horizontal[:, 2:])
+    assert np.array_equal(prep.vertical[:-2], vertical[2:])
+    assert np.array_equal(prep.horizontal[300, 100:701] > 0, binary[300, 100:701] > 0)
+
+
+def test_grid_reuses_the_page_masks_at_300_dpi() -> None:
+    page = np.full((1400, 1600), 255, dtype=np.uint8)
+    for y in (300, 500, 700, 900):
+        cv2.line(page, (300, y), (1300, y), 0, 3)
+    for x in (300, 700, 1000, 1300):
+        cv2.line(page, (x, 300), (x, 900), 0, 3)
+    cv2.putText(page, "1 191 012,25", (720, 420), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+
+    prep = preprocess_page(page)
+    (r,) = detect_table_regions_in_image(page, prep=prep)
+    crop = page[r["y"]:r["y"] + r["height"], r["x"]:r["x"] + r["width"]]
+
+    assert prep.reusable(r["width"] // 3, prep.h_len)
+    assert prep.reusable(r["height"] // 10, prep.v_len)
+    shared = draw_table_grid(crop, prep=prep.crop(r["x"], r["y"], r["width"], r["height"]))
+    assert np.array_equal(shared, draw_table_grid(crop))
+
+
+def test_crop_is_a_view() -> None:
+    prep = preprocess_page(np.full((300, 400), 255, dtype=np.uint8), scale=0.5)
+
+    assert (prep.h_len, prep.v_len) == (20, 15)
+    assert np.shares_memory(prep.crop(10, 20, 100, 50).binary, prep.binary)
@@ -0,0 +1,158 @@
+"""Tests for pluggable page renderers (pdf2image vs PyMuPDF)."""
+
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("fitz")
+
+from src.page_renderer import get_renderer
+
+
+TEST_PDF = Path("data/Kauhava-Tilinpaatos-2024.pdf")
+HAS_POPPLER = shutil.which("pdftoppm") is not None
+
+
+def test_unknown_renderer_raises() -> None:
+    with pytest.raises(ValueError):
+        get_renderer("nope", TEST_PDF)
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_pymupdf_renderer_page_size_matches_dpi() -> None:
+    import fitz
+
+    with fitz.open(str(TEST_PDF)) as doc:
+        rect = doc[0].rect
+    with get_renderer("pymupdf", TEST_PDF) as renderer:
+        assert renderer.page_count() > 0
+        image = renderer.render_page(1, dpi=144)
+
+    assert image.dtype == np.uint8
+    assert image.ndim == 3 and image.shape[2] == 3
+    assert abs(image.shape[1] - rect.width * 2) <= 1
+    assert abs(image.shape[0] - rect.height * 2) <= 1
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+@pytest.mark.skipif(not HAS_POPPLER, reason="Poppler (pdftoppm) not available")
+def test_pymupdf_renderer_pixel_equivalent_to_pdf2image() -> None:
+    """Both backends must produce the same page raster up to anti-aliasing noise."""
+    dpi = 100
+    for page_number in (1, 2):
+        with get_renderer("pdf2image", TEST_PDF) as renderer:
+            ref = renderer.render_page(page_number, dpi)
+        with get_renderer("pymupdf", TEST_PDF) as renderer:
+            img = renderer.render_page(page_number, dpi)
+
+        # Backends may round the page size differently by one pixel.
+        assert abs(ref.shape[0] - img.shape[0]) <= 1
+        assert abs(ref.shape[1] - img.shape[1]) <= 1
+        h = min(ref.shape[0], img.shape[0])
+        w = min(ref.shape[1], img.shape[1])
+        diff = np.abs(ref[:h, :w].astype(np.int16) - img[:h, :w].astype(np.int16))
+
+        assert float(diff.mean()) < 4.0
+        # Share of pixels that differ visibly (beyond anti-aliasing) stays small.
+        assert float((diff.max(axis=2) > 64).mean()) < 0.02
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_render_all_pages_with_pymupdf(tmp_path: Path) -> None:
+    from src.comprehensive_table_parser import render_all_pages
+
+    pages = render_all_pages(TEST_PDF, tmp_path, dpi=50, max_pages=2, renderer="pymupdf")
+
+    assert [p for p, _ in pages] == [1, 2]
+    assert all(path.exists() for _, path in pages)
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_render_all_pages_reuses_existing_png_in_chunks(tmp_path: Path) -> None:
+    from src.comprehensive_table_parser import render_all_pages
+
+    render_all_pages(TEST_PDF, tmp_path, dpi=40, max_pages=2, renderer="pymupdf")
+    existing = tmp_path / "page_0002.png"
+    existing.write_bytes(b"sentinel")
+
+    pages = render_all_pages(
+        TEST_PDF, tmp_path, dpi=40, max_pages=5, renderer="pymupdf", chunk_size=2
+    )
+
+    assert [p for p, _ in pages] == [1, 2, 3, 4, 5]
+    assert existing.read_bytes() == b"sentinel"
+    assert not list(tmp_path.glob(".render_*"))
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_render_all_pages_rerenders_pngs_from_another_dpi(tmp_path: Path) -> None:
+    from src.comprehensive_table_parser import render_all_pages
+
+    (tmp_path / "page_0001.png").write_bytes(b"no manifest: unknown DPI")
+    render_all_pages(TEST_PDF, tmp_path, dpi=40, max_pages=1, renderer="pymupdf")
+    small = (tmp_path / "page_0001.png").stat().st_size
+    render_all_pages(TEST_PDF, tmp_path, dpi=80, max_pages=1, renderer="pymupdf")
+
+    assert small > len(b"no manifest: unknown DPI")
+    assert (tmp_path / "page_0001.png").stat().st_size > small
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+@pytest.mark.skipif(not HAS_POPPLER, reason="Poppler (pdftoppm) not available")
+def test_pdf2image_renders_range_with_threads(tmp_path: Path) -> None:
+    with get_renderer("pdf2image", TEST_PDF) as renderer:
+        out = renderer.render_range_to_dir(3, 6, 40, tmp_path, thread_count=2)
+
+    assert sorted(out) == [3, 4, 5, 6]
+    assert out[3] == tmp_path / "page_0003.png"
+    assert all(path.exists() for path in out.values())
+    assert not list(tmp_path.glob(".render_*"))
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_pymupdf_clip_matches_full_page_slice() -> None:
+    clip = (72.0, 144.0, 288.0, 216.0)  # points -> pixels (100..400, 200..300) at 100 DPI
+    with get_renderer("pymupdf", TEST_PDF) as renderer:
+        full = renderer.render_page(3, dpi=100)
+        part = renderer.render_clip(3, 100, clip)
+
+    ref = full[200:300, 100:400]
+    assert abs(part.shape[0] - ref.shape[0]) <= 1 and abs(part.shape[1] - ref.shape[1]) <= 1
+    h = min(part.shape[0], ref.shape[0])
+    w = min(part.shape[1], ref.shape[1])
+    diff = np.abs(part[:h, :w].astype(np.int16) - ref[:h, :w].astype(np.int16))
+    assert float(diff.mean()) < 2.0
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_pymupdf_gray_and_bitonal_modes_are_single_channel() -> None:
+    with get_renderer("pymupdf", TEST_PDF) as renderer:
+        rgb = renderer.render_page(3, dpi=72)
+        gray = renderer.render_page(3, dpi=72, color_mode="gray")
+        bitonal = renderer.render_page(3, dpi=72, color_mode="bitonal")
+        clip = renderer.render_clip(3, 72, (0.0, 0.0, 100.0, 50.0), color_mode="gray")
+
+    luma = rgb.astype(np.float64) @ np.array([0.299, 0.587, 0.114])
+    assert gray.shape == rgb.shape[:2] and gray.dtype == np.uint8
+    assert float(np.abs(gray - luma).mean()) < 2.0
+    assert set(np.unique(bitonal)) <= {0, 255}
+    assert clip.ndim == 2
+    with get_renderer("pymupdf", TEST_PDF) as r, pytest.raises(ValueError):
+        r.render_page(1, 72, color_mode="cmyk")
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_render_all_pages_gray_writes_single_channel_pngs(tmp_path: Path) -> None:
+    cv2 = pytest.importorskip("cv2")
+    from src.comprehensive_table_parser import render_all_pages
+
+    pages = render_all_pages(
+        TEST_PDF, tmp_path, dpi=40, max_pages=1, renderer="pymupdf", color_mode="bitonal"
+    )
+
+    image = cv2.imread(str(pages[0][1]), cv2.IMREAD_UNCHANGED)
+    assert image.ndim == 2
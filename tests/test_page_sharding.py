@@ -0,0 +1,30 @@
+"""Tests for sharding pages across worker processes."""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from src.page_sharding import shard_pages, worker_thread_env, worker_threads
+
+
+def test_shards_balance_cost_and_stay_in_page_order() -> None:
+    costs = {1: 10.0, 2: 1.0, 3: 1.0, 4: 8.0, 5: 2.0}
+
+    shards = shard_pages(costs, 2)
+
+    assert shards == [[1, 2], [3, 4, 5]]  # 11 and 11
+    assert shard_pages(costs, 2) == shards  # same split every run
+    assert shard_pages({1: 1.0, 2: 1.0}, 8) == [[1], [2]]  # never an empty shard
+
+
+def test_workers_share_the_cores(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(os, "cpu_count", lambda: 32)
+    monkeypatch.setenv("OMP_NUM_THREADS", "32")
+    monkeypatch.delenv("OPENBLAS_NUM_THREADS", raising=False)
+
+    assert worker_threads(4) == 8 and worker_threads(64) == 1
+    with worker_thread_env(8):
+        assert os.environ["OMP_NUM_THREADS"] == os.environ["OPENBLAS_NUM_THREADS"] == "8"
+    assert os.environ["OMP_NUM_THREADS"] == "32" and "OPENBLAS_NUM_THREADS" not in os.environ
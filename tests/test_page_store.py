@@ -0,0 +1,69 @@
+"""Tests for the memory-mapped per-document page store."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.page_store import PageStore
+
+
+TEST_PDF = Path("data/Kauhava-Tilinpaatos-2024.pdf")
+FINGERPRINT = {"pdf_sha256": "abc", "dpi": 300, "color_mode": "rgb", "renderer": "pymupdf"}
+
+
+def page(seed: int, shape=(120, 80, 3)) -> "np.ndarray":
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+
+def test_pages_round_trip_and_survive_reopen(tmp_path: Path) -> None:
+    store = PageStore(tmp_path, FINGERPRINT)
+    store.put(3, page(3))
+    store.put(1, page(1, shape=(50, 40)))
+
+    reopened = PageStore(tmp_path, FINGERPRINT)
+
+    assert reopened.pages() == [1, 3] and 2 not in reopened
+    assert np.array_equal(reopened.get(3), page(3))
+    assert reopened.get(1).shape == (50, 40)
+    assert reopened.get(2) is None
+
+
+def test_crops_are_read_only_views_of_the_mapping(tmp_path: Path) -> None:
+    store = PageStore(tmp_path, FINGERPRINT)
+    image = store.put(1, page(1))
+
+    crop = image[10:40, 20:60]
+
+    assert np.shares_memory(crop, image)
+    assert not image.flags.writeable
+    assert np.array_equal(crop, page(1)[10:40, 20:60])
+
+
+def test_other_fingerprint_starts_afresh(tmp_path: Path) -> None:
+    PageStore(tmp_path, FINGERPRINT).put(1, page(1))
+
+    store = PageStore(tmp_path, {**FINGERPRINT, "dpi": 150})
+
+    assert len(store) == 0
+    assert (tmp_path / "pages.bin").stat().st_size == 0
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_iter_page_images_maps_stored_pages(tmp_path: Path) -> None:
+    pytest.importorskip("fitz")
+    pytest.importorskip("cv2")
+    from src.comprehensive_table_parser import iter_page_images
+    from src.page_store import open_page_store
+
+    store = open_page_store(tmp_path, TEST_PDF, 30, "pymupdf")
+    store.put(2, np.zeros((10, 20, 3), dtype=np.uint8))
+
+    pages = dict(iter_page_images(TEST_PDF, [1, 2, 3], dpi=30, renderer="pymupdf", store=store))
+
+    assert pages[2].shape == (10, 20, 3)
+    assert store.pages() == [1, 2, 3]
+    assert np.array_equal(store.get(1), pages[1])
@@ -0,0 +1,54 @@
+"""Tests for large-page tiling and stitching."""
+
+from __future__ import annotations
+
+import pytest
+
+from src.page_tiling import Tile, fit_dpi, merge_boxes, owned_tokens, plan_tiles
+
+
+def test_small_page_is_one_tile() -> None:
+    assert plan_tiles(2480, 3508, 12_000_000, 200) == [
+        Tile((0, 0, 2480, 3508), (0, 0, 2480, 3508))
+    ]
+
+
+@pytest.mark.parametrize("size", [(4961, 3508), (1191, 842), (9999, 77)])
+def test_tiles_fit_budget_and_cores_partition_page(size: tuple) -> None:
+    width, height = size
+    tiles = plan_tiles(width, height, 200_000, 40)
+
+    assert len(tiles) > 1
+    assert all(t.pixels <= 200_000 for t in tiles)
+    assert sum((t.core[2] - t.core[0]) * (t.core[3] - t.core[1]) for t in tiles) == width * height
+    for x, y in ((0, 0), (width - 1, height - 1), (width // 2, height // 3)):
+        assert sum(t.owns(x, y) for t in tiles) == 1
+
+
+def test_overlap_larger_than_budget_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        plan_tiles(1000, 1000, 10_000, 60)
+
+
+def test_token_in_overlap_band_is_kept_once() -> None:
+    left, right = plan_tiles(2000, 500, 600_000, 100)
+    # A token straddling the cut at x=1000 seen by both tiles, in tile coordinates.
+    seen = owned_tokens(left, ["1 234,56"], [(960, 10, 1030, 30)]) + owned_tokens(
+        right, ["1 234,56"], [(960 - right.box[0], 10, 1030 - right.box[0], 30)]
+    )
+
+    assert seen == [("1 234,56", (960.0, 10.0, 1030.0, 30.0))]
+
+
+def test_merge_boxes_joins_regions_cut_by_tile_edges() -> None:
+    merged = merge_boxes([(100, 100, 1050, 400), (950, 100, 1800, 400), (100, 600, 300, 700)])
+
+    assert sorted(merged) == [(100, 100, 1800, 400), (100, 600, 300, 700)]
+
+
+def test_fit_dpi_caps_large_areas_only() -> None:
+    a3 = (1190.55, 841.89)
+
+    assert fit_dpi(595.0, 842.0, 300, 12_000_000) == 300
+    assert fit_dpi(*a3, 300, 12_000_000) == 249
+    assert fit_dpi(0.0, 10.0, 300, 1000) == 300
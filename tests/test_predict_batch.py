@@ -0,0 +1,57 @@
+"""Tests for batched PP-Structure predicts."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.predict_batch import PredictBatcher
+
+
+class ListEngine:
+    """Returns ``per_call`` results for whatever it gets, or raises."""
+
+    def __init__(self, per_call: int = -1, fail: bool = False) -> None:
+        self.per_call = per_call
+        self.fail = fail
+        self.calls: List[Any] = []
+
+    def predict(self, images: Any, **_kwargs: Any) -> List[Dict[str, Any]]:
+        self.calls.append(images)
+        if self.fail:
+            raise RuntimeError("out of memory")
+        n = len(images) if self.per_call < 0 else self.per_call
+        return [{"index": i} for i in range(n)]
+
+
+def _images(*sides: int) -> List[Any]:
+    return [np.zeros((s, s, 3), dtype=np.uint8) for s in sides]
+
+
+def test_batches_are_bounded_by_count_and_pixels() -> None:
+    batcher = PredictBatcher(size=3, max_pixels=250)
+
+    assert batcher.plan([100, 100, 100, 100]) == [[0, 1], [2, 3]]
+    assert batcher.plan([300, 10, 10, 10, 10]) == [[0], [1, 2, 3], [4]]
+
+
+def test_results_come_back_in_input_order() -> None:
+    engine = ListEngine()
+    batcher = PredictBatcher(size=2, max_pixels=10_000)
+
+    results = batcher.predict(engine, _images(10, 10, 10))
+
+    assert [len(c) for c in engine.calls] == [2]
+    assert results == [{"index": 0}, {"index": 1}, None]  # the last one goes alone
+    assert batcher.stats()["images"] == 2
+
+
+@pytest.mark.parametrize("engine", [ListEngine(per_call=1), ListEngine(fail=True)])
+def test_failed_batches_are_left_to_single_predicts(engine: ListEngine) -> None:
+    batcher = PredictBatcher(size=4)
+
+    assert batcher.predict(engine, _images(10, 10)) == [None, None]
+    assert batcher.stats()["failed"] == 1 and batcher.stats()["batches"] == 0
@@ -0,0 +1,92 @@
+"""Tests for table regions from the PyMuPDF prepass."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from src.pymupdf_prepass import detect_page_table_regions, region_pixels
+from src.text_layer import text_layer_tokens
+
+INCOME = [
+    ("Myyntituotot", "11 080 763,67", "10 815 721,55"),
+    ("Maksutuotot", "6 986 253,86", "7 562 036,71"),
+    ("Tuet ja avustukset", "5 274 059,53", "5 701 734,98"),
+]
+ASSETS = [
+    ("Aineettomat hyödykkeet", "1 191 012", "1 010 000"),
+    ("Aineelliset hyödykkeet", "12 345 678", "11 876 543"),
+    ("Sijoitukset", "500 000", "450 000"),
+]
+
+
+def _table(page: Any, y: float, title: str, rows: list, columns: tuple = (300, 420)) -> None:
+    page.insert_text((72, y), title, fontsize=10)
+    for i, (label, a, b) in enumerate(rows, start=1):
+        page.insert_text((72, y + 14 * i), label, fontsize=9)
+        page.insert_text((columns[0], y + 14 * i), a, fontsize=9)
+        page.insert_text((columns[1], y + 14 * i), b, fontsize=9)
+
+
+def _two_tables_and_narrative(doc: Any) -> Any:
+    page = doc.new_page()
+    _table(page, 100, "TULOSLASKELMA 2024 2023", INCOME)
+    for i, line in enumerate([
+        "Toimintatuotot kasvoivat edellisestä vuodesta, kun maksutuotot",
+        "ja myyntituotot nousivat. Toimintakulut pysyivät ennallaan ja",
+        "vuosikate riitti kattamaan suunnitelman mukaiset poistot.",
+        "Investoinnit rahoitettiin osin lainanotolla.",
+    ]):
+        page.insert_text((72, 180 + 14 * i), line, fontsize=9)
+    _table(page, 260, "VASTAAVAA 2024 2023", ASSETS)
+    return page
+
+
+def test_two_tables_with_narrative_between_are_separate_regions() -> None:
+    doc = fitz.open()
+    page = _two_tables_and_narrative(doc)
+
+    regions = detect_page_table_regions(page, 0)
+
+    assert [r.label for r in regions] == ["TULOSLASKELMA 2024 2023", "VASTAAVAA 2024 2023"]
+    first, second = (r.bbox for r in regions)
+    # Each starts at its label row; the narrative (y 170-225) is in neither.
+    assert first[1] < 100 - 10 and first[3] < 175
+    assert 224 < second[1] < 260 - 10
+    assert all(r.page == 0 for r in regions)
+
+
+def test_a_change_of_columns_starts_a_new_region() -> None:
+    doc = fitz.open()
+    page = doc.new_page()
+    _table(page, 100, "Rahoituslaskelma", INCOME)
+    # Directly below, no gap, but the amounts sit in other columns.
+    _table(page, 100 + 14 * 4, "Erittely", ASSETS, columns=(190, 250))
+
+    regions = detect_page_table_regions(page, 4)
+
+    assert len(regions) == 2
+    assert regions[0].label == "Rahoituslaskelma"
+    assert regions[1].label == "Table 2 on page 5"
+    assert regions[0].bbox[3] <= regions[1].bbox[1]
+
+
+def test_region_pixels_follow_page_rotation() -> None:
+    doc = fitz.open()
+    page = _two_tables_and_narrative(doc)
+    page.set_rotation(90)
+
+    regions = detect_page_table_regions(page, 0)
+    tokens = text_layer_tokens(page, dpi=150)
+    box = region_pixels(regions[0], page, 150)
+
+    inside = [
+        t.text for t in tokens
+        if box['x'] <= t.x_center < box['x'] + box['width']
+        and box['y'] <= t.y_center < box['y'] + box['height']
+    ]
+    assert "11 080 763,67" in inside and "Sijoitukset" not in inside
+    assert box['x'] + box['width'] <= round(page.rect.width * 150 / 72) + 1
@@ -0,0 +1,100 @@
+"""Tests for the PyMuPDF find_tables() parser backend."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from src.document_session import DocumentSession
+from src.pymupdf_tables_parser import extract_native_tables, page_tables, parse_with_pymupdf_tables
+
+ROWS = [
+    ("Erä", "2024", "2023"),
+    ("Myyntituotot", "11 080 763,67", "10 815 721,55"),
+    ("Maksutuotot", "6 986 253,86", "7 562 036,71"),
+    ("Tuet ja avustukset", "5 274 059,53", "5 701 734,98"),
+]
+
+
+def _ruled_page(doc: Any) -> Any:
+    page = doc.new_page()
+    page.insert_text((72, 80), "TULOSLASKELMA", fontsize=12)
+    for i, row in enumerate(ROWS):
+        for x, text in zip((72, 250, 400), row):
+            page.insert_text((x + 4, 100 + 20 * i + 14), text, fontsize=9)
+    for i in range(len(ROWS) + 1):
+        page.draw_line((72, 100 + 20 * i), (520, 100 + 20 * i))
+    for x in (72, 250, 400, 520):
+        page.draw_line((x, 100), (x, 100 + 20 * len(ROWS)))
+    return page
+
+
+def _unruled_page(doc: Any) -> Any:
+    page = doc.new_page()
+    for i, row in enumerate(ROWS):
+        for x, text in zip((72, 300, 420), row):
+            page.insert_text((x, 120 + 14 * i), text, fontsize=9)
+    return page
+
+
+def test_ruled_and_unruled_tables_keep_whole_amounts() -> None:
+    doc = fitz.open()
+
+    assert page_tables(_ruled_page(doc)) == [[list(r) for r in ROWS]]
+    # No rules: the prepass block, grouped from the text layer (amounts stay whole).
+    assert page_tables(_unruled_page(doc), 1) == [[list(r) for r in ROWS]]
+
+
+def test_scanned_pages_make_the_result_incomplete(tmp_path: Path) -> None:
+    np = pytest.importorskip("numpy")
+    cv2 = pytest.importorskip("cv2")
+    doc = fitz.open()
+    _ruled_page(doc)
+    pdf = tmp_path / "native.pdf"
+    doc.save(str(pdf))
+    scan = doc.new_page()
+    png = tmp_path / "scan.png"
+    cv2.imwrite(str(png), np.full((110, 85), 240, dtype=np.uint8))
+    scan.insert_image(scan.rect, filename=str(png))
+    mixed = tmp_path / "mixed.pdf"
+    doc.save(str(mixed))
+
+    with DocumentSession(pdf) as session:
+        native = extract_native_tables(session)
+    with DocumentSession(mixed) as session:
+        partial = extract_native_tables(session)
+
+    assert native.tables == 1 and native.complete
+    assert partial.ocr_pages == [2] and not partial.complete
+
+
+def test_markdown_has_the_pdfplumber_shape(tmp_path: Path) -> None:
+    doc = fitz.open()
+    _ruled_page(doc)
+    pdf = tmp_path / "native.pdf"
+    doc.save(str(pdf))
+
+    md, images = parse_with_pymupdf_tables(pdf, tmp_path / "out")
+
+    assert images == []
+    assert "## Page 1" in md and "### Tables on page 1" in md and "#### Table 1" in md
+    assert "| Erä | 2024 | 2023 |" in md
+    assert "| Myyntituotot | 11 080 763,67 | 10 815 721,55 |" in md
+
+
+def test_pipeline_uses_it_as_the_only_parser(tmp_path: Path) -> None:
+    from src.pipeline import process_pdf
+
+    doc = fitz.open()
+    _ruled_page(doc)
+    pdf = tmp_path / "native.pdf"
+    doc.save(str(pdf))
+
+    md_path = process_pdf(pdf, out_dir=tmp_path / "out", use_gpu=False, pymupdf_tables="only")
+
+    content = md_path.read_text(encoding="utf-8")
+    assert "#### Table 1" in content and "Myyntituotot" in content
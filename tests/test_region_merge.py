@@ -0,0 +1,45 @@
+"""Tests for merging a page's table regions before PP-Structure."""
+
+from __future__ import annotations
+
+from src.region_merge import merge_regions
+
+
+def _r(x: int, y: int, w: int, h: int) -> dict:
+    return {'x': x, 'y': y, 'width': w, 'height': h}
+
+
+def test_overlapping_and_contained_regions_become_one() -> None:
+    regions = [_r(100, 100, 400, 200), _r(150, 150, 100, 50), _r(450, 250, 200, 100)]
+
+    assert merge_regions(regions) == [_r(100, 100, 550, 250)]
+
+
+def test_aligned_fragments_within_the_gap_are_joined() -> None:
+    # A table whose frame breaks between header band and body, 10 px apart.
+    stacked = [_r(100, 100, 600, 60), _r(100, 170, 600, 300)]
+    # Two halves of one table, side by side 12 px apart.
+    side = [_r(100, 600, 290, 200), _r(402, 600, 300, 200)]
+
+    assert merge_regions(stacked + side) == [_r(100, 100, 600, 370), _r(100, 600, 602, 200)]
+    # At 75 DPI the same gaps are a quarter as wide in pixels.
+    assert len(merge_regions([_r(25, 25, 150, 15), _r(25, 50, 150, 75)], scale=0.25)) == 2
+
+
+def test_separate_tables_stay_apart() -> None:
+    regions = [
+        _r(100, 100, 600, 200),
+        _r(100, 340, 600, 200),  # 40 px below: another table
+        _r(710, 545, 200, 100),  # diagonal neighbour, not lined up
+    ]
+
+    assert merge_regions(regions) == regions
+
+
+def test_region_count_is_capped_keeping_the_largest() -> None:
+    regions = [_r(100, 100 + 100 * i, 200 + 10 * i, 50) for i in range(6)]
+
+    kept = merge_regions(regions, max_regions=3)
+
+    assert [r['width'] for r in kept] == [230, 240, 250]
+    assert len(merge_regions(regions, max_regions=0)) == 6
@@ -0,0 +1,70 @@
+"""Tests for packing small table crops onto shared canvases."""
+
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.region_packing import Slot, pack_crops, split_result
+
+
+def _crop(h: int, w: int, value: int) -> np.ndarray:
+    return np.full((h, w, 3), value, dtype=np.uint8)
+
+
+def test_crops_are_packed_without_overlap_and_copied_in() -> None:
+    crops = [(0, _crop(100, 300, 10)), (1, _crop(200, 500, 20)), (2, _crop(150, 400, 30))]
+
+    canvases = pack_crops(crops, gutter=20, max_width=1000, max_height=2000)
+
+    assert len(canvases) == 1
+    canvas, slots = canvases[0]
+    assert [s.key for s in slots] == [0, 1, 2]
+    for s, (_key, crop) in zip(slots, crops):
+        assert np.array_equal(canvas[s.y:s.y + s.height, s.x:s.x + s.width], crop)
+    for a in slots:
+        for b in slots:
+            if a is not b:
+                assert a.x + a.width + 20 <= b.x or b.x + b.width + 20 <= a.x or \
+                    a.y + a.height + 20 <= b.y or b.y + b.height + 20 <= a.y
+    # Gutters and margins stay white.
+    assert canvas[:20].min() == 255 and canvas[:, :20].min() == 255
+
+
+def test_full_canvas_starts_another() -> None:
+    crops = [(i, _crop(400, 400, 0)) for i in range(5)]
+
+    canvases = pack_crops(crops, gutter=10, max_width=900, max_height=900)
+
+    assert [len(slots) for _canvas, slots in canvases] == [4, 1]
+    assert all(c.shape[0] <= 900 and c.shape[1] <= 900 for c, _slots in canvases)
+
+
+def test_tables_are_split_by_crop_and_moved_into_crop_pixels() -> None:
+    slots = [Slot(0, 10, 10, 100, 50), Slot(3, 130, 10, 100, 50)]
+    page_res = {
+        "table_res_list": [
+            {"pred_html": "<table>b</table>", "cell_box_list": [[140, 15, 220, 55]],
+             "table_ocr_pred": {"rec_texts": ["x"], "rec_boxes": np.array([[150, 20, 200, 40]])}},
+            {"pred_html": "<table>a</table>", "cell_box_list": [[12, 12, 100, 58]]},
+        ]
+    }
+
+    per_slot = split_result(page_res, slots)
+
+    assert [t["pred_html"] for t in per_slot[0]["table_res_list"]] == ["<table>a</table>"]
+    moved = per_slot[3]["table_res_list"][0]
+    assert moved["cell_box_list"] == [[10, 5, 90, 45]]
+    assert moved["table_ocr_pred"]["rec_boxes"].tolist() == [[20, 10, 70, 30]]
+
+
+def test_tables_that_cannot_be_attributed_give_up_the_canvas() -> None:
+    slots = [Slot(0, 10, 10, 100, 50), Slot(1, 130, 10, 100, 50)]
+
+    spanning = {"table_res_list": [{"cell_box_list": [[20, 20, 200, 40]]}]}
+    unplaced = {"table_res_list": [{"pred_html": "<table></table>"}]}
+
+    assert split_result(spanning, slots) is None
+    assert split_result(unplaced, slots) is None
+    assert split_result({}, slots) == {0: {"table_res_list": []}, 1: {"table_res_list": []}}
@@ -0,0 +1,121 @@
+"""Tests for the shared, content-addressed render cache."""
+
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from src.render_cache import CacheLock, RenderCache
+
+
+TEST_PDF = Path("data/Kauhava-Tilinpaatos-2024.pdf")
+
+
+def noise(seed: int, size: int = 64) -> "np.ndarray":
+    """Incompressible RGB image, so PNG sizes are predictable."""
+    return np.random.default_rng(seed).integers(0, 256, (size, size, 3), dtype=np.uint8)
+
+
+def test_key_depends_on_every_render_parameter() -> None:
+    base = RenderCache.key("abc", 1, 300, "pymupdf", "1")
+    variants = {
+        RenderCache.key("abd", 1, 300, "pymupdf", "1"),
+        RenderCache.key("abc", 2, 300, "pymupdf", "1"),
+        RenderCache.key("abc", 1, 150, "pymupdf", "1"),
+        RenderCache.key("abc", 1, 300, "pdf2image", "1"),
+        RenderCache.key("abc", 1, 300, "pymupdf", "2"),
+        RenderCache.key("abc", 1, 300, "pymupdf", "1", color_mode="gray"),
+    }
+    assert base not in variants and len(variants) == 6
+
+
+def test_put_and_load_round_trip(tmp_path: Path) -> None:
+    cache = RenderCache(tmp_path)
+    image = noise(0)
+
+    assert cache.load("00" * 32) is None
+    cache.put_array("00" * 32, image)
+
+    assert np.array_equal(cache.load("00" * 32), image)
+    assert not (tmp_path / ".lock").exists()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Path) -> None:
+    cache = RenderCache(tmp_path)
+    keys = [f"{i:02d}" * 32 for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put_array(key, noise(i))
+        os.utime(cache.path_for(key), (time.time() - 100 + i, time.time() - 100 + i))
+    cache.get(keys[0])  # touch: now the most recently used
+
+    cache.max_bytes = cache.path_for(keys[0]).stat().st_size * 2
+    cache.evict()
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+
+
+def test_inserts_scan_entries_only_over_budget(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache = RenderCache(tmp_path)
+    cache.put_array("00" * 32, noise(0))  # first insert counts the (empty) cache
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or entries())
+
+    for i in range(1, 4):
+        cache.put_array(f"{i:02d}" * 32, noise(i))
+    cache.put_array("01" * 32, noise(1))  # replacing an entry is not counted twice
+
+    assert scans == []
+    assert int((tmp_path / ".size").read_text()) == sum(
+        cache.path_for(f"{i:02d}" * 32).stat().st_size for i in range(4)
+    )
+
+    cache.max_bytes = cache.path_for("00" * 32).stat().st_size * 2
+    cache.put_array("04" * 32, noise(4))
+
+    assert scans == [1]  # the over-budget insert's eviction scan
+    assert cache.size_bytes() <= cache.max_bytes
+    assert int((tmp_path / ".size").read_text()) == cache.size_bytes()
+
+
+def test_lock_is_exclusive_and_breaks_stale_locks(tmp_path: Path) -> None:
+    lock_path = tmp_path / ".lock"
+    with CacheLock(lock_path):
+        with pytest.raises(TimeoutError):
+            with CacheLock(lock_path, timeout=0.1):
+                pass
+
+    lock_path.write_text("pid=0\n")
+    old = time.time() - 3600
+    os.utime(lock_path, (old, old))
+    with CacheLock(lock_path, timeout=0.1, stale_after=60):
+        pass
+    assert not lock_path.exists()
+
+
+@pytest.mark.skipif(not TEST_PDF.exists(), reason="Test PDF not available")
+def test_render_all_pages_shares_cache_across_output_dirs(tmp_path: Path) -> None:
+    pytest.importorskip("fitz")
+    from src.comprehensive_table_parser import render_all_pages
+
+    cache = RenderCache(tmp_path / "cache")
+    first = render_all_pages(
+        TEST_PDF, tmp_path / "a", dpi=40, max_pages=2, renderer="pymupdf", cache=cache
+    )
+    second = render_all_pages(
+        TEST_PDF, tmp_path / "b", dpi=40, max_pages=2, renderer="pymupdf", cache=cache
+    )
+
+    assert len(list((tmp_path / "cache").glob("??/*.png"))) == 2
+    for (_, a), (_, b) in zip(first, second):
+        assert a.read_bytes() == b.read_bytes()
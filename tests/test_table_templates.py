@@ -0,0 +1,81 @@
+"""Tests for table layout templates (OCR-only reads of recurring tables)."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from src.ppstructure_postprocess import OCRToken
+from src.table_templates import Geometry, TemplateCache, template_rows
+
+HTML = (
+    "<table><tr><td>erä</td><td>2024</td><td>2023</td></tr>"
+    "<tr><td>Myyntituotot</td><td>11 080 763,67</td><td>10 815 721,55</td></tr></table>"
+)
+CELLS = [[0, 0, 400, 40], [400, 0, 600, 40], [600, 0, 800, 40],
+         [0, 40, 400, 80], [400, 40, 600, 80], [600, 40, 800, 80]]
+
+
+def _tokens(year: int, amount_x: float = 450) -> list:
+    return [
+        OCRToken("erä", 0.99, (20, 10, 60, 30)),
+        OCRToken(str(year), 0.99, (450, 10, 500, 30)),
+        OCRToken(str(year - 1), 0.99, (650, 10, 700, 30)),
+        OCRToken("Myyntituotot", 0.99, (20, 50, 150, 70)),
+        OCRToken("11 080 763,67", 0.95, (amount_x, 50, amount_x + 120, 70)),
+        OCRToken("10 815 721,55", 0.97, (650, 50, 770, 70)),
+    ]
+
+
+def _result(year: int) -> dict:
+    toks = _tokens(year)
+    return {"table_res_list": [{
+        "pred_html": HTML,
+        "cell_box_list": CELLS,
+        "table_ocr_pred": {
+            "rec_texts": [t.text for t in toks],
+            "rec_scores": [t.confidence for t in toks],
+            "rec_boxes": [list(t.box) for t in toks],
+        },
+    }]}
+
+
+def test_geometry_is_dpi_independent() -> None:
+    at_300 = Geometry.from_separators([0, 40, 80, 120], [0, 400, 600, 800], 800)
+    at_150 = Geometry.from_separators([0, 20, 40, 60], [0, 200, 300, 400], 400)
+    other = Geometry.from_separators([0, 40, 80, 120], [0, 300, 600, 800], 800)
+
+    assert at_150.matches(at_300)
+    assert not other.matches(at_300)
+    assert not Geometry.from_separators([], [], 800).matches(at_300)
+
+
+def test_next_years_table_matches_but_shifted_columns_do_not(tmp_path: Path) -> None:
+    cache = TemplateCache(tmp_path / "t.json")
+    geometry = Geometry.from_separators([0, 40, 80], [0, 400, 600, 800], 800)
+    template = cache.learn(geometry, _result(2024), 800)
+    assert template is not None and template.bounds == [0.5, 0.75]
+
+    candidates = cache.candidates(geometry)
+    assert cache.match(candidates, _tokens(2025), 800) is template
+    # An amount across the 2024/2023 bound: not this layout.
+    assert cache.match(candidates, _tokens(2025, amount_x=560), 800) is None
+    assert template_rows(template, _tokens(2025), 800) == [
+        ["erä", "2025", "2024"],
+        ["Myyntituotot", "11 080 763,67", "10 815 721,55"],
+    ]
+
+
+def test_templates_persist_and_merge_across_runs(tmp_path: Path) -> None:
+    path = tmp_path / "t.json"
+    first, second = TemplateCache(path), TemplateCache(path)
+    first.learn(Geometry.from_separators([0, 40, 80], [0, 400, 600, 800], 800), _result(2024), 800)
+    second.learn(Geometry.from_separators([0, 30, 60], [0, 400, 600, 800], 800), _result(2024), 800)
+
+    first.save()
+    second.save()
+
+    assert len(TemplateCache(path).templates) == 2
+    capped = TemplateCache(path, max_templates=1)
+    capped.hit(next(iter(capped.templates.values())))
+    capped.save()
+    assert len(TemplateCache(path).templates) == 1
@@ -0,0 +1,89 @@
+"""Tests for text-layer tokens (the no-OCR path for born-digital pages)."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from src.ppstructure_postprocess import OCRToken
+from src.text_layer import garbled_share, page_tokens, text_layer_tokens, tokens_in, tokens_to_rows
+
+ROWS = [
+    ("Myyntisaamiset", "1 191 012,25", "1 010 000,00"),
+    ("Muut saamiset", "12 345,67", "9 876,54"),
+    ("Siirtosaamiset", "500,00", "0,00"),
+]
+
+
+def _statement_page(doc):
+    page = doc.new_page()
+    page.insert_text((72, 80), "Tase 2024", fontsize=14)
+    for i, (label, v2024, v2023) in enumerate(ROWS):
+        y = 120 + 20 * i
+        page.insert_text((72, y), label, fontsize=9)
+        page.insert_text((300, y), v2024, fontsize=9)
+        page.insert_text((420, y), v2023, fontsize=9)
+    return page
+
+
+def test_words_a_space_apart_are_one_token() -> None:
+    doc = fitz.open()
+    page = _statement_page(doc)
+
+    tokens = text_layer_tokens(page, dpi=300)
+
+    texts = [t.text for t in tokens]
+    assert "1 191 012,25" in texts and "Myyntisaamiset" in texts
+    assert all(t.confidence == 1.0 for t in tokens)
+    amount = tokens[texts.index("1 191 012,25")]
+    assert amount.box[0] == pytest.approx(300 * 300 / 72, abs=2)
+
+
+def test_rows_and_columns_from_tokens() -> None:
+    doc = fitz.open()
+    page = _statement_page(doc)
+    tokens = text_layer_tokens(page, dpi=150)
+
+    rows = tokens_to_rows(tokens)
+
+    assert rows[0] == ["Tase 2024", "", ""]
+    assert rows[1:] == [list(r) for r in ROWS]
+    region = {'x': 0, 'y': 0, 'width': 1240, 'height': 200}
+    assert [t.text for t in tokens_in(tokens, region)] == ["Tase 2024"]
+
+
+def test_rotated_page_tokens_are_in_rendered_pixels() -> None:
+    doc = fitz.open()
+    page = _statement_page(doc)
+    page.set_rotation(90)
+
+    tokens = text_layer_tokens(page, dpi=72)
+
+    assert all(0 <= t.box[0] < t.box[2] <= page.rect.width for t in tokens)
+    # The first column (x=72 unrotated) is now near the top of the landscape page.
+    label = next(t for t in tokens if t.text == "Myyntisaamiset")
+    assert label.box[1] == pytest.approx(72, abs=2)
+
+
+def test_pages_without_a_usable_text_layer_need_ocr(tmp_path: Path) -> None:
+    np = pytest.importorskip("numpy")
+    cv2 = pytest.importorskip("cv2")
+    doc = fitz.open()
+    assert page_tokens(doc.new_page()) is None
+    scan = doc.new_page()
+    png = tmp_path / "scan.png"
+    cv2.imwrite(str(png), np.full((110, 85), 240, dtype=np.uint8))
+    scan.insert_image(scan.rect, filename=str(png))
+    scan.insert_text((72, 72), "Tilinpäätös 2024 sivu 1 / 150", fontsize=9)
+    assert page_tokens(scan) is None
+    assert page_tokens(_statement_page(doc)) is not None
+
+
+def test_garbled_share_counts_unmapped_glyphs() -> None:
+    box = (0.0, 0.0, 10.0, 10.0)
+    assert garbled_share([OCRToken("1 000,00", 1.0, box)]) == 0.0
+    assert garbled_share([OCRToken("\ufffd\ufffd", 1.0, box), OCRToken("ab", 1.0, box)]) == 0.5
+    assert garbled_share([OCRToken("\ue001", 1.0, box)]) == 1.0
@@ -0,0 +1,98 @@
+"""Tests for table regions from a PDF's vector rules."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+fitz = pytest.importorskip("fitz")
+
+from src.comprehensive_table_parser import (
+    _box_cropper,
+    detect_table_regions_in_image,
+    detect_vector_regions,
+)
+from src.vector_rules import image_boxes, vector_table_regions
+
+
+def _render(page: Any, dpi: int) -> np.ndarray:
+    pix = page.get_pixmap(dpi=dpi)
+    return np.frombuffer(pix.samples, np.uint8).reshape(pix.h, pix.w, pix.n)[:, :, :3]
+
+
+def _ruled_page(doc: Any) -> Any:
+    page = doc.new_page()
+    # A table ruled with thin filled rectangles, and one with stroked lines.
+    for y in (100, 130, 160, 190):
+        page.draw_rect(fitz.Rect(60, y, 540, y + 0.7), color=None, fill=(0, 0, 0))
+    for x in (60, 300, 540):
+        page.draw_rect(fitz.Rect(x, 100, x + 0.7, 190.7), color=None, fill=(0, 0, 0))
+    for y in (400, 450, 500):
+        page.draw_line((80, y), (500, y), color=(0.2, 0.2, 0.2), width=1)
+    for x in (80, 290, 500):
+        page.draw_line((x, 400), (x, 500), color=(0.2, 0.2, 0.2), width=1)
+    page.insert_text((90, 120), "Myyntisaamiset 1 191 012,25", fontsize=9)
+    return page
+
+
+def _key(regions: list) -> list:
+    return sorted((r['y'], r['x'], r['width'], r['height']) for r in regions)
+
+
+@pytest.mark.parametrize("dpi", [300, 75])
+def test_vector_regions_match_opencv_on_the_render(dpi: int) -> None:
+    doc = fitz.open()
+    page = _ruled_page(doc)
+
+    found = vector_table_regions(page, dpi)
+    expected = detect_table_regions_in_image(_render(page, dpi), scale=dpi / 300)
+
+    assert len(found) == len(expected) == 2
+    for a, b in zip(_key(found), _key(expected)):
+        assert max(abs(p - q) for p, q in zip(a, b)) <= 2
+
+
+def test_page_without_vector_rules_falls_back() -> None:
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 100), "Tilinpäätös 2024", fontsize=24)
+
+    assert vector_table_regions(page) is None
+
+
+def test_light_fill_painted_over_a_rule_removes_it() -> None:
+    doc = fitz.open()
+    page = _ruled_page(doc)
+    # A white box over the lower table's rules, as a later cell background would be.
+    page.draw_rect(fitz.Rect(70, 390, 510, 510), color=None, fill=(1, 1, 1))
+
+    found = vector_table_regions(page)
+
+    assert len(found) == 1
+    assert found == detect_table_regions_in_image(_render(page, 300))
+
+
+def test_rules_inside_a_raster_image_use_opencv(tmp_path: Path) -> None:
+    scan = np.full((300, 500, 3), 255, dtype=np.uint8)
+    for y in (20, 140, 280):
+        cv2.line(scan, (20, y), (480, y), (0, 0, 0), 3)
+    for x in (20, 250, 480):
+        cv2.line(scan, (x, 20), (x, 280), (0, 0, 0), 3)
+    png = tmp_path / "scan.png"
+    cv2.imwrite(str(png), scan)
+    doc = fitz.open()
+    page = doc.new_page()
+    page.draw_line((60, 60), (540, 60), width=1)  # some vector ink, no table
+    page.insert_image(fitz.Rect(60, 300, 560, 600), filename=str(png))
+
+    image = _render(page, 300)
+    boxes = image_boxes(page, 300)
+    found = detect_vector_regions(page, 300, _box_cropper(image))
+
+    assert vector_table_regions(page, 300) == []
+    assert len(boxes) == 1 and len(found) == 1
+    assert _key(found) == _key(detect_table_regions_in_image(image))